@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
+
+    def ready(self) -> None:
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from .cache import connect_signals
+        from .fulltext import repair_fulltext_indexes
+        from .instrumentation import install_query_dispatcher
+        from .sqlite_tuning import configure_connection
+        connect_signals()
+        connection_created.connect(install_query_dispatcher, dispatch_uid='core.query_dispatcher')
+        connection_created.connect(configure_connection, dispatch_uid='core.sqlite_tuning')
+        post_migrate.connect(repair_fulltext_indexes, sender=self, dispatch_uid='core.fulltext_indexes')
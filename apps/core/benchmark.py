@@ -0,0 +1,174 @@
+"""
+In-process API benchmark: scenarios driven through the real URLconf with the test client.
+
+Each scenario is first timed without any instrumentation, then replayed a few times
+with the queries captured and ``tracemalloc`` on, to measure queries and memory.
+Used by the ``bench_api`` management command.
+"""
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, NamedTuple, Optional
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.notes.models import Note
+from apps.todos.models import Todo, TodoStatus
+
+
+class BenchContext:
+    """Ids of the seeded rows and a seeded random generator shared by the scenarios."""
+
+    def __init__(self, seed: int, page_size: int) -> None:
+        self.rng = random.Random(seed)
+        self.note_ids = list(Note.objects.order_by('pk').values_list('pk', flat=True))
+        self.todo_ids = list(Todo.objects.filter(note__isnull=False).order_by('pk').values_list('pk', flat=True))
+        self.last_page = max(1, -(-Todo.objects.count() // page_size))
+        # Second page of the unified search, so that the keyset cursor filter is measured too
+        response = Client().get(f"{reverse('search')}?search=client")
+        self.search_next_page = response.json()['next'] or f"{reverse('search')}?search=client"
+
+    def note_id(self) -> int:
+        return self.rng.choice(self.note_ids)
+
+    def todo_id(self) -> int:
+        return self.rng.choice(self.todo_ids)
+
+    def spare_todo_id(self) -> int:
+        """A todo created for the request (e.g. to be deleted), outside of the measurement."""
+        return Todo.objects.create(title="Bench", note_id=self.note_id()).pk
+
+
+# Returns the path and body of the n-th request of a scenario
+RequestBuilder = Callable[[BenchContext, int], tuple[str, Optional[dict[str, Any]]]]
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    build: RequestBuilder
+
+
+def _get(path_for: Callable[[BenchContext], str]) -> RequestBuilder:
+    return lambda context, index: (path_for(context), None)
+
+
+SCENARIOS = (
+    Scenario('todos-list', 'get', _get(lambda c: reverse('todos-list'))),
+    Scenario('todos-list-middle-page', 'get', _get(lambda c: f"{reverse('todos-list')}?page={max(1, c.last_page // 2)}")),
+    Scenario('todos-list-last-page', 'get', _get(lambda c: f"{reverse('todos-list')}?page={c.last_page}")),
+    Scenario('todos-list-cursor', 'get', _get(lambda c: f"{reverse('todos-list')}?pagination=cursor")),
+    Scenario('todos-list-search', 'get', _get(lambda c: f"{reverse('todos-list')}?search=projet")),
+    Scenario('todos-list-ordering', 'get', _get(lambda c: f"{reverse('todos-list')}?ordering=title")),
+    Scenario('notes-list', 'get', _get(lambda c: reverse('notes-list'))),
+    Scenario('notes-list-search', 'get', _get(lambda c: f"{reverse('notes-list')}?search=client")),
+    Scenario('search', 'get', _get(lambda c: f"{reverse('search')}?search=client")),
+    Scenario('search-next-page', 'get', _get(lambda c: c.search_next_page)),
+    Scenario('notes-retrieve', 'get', _get(lambda c: reverse('notes-detail', kwargs={'pk': c.note_id()}))),
+    Scenario('todos-retrieve', 'get', _get(lambda c: reverse('todos-detail', kwargs={'pk': c.todo_id()}))),
+    Scenario('todos-by-note', 'get', _get(lambda c: f"{reverse('todos-by-note')}?note={c.note_id()}")),
+    Scenario(
+        'todos-create',
+        'post',
+        lambda c, index: (reverse('todos-list'), {'title': f"Bench {index}", 'note': c.note_id()}),
+    ),
+    Scenario(
+        'todos-update',
+        'patch',
+        lambda c, index: (
+            reverse('todos-detail', kwargs={'pk': c.todo_id()}),
+            {'status': c.rng.choice(TodoStatus.values)},
+        ),
+    ),
+    Scenario(
+        'todos-delete',
+        'delete',
+        lambda c, index: (reverse('todos-detail', kwargs={'pk': c.spare_todo_id()}), None),
+    ),
+)
+
+
+def percentile(values: list[float], rank: int) -> float:
+    """Inclusive percentile (1-99) of at least one value."""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[rank - 1]
+
+
+def run_scenario(
+    scenario: Scenario,
+    context: BenchContext,
+    client: Client,
+    iterations: int,
+    warmup: int,
+    instrumented: int,
+) -> dict[str, Any]:
+    """Time ``iterations`` requests (after ``warmup``), then measure queries and memory."""
+
+    def send(request: tuple[str, Optional[dict[str, Any]]]):
+        path, data = request
+        started = time.perf_counter()
+        response = getattr(client, scenario.method)(path, data, content_type='application/json')
+        elapsed = time.perf_counter() - started
+        return response, elapsed
+
+    for index in range(warmup):
+        send(scenario.build(context, index))
+
+    latencies, statuses = [], {}
+    for index in range(warmup, warmup + iterations):
+        response, elapsed = send(scenario.build(context, index))
+        latencies.append(elapsed * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    queries, memory = [], []
+    for index in range(warmup + iterations, warmup + iterations + instrumented):
+        # Built first, so that the fixtures of the request are not measured
+        request = scenario.build(context, index)
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as captured:
+                send(request)
+            memory.append(tracemalloc.get_traced_memory()[1] / 1024)
+        finally:
+            tracemalloc.stop()
+        queries.append(len(captured))
+
+    return {
+        'method': scenario.method.upper(),
+        'iterations': iterations,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': max(queries) if queries else None,
+        'peak_memory_kib': round(statistics.median(memory), 1) if memory else None,
+    }
+
+
+# Metrics compared against a baseline (higher is worse for all of them)
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_memory_kib')
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any]) -> dict[str, dict[str, Optional[float]]]:
+    """Relative change (in %) of every metric of every scenario present in both runs."""
+    changes = {}
+    for name, metrics in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        changes[name] = {}
+        for metric in COMPARED_METRICS:
+            before, after = previous.get(metric), metrics.get(metric)
+            if before is None or after is None:
+                changes[name][metric] = None
+            elif before == 0:
+                changes[name][metric] = 0.0 if after == 0 else float('inf')
+            else:
+                changes[name][metric] = round((after - before) / before * 100, 1)
+    return changes
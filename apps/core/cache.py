@@ -0,0 +1,203 @@
+"""
+Response cache for the read endpoints of the API.
+
+Cached responses are keyed by view, action, object id, query string and the
+current *generation* of every model the response depends on. Writes never
+delete cached entries: they bump the generation of the model, so every key
+built afterwards is new and stale entries simply expire.
+
+With read replicas, a response computed from a replica shortly after a bump may still
+reflect the data before the write: it is served but not cached, for
+``DATABASE_REPLICAS['STICKY_SECONDS']`` after the last bump of its dependencies.
+"""
+import hashlib
+import time
+from typing import Any, Callable, Iterable
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponseBase
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.core.db_router import pinned_to_primary, reading_from_replicas, replica_settings
+from apps.core.metrics import CACHE_REQUESTS
+
+GENERATION_KEY = 'api:generation:{label}'
+# Time of the last generation bump of a model
+BUMPED_AT_KEY = 'api:bumped-at:{label}'
+RESPONSE_KEY = 'api:response:{view}:{action}:{pk}:{generations}:{query}'
+STATS_KEY = 'api:stats:{name}'
+
+# Models whose writes invalidate cached responses
+CACHED_MODELS = ('notes.Note', 'todos.Todo')
+
+# Validators cached with the data, so conditional requests are answered from the cache too
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def _settings() -> dict[str, Any]:
+    return {'ALIAS': 'default', 'TIMEOUT': 300, 'ENABLED': True, **getattr(settings, 'API_CACHE', {})}
+
+
+def _cache():
+    return caches[_settings()['ALIAS']]
+
+
+def _incr(key: str) -> int:
+    cache = _cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing key: create it, tolerating a concurrent creation
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_generations(labels: Iterable[str]) -> list[int]:
+    labels = list(labels)
+    keys = [GENERATION_KEY.format(label=label) for label in labels]
+    values = _cache().get_many(keys)
+    return [values.get(key, 0) for key in keys]
+
+
+def bump_generation(*labels: str) -> None:
+    """
+    Invalidate every cached response depending on the given models.
+    The bump happens right away and again on commit, so that a response built
+    by a concurrent request from pre-commit data cannot survive the commit.
+    """
+    def bump() -> None:
+        for label in labels:
+            _incr(GENERATION_KEY.format(label=label))
+        _cache().set_many({BUMPED_AT_KEY.format(label=label): time.time() for label in labels}, timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def replicas_may_lag(labels: Iterable[str]) -> bool:
+    """
+    Whether the current request reads from a replica that may not have replayed the
+    last write to one of ``labels`` yet.
+    """
+    if not reading_from_replicas():
+        return False
+    keys = [BUMPED_AT_KEY.format(label=label) for label in labels]
+    last_bump = max(_cache().get_many(keys).values(), default=None)
+    return last_bump is not None and time.time() - last_bump < replica_settings()['STICKY_SECONDS']
+
+
+def record(hit: bool) -> None:
+    CACHE_REQUESTS.inc(('hit' if hit else 'miss',))
+    _incr(STATS_KEY.format(name='hits' if hit else 'misses'))
+
+
+def get_stats() -> dict[str, Any]:
+    values = _cache().get_many([STATS_KEY.format(name='hits'), STATS_KEY.format(name='misses')])
+    hits = values.get(STATS_KEY.format(name='hits'), 0)
+    misses = values.get(STATS_KEY.format(name='misses'), 0)
+    total = hits + misses
+    return {
+        'enabled': _settings()['ENABLED'],
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+class CachedResponseMixin:
+    """
+    Viewset mixin caching the data of the ``list`` and ``retrieve`` actions.
+    ``cache_dependencies`` lists the models (``app_label.Model``) whose writes
+    invalidate the responses. The serialized data is cached with its validators
+    (see `CACHED_HEADERS`), so a cached ``If-None-Match`` match is a 304 without any query.
+    """
+
+    cache_dependencies: tuple[str, ...] = ()
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return self.cached_response(
+            request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return self.cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+    def get_response_cache_key(self, request: Request) -> str:
+        query = hashlib.sha1(
+            '&'.join(sorted(request.query_params.urlencode().split('&'))).encode()
+        ).hexdigest()
+        generations = '.'.join(str(value) for value in get_generations(self.cache_dependencies))
+        return RESPONSE_KEY.format(
+            view=self.basename,
+            action=self.action,
+            pk=self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, ''),
+            generations=generations,
+            query=query,
+        )
+
+    def cached_response(self, request: Request, compute: Callable[[], Response]) -> HttpResponseBase:
+        """Return the cached data for this request, or compute and cache it."""
+        options = _settings()
+        if not options['ENABLED'] or request.method != 'GET':
+            return compute()
+
+        cache = _cache()
+        key = self.get_response_cache_key(request)
+        # A client reading its own writes must not get an entry built from a lagging replica
+        entry = None if pinned_to_primary(request._request) else cache.get(key)
+        if entry is not None:
+            record(hit=True)
+            data, headers = entry
+            headers = {**headers, 'X-Cache': 'HIT'}
+            not_modified = get_conditional_response(
+                request._request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified') or ''),
+            )
+            if not_modified is not None:
+                for name, value in headers.items():
+                    not_modified[name] = value
+                return not_modified
+            return Response(data, headers=headers)
+
+        record(hit=False)
+        response = compute()
+        # Never store an entry built from a replica that may lag behind the new generation
+        if response.status_code == 200 and not replicas_may_lag(self.cache_dependencies):
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            cache.set(key, (response.data, headers), timeout=options['TIMEOUT'])
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+def _invalidate_on_write(sender: Any, **kwargs: Any) -> None:
+    bump_generation(sender._meta.label)
+
+
+def _invalidate_unlinked_todos(sender: Any, **kwargs: Any) -> None:
+    # Deleting a note nulls Todo.note (SET_NULL) by an UPDATE that sends no todo signal
+    bump_generation('todos.Todo')
+
+
+def connect_signals() -> None:
+    """Bump the generation of the cached models on every write."""
+    for label in CACHED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_invalidate_on_write, sender=model, dispatch_uid=f'api-cache-save-{label}')
+        post_delete.connect(_invalidate_on_write, sender=model, dispatch_uid=f'api-cache-delete-{label}')
+    post_delete.connect(
+        _invalidate_unlinked_todos, sender=apps.get_model('notes.Note'), dispatch_uid='api-cache-note-delete-todos'
+    )
+
+    from apps.notes.models import todo_counts_changed
+    todo_counts_changed.connect(_invalidate_on_write, dispatch_uid='api-cache-todo-counts')
@@ -0,0 +1,49 @@
+"""
+Connection reuse of the configured databases: persistent connections (``CONN_MAX_AGE``)
+or, on PostgreSQL with psycopg 3, a connection pool (``OPTIONS['pool']``).
+
+`connection_stats` describes each alias, with the pool counters of the current process
+(``psycopg_pool.ConnectionPool.get_stats()``) when pooling is on; served by
+``/api/db/stats/`` and exported as gauges by `apps.core.metrics`.
+"""
+from typing import Any
+
+from django.db import connections
+
+# Pool counters exported as Prometheus gauges: stats key -> help text
+POOL_GAUGES = {
+    'pool_min': 'Minimum number of connections kept by the pool.',
+    'pool_max': 'Maximum number of connections of the pool.',
+    'pool_size': 'Connections currently open, in use or idle.',
+    'pool_available': 'Idle connections ready to be handed out.',
+    'requests_waiting': 'Requests currently waiting for a connection.',
+    'requests_num': 'Connection requests served since the pool started.',
+    'requests_wait_ms': 'Total time spent waiting for a connection, in milliseconds.',
+    'requests_errors': 'Connection requests that failed (timeout or pool full).',
+}
+
+
+def _pool(connection: Any) -> Any:
+    """The pool of a PostgreSQL alias configured with ``OPTIONS['pool']``, else None."""
+    if connection.vendor != 'postgresql' or not connection.settings_dict['OPTIONS'].get('pool'):
+        return None
+    # Created on first access, shared by the threads of the process
+    return connection.pool
+
+
+def connection_stats() -> dict[str, dict[str, Any]]:
+    """Reuse settings of every alias and, when pooling, the pool counters of this process."""
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = _pool(connection)
+        entry = {
+            'vendor': connection.vendor,
+            'pooled': pool is not None,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'conn_health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+        }
+        if pool is not None:
+            entry['pool'] = {key: value for key, value in pool.get_stats().items() if key in POOL_GAUGES}
+        stats[alias] = entry
+    return stats
@@ -0,0 +1,109 @@
+"""
+Primary/replica routing.
+
+`ReplicaRoutingMiddleware` marks the reads of safe-method requests (GET, HEAD, OPTIONS)
+as replica reads; `PrimaryReplicaRouter` sends them to one of the aliases of
+``DATABASE_REPLICAS['ALIASES']``. Everything else reads from and writes to the primary
+(``default``): unsafe requests, including the note status and counter updates triggered
+by the todo signals, management commands and code running outside of a request.
+
+Read-your-writes: a response to an unsafe request carries a cookie and an
+``X-Read-Primary`` header holding the time until which the client reads from the primary
+(``STICKY_SECONDS``, longer than the replication lag). Browsers send the cookie back;
+API clients echo the header.
+"""
+import random
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest, HttpResponseBase
+
+from apps.core.instrumentation import AsyncCapableMiddleware
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_HEADER = 'X-Read-Primary'
+
+# Whether the reads of the current request may go to a replica
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+
+
+def replica_settings() -> dict[str, Any]:
+    return {
+        'ALIASES': [],
+        'STICKY_SECONDS': 5.0,
+        'COOKIE': 'read_primary',
+        **getattr(settings, 'DATABASE_REPLICAS', {}),
+    }
+
+
+def _parse_until(value: Optional[str]) -> float:
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+
+def reading_from_replicas() -> bool:
+    """Whether the reads of the current request go to a replica."""
+    return bool(_replica_reads.get() and replica_settings()['ALIASES'])
+
+
+def pinned_to_primary(request: HttpRequest) -> bool:
+    """Whether the client wrote recently and must read its own writes from the primary."""
+    options = replica_settings()
+    until = max(
+        _parse_until(request.COOKIES.get(options['COOKIE'])),
+        _parse_until(request.headers.get(PRIMARY_HEADER)),
+    )
+    return until > time.time()
+
+
+class PrimaryReplicaRouter:
+    """Replica reads during safe requests, everything else on the primary."""
+
+    def db_for_read(self, model: type, **hints: Any) -> str:
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from the database of the instance
+            return instance._state.db
+        aliases = replica_settings()['ALIASES']
+        if aliases and _replica_reads.get():
+            return random.choice(aliases)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model: type, **hints: Any) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> bool:
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """Route the reads of safe requests to the replicas; removed from the chain without replicas."""
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]) -> None:
+        if not replica_settings()['ALIASES']:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def before(self, request: HttpRequest) -> Token:
+        replica = request.method in SAFE_METHODS and not pinned_to_primary(request)
+        return _replica_reads.set(replica)
+
+    def release(self, state: Token) -> None:
+        _replica_reads.reset(state)
+
+    def after(self, request: HttpRequest, response: HttpResponseBase, state: Token) -> HttpResponseBase:
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            options = replica_settings()
+            until = time.time() + options['STICKY_SECONDS']
+            response[PRIMARY_HEADER] = f'{until:.3f}'
+            response.set_cookie(
+                options['COOKIE'], f'{until:.3f}', max_age=options['STICKY_SECONDS'], httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,258 @@
+"""
+Database-maintained full-text indexes for searchable models.
+
+- PostgreSQL: a generated ``search_vector`` tsvector column with a GIN index.
+- SQLite: an FTS5 external-content table (``<table>_fts``) kept in sync by triggers, and
+  mapped by an unmanaged model (e.g. ``NoteSearchIndex``) that searches join on rowid.
+  The triggers dropped by a table rebuild are re-created after ``migrate``
+  (`repair_fulltext_indexes`).
+
+Both are maintained by the database itself, so ``bulk_create``/``update()`` are covered too.
+Other databases (or SQLite builds without FTS5) fall back to the regular ``icontains`` search.
+"""
+import re
+from typing import Any, Optional, Sequence
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import BooleanField, CharField, F, FloatField, Model, Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+# Text search configuration used on PostgreSQL (no stemming, language agnostic)
+PG_SEARCH_CONFIG = 'simple'
+PG_VECTOR_COLUMN = 'search_vector'
+RANK_ANNOTATION = 'search_rank'
+SNIPPET_ANNOTATION = 'search_snippet'
+
+# Control characters wrapping matched words in snippets, turned into markup by `render_snippet`
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+SNIPPET_WORDS = 16
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Indexed fields of the searchable models; they must match the viewsets' search_fields
+SEARCHABLE_MODELS = {
+    'notes.Note': ('title', 'content'),
+    'todos.Todo': ('title', 'description'),
+}
+
+# (alias, table) -> whether the full-text index is usable
+_availability: dict[tuple[str, str], bool] = {}
+
+
+def fts_table(table: str) -> str:
+    return f'{table}_fts'
+
+
+def search_words(terms: Sequence[str]) -> list[str]:
+    """Split search terms into plain words, dropping any query syntax characters."""
+    return [word for term in terms for word in _WORD_RE.findall(term)]
+
+
+def _sqlite_has_fts5(schema_editor) -> bool:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_fulltext_index(schema_editor, table: str, fields: Sequence[str]) -> None:
+    """Create (idempotently) the full-text index of ``table`` over ``fields``, then fill it."""
+    vendor = schema_editor.connection.vendor
+    qn = schema_editor.quote_name
+    if vendor == 'postgresql':
+        document = " || ".join(
+            f"setweight(to_tsvector('{PG_SEARCH_CONFIG}', coalesce({qn(field)}, '')), '{weight}')"
+            for field, weight in zip(fields, 'ABCD')
+        )
+        schema_editor.execute(
+            f"ALTER TABLE {qn(table)} ADD COLUMN IF NOT EXISTS {qn(PG_VECTOR_COLUMN)} tsvector "
+            f"GENERATED ALWAYS AS ({document}) STORED"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {qn(table + '_search_idx')} "
+            f"ON {qn(table)} USING GIN ({qn(PG_VECTOR_COLUMN)})"
+        )
+    elif vendor == 'sqlite' and _sqlite_has_fts5(schema_editor):
+        fts = fts_table(table)
+        columns = ', '.join(qn(field) for field in fields)
+        new_values = ', '.join(f'new.{qn(field)}' for field in fields)
+        old_values = ', '.join(f'old.{qn(field)}' for field in fields)
+        delete_old = (
+            f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+        )
+        insert_new = f"INSERT INTO {qn(fts)}(rowid, {columns}) VALUES (new.id, {new_values});"
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {qn(fts)} USING fts5({columns}, "
+            f"content={qn(table)}, content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ai')} AFTER INSERT ON {qn(table)} "
+            f"BEGIN {insert_new} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ad')} AFTER DELETE ON {qn(table)} "
+            f"BEGIN {delete_old} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_au')} AFTER UPDATE OF {columns} ON {qn(table)} "
+            f"BEGIN {delete_old} {insert_new} END"
+        )
+        schema_editor.execute(f"INSERT INTO {qn(fts)}({qn(fts)}) VALUES ('rebuild')")
+    _availability.clear()
+
+
+def drop_fulltext_index(schema_editor, table: str) -> None:
+    """Remove the full-text index of ``table`` created by `create_fulltext_index`."""
+    vendor = schema_editor.connection.vendor
+    qn = schema_editor.quote_name
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {qn(table + '_search_idx')}")
+        schema_editor.execute(f"ALTER TABLE {qn(table)} DROP COLUMN IF EXISTS {qn(PG_VECTOR_COLUMN)}")
+    elif vendor == 'sqlite':
+        fts = fts_table(table)
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {qn(fts + suffix)}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {qn(fts)}")
+    _availability.clear()
+
+
+def repair_fulltext_indexes(using: str = DEFAULT_DB_ALIAS, **kwargs: Any) -> None:
+    """
+    ``post_migrate`` handler re-creating the SQLite triggers of the full-text indexes.
+    Most schema changes rebuild the table on SQLite, which drops its triggers; the
+    index is then refilled. Indexes not created yet are left to their migration.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+    broken = []
+    for label, fields in SEARCHABLE_MODELS.items():
+        table = apps.get_model(label)._meta.db_table
+        fts = fts_table(table)
+        if fts in existing and not {f'{fts}_ai', f'{fts}_ad', f'{fts}_au'} <= existing:
+            broken.append((table, fields))
+    if broken:
+        with connection.schema_editor() as schema_editor:
+            for table, fields in broken:
+                create_fulltext_index(schema_editor, table, fields)
+
+
+def fulltext_available(alias: str, table: str) -> bool:
+    """
+    Tell whether ``table`` has a usable full-text index on database ``alias``.
+    On SQLite the triggers are checked too: a migration that rebuilds the table drops them.
+    """
+    key = (alias, table)
+    if key not in _availability:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                columns = connection.introspection.get_table_description(cursor, table)
+                available = any(column.name == PG_VECTOR_COLUMN for column in columns)
+            elif connection.vendor == 'sqlite':
+                fts = fts_table(table)
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                    [fts, f'{fts}_ai', f'{fts}_ad', f'{fts}_au'],
+                )
+                available = cursor.fetchone()[0] == 4
+            else:
+                available = False
+        _availability[key] = available
+    return _availability[key]
+
+
+def _index_relation(model: type[Model]) -> Optional[str]:
+    """Query name of the unmanaged model mapping the FTS5 table of ``model`` (e.g. ``NoteSearchIndex``)."""
+    fts = fts_table(model._meta.db_table)
+    for relation in model._meta.related_objects:
+        if relation.one_to_one and relation.related_model._meta.db_table == fts:
+            return relation.field.related_query_name()
+    return None
+
+
+def render_snippet(snippet: Optional[str]) -> str:
+    """Escape a snippet and wrap its highlighted words in ``<mark>`` tags."""
+    return (
+        escape(snippet or '')
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_STOP, '</mark>')
+    )
+
+
+def fulltext_search(
+    queryset: QuerySet,
+    words: Sequence[str],
+    snippet_field: Optional[str] = None,
+) -> Optional[QuerySet]:
+    """
+    Filter ``queryset`` to rows matching every word (as a prefix) and annotate them
+    with ``search_rank`` (higher is more relevant).
+    With ``snippet_field``, also annotate ``search_snippet``: an excerpt around the
+    matches, delimited by HIGHLIGHT_START/HIGHLIGHT_STOP (see `render_snippet`).
+    Returns None when the model has no usable full-text index.
+    """
+    model = queryset.model
+    table = model._meta.db_table
+    if not words or not fulltext_available(queryset.db, table):
+        return None
+
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import (
+            SearchHeadline,
+            SearchQuery,
+            SearchRank,
+            SearchVectorField,
+        )
+
+        vector = RawSQL(f'{qn(table)}.{qn(PG_VECTOR_COLUMN)}', [], output_field=SearchVectorField())
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in words), config=PG_SEARCH_CONFIG, search_type='raw'
+        )
+        queryset = queryset.alias(_search_vector=vector).filter(_search_vector=query).annotate(
+            **{RANK_ANNOTATION: SearchRank(F('_search_vector'), query)}
+        )
+        if snippet_field:
+            queryset = queryset.annotate(**{
+                SNIPPET_ANNOTATION: SearchHeadline(
+                    snippet_field,
+                    query,
+                    config=PG_SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START,
+                    stop_sel=HIGHLIGHT_STOP,
+                    max_words=SNIPPET_WORDS,
+                    min_words=SNIPPET_WORDS // 2,
+                    max_fragments=1,
+                )
+            })
+        return queryset
+
+    fts = fts_table(table)
+    relation = _index_relation(model)
+    if relation is None:
+        return None
+    match = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+    # The FTS table is joined once on rowid: the MATCH runs a single time for the query,
+    # and bm25()/snippet() read the matched row of the join
+    queryset = queryset.filter(
+        Q(**{f'{relation}__isnull': False}),
+        RawSQL(f'{qn(fts)} MATCH %s', [match], output_field=BooleanField()),
+    )
+    # bm25() is lower for better matches, so it is negated to get a "higher is better" rank
+    queryset = queryset.annotate(**{RANK_ANNOTATION: RawSQL(f'-bm25({qn(fts)})', [], output_field=FloatField())})
+    if snippet_field:
+        # -1 lets FTS5 pick the column with the best match
+        snippet = RawSQL(
+            f"snippet({qn(fts)}, -1, %s, %s, '…', %s)",
+            [HIGHLIGHT_START, HIGHLIGHT_STOP, SNIPPET_WORDS],
+            output_field=CharField(),
+        )
+        queryset = queryset.annotate(**{SNIPPET_ANNOTATION: snippet})
+    return queryset
@@ -0,0 +1,261 @@
+"""
+Index advisor: EXPLAIN every query shape the API can generate.
+
+The shapes are derived from the configuration of the router-registered viewsets:
+default ordering, every ``ordering_fields`` entry in both directions, search
+(alone and with each ordering), keyset pagination on ``cursor_ordering_fields``,
+and the filtering extra actions listed in `EXTRA_ACTION_FILTERS`.
+Each shape is requested through the test client; the SQL it runs is captured with
+``connection.execute_wrapper`` and explained against the current database.
+Plans with full scans or sorts are flagged, with the composite index that would avoid them.
+Used by the ``advise_indexes`` management command.
+"""
+import hashlib
+import re
+from contextlib import ExitStack
+from typing import Any, Iterable, NamedTuple, Optional
+
+from django.apps import apps
+from django.db import connections, models
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from apps.core.slow_queries import explain
+
+# Filtering extra actions: URL name -> {query parameter: model field}
+EXTRA_ACTION_FILTERS = {
+    'todos-by-note': {'note': 'note'},
+}
+
+# Word searched by the search shapes; the plan does not depend on it
+SEARCH_WORD = 'projet'
+
+FULL_SCAN = 'full scan'
+SORT = 'sort'
+TEMP_AGGREGATE = 'temporary aggregate'
+
+PLAN_PATTERNS = {
+    'sqlite': (
+        (FULL_SCAN, re.compile(r'\bSCAN (?P<table>\w+)\b(?! USING)(?!.*VIRTUAL TABLE)')),
+        (SORT, re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY')),
+        (TEMP_AGGREGATE, re.compile(r'USE TEMP B-TREE FOR (?:GROUP BY|DISTINCT)')),
+    ),
+    'postgresql': (
+        (FULL_SCAN, re.compile(r'Seq Scan on (?P<table>\w+)')),
+        (SORT, re.compile(r'^\s*(?:->\s*)?(?:Incremental )?Sort\b')),
+        (TEMP_AGGREGATE, re.compile(r'^\s*(?:->\s*)?HashAggregate\b')),
+    ),
+}
+
+
+class QueryShape(NamedTuple):
+    name: str
+    model: type[models.Model]
+    path: str
+    # Model fields filtered on with equality, then ordered by (leading '-' for descending)
+    filters: tuple[str, ...] = ()
+    ordering: tuple[str, ...] = ()
+    search: bool = False
+
+
+class Finding(NamedTuple):
+    issue: str
+    table: Optional[str]
+    sql: str
+    plan: list[str]
+
+
+class ShapeReport(NamedTuple):
+    shape: QueryShape
+    queries: int
+    findings: list[Finding]
+    suggestion: Optional[tuple[str, ...]]
+
+
+def _viewsets(patterns: Optional[Iterable[Any]] = None) -> dict[str, type]:
+    """Router-registered viewsets with a ``list`` action, by basename."""
+    found = {}
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            found.update(_viewsets(pattern.url_patterns))
+        elif isinstance(pattern, URLPattern):
+            callback = pattern.callback
+            actions = getattr(callback, 'actions', None) or {}
+            basename = getattr(callback, 'initkwargs', {}).get('basename')
+            if actions.get('get') == 'list' and basename:
+                found[basename] = callback.cls
+    return found
+
+
+def _ordering_field(value: str) -> str:
+    return value.lstrip('-')
+
+
+def query_shapes(filter_values: dict[str, Any]) -> list[QueryShape]:
+    """
+    Every query shape of the API list endpoints.
+    ``filter_values`` gives the value used for each filtered model field (e.g. an existing note id).
+    """
+    shapes = []
+    for basename, viewset in sorted(_viewsets().items()):
+        model = viewset.queryset.model
+        path = reverse(f'{basename}-list')
+        default = tuple(getattr(viewset, 'ordering', None) or ())
+        shapes.append(QueryShape(f'{basename}-list', model, path, ordering=default))
+
+        for field in getattr(viewset, 'ordering_fields', None) or ():
+            for ordering in (field, f'-{field}'):
+                shapes.append(QueryShape(
+                    f'{basename}-list ordering={ordering}', model, f'{path}?ordering={ordering}', ordering=(ordering,)
+                ))
+
+        if getattr(viewset, 'search_fields', None):
+            shapes.append(QueryShape(f'{basename}-list search', model, f'{path}?search={SEARCH_WORD}', search=True))
+            for field in getattr(viewset, 'ordering_fields', None) or ():
+                shapes.append(QueryShape(
+                    f'{basename}-list search ordering={field}',
+                    model,
+                    f'{path}?search={SEARCH_WORD}&ordering={field}',
+                    ordering=(field,),
+                    search=True,
+                ))
+
+        for field in getattr(viewset, 'cursor_ordering_fields', None) or ():
+            shapes.append(QueryShape(
+                f'{basename}-list cursor ordering=-{field}',
+                model,
+                f'{path}?pagination=cursor&ordering=-{field}',
+                ordering=(f'-{field}', '-id'),
+            ))
+
+        for extra in viewset.get_extra_actions():
+            url_name = f'{basename}-{extra.url_name}'
+            if url_name not in EXTRA_ACTION_FILTERS or 'get' not in extra.mapping:
+                continue
+            params = EXTRA_ACTION_FILTERS[url_name]
+            query = '&'.join(f'{param}={filter_values.get(field, 1)}' for param, field in params.items())
+            shapes.append(QueryShape(
+                url_name, model, f'{reverse(url_name)}?{query}', filters=tuple(params.values()), ordering=default
+            ))
+    return shapes
+
+
+class _Recorder:
+    """Execute wrapper keeping the statements run by a request."""
+
+    def __init__(self) -> None:
+        self.statements: list[tuple[str, str, Any]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many:
+            self.statements.append((context['connection'].alias, sql, params))
+        return execute(sql, params, many, context)
+
+
+def analyze_plan(vendor: str, plan: list[str]) -> list[tuple[str, Optional[str]]]:
+    """Issues found in a plan: ``(issue, table)`` pairs."""
+    issues = []
+    for line in plan:
+        for issue, pattern in PLAN_PATTERNS.get(vendor, ()):
+            match = pattern.search(line)
+            if match:
+                issues.append((issue, match.groupdict().get('table')))
+    return issues
+
+
+def _columns(model: type[models.Model], fields: Iterable[str]) -> tuple[str, ...]:
+    return tuple(model._meta.get_field(_ordering_field(field)).column for field in fields)
+
+
+def existing_indexes(model: type[models.Model]) -> list[tuple[str, ...]]:
+    """Column lists of the indexes of ``model``: declared, single-field and unique ones."""
+    indexes = [_columns(model, index.fields) for index in model._meta.indexes if not index.condition]
+    indexes += [(field.column,) for field in model._meta.concrete_fields if field.db_index or field.unique]
+    return indexes
+
+
+def is_covered(model: type[models.Model], columns: tuple[str, ...]) -> bool:
+    return any(index[:len(columns)] == columns for index in existing_indexes(model))
+
+
+def suggest_index(shape: QueryShape, findings: list[Finding]) -> Optional[tuple[str, ...]]:
+    """
+    Fields of the index avoiding the scans and sorts of ``shape`` on its model table:
+    equality filters first, then the ordering. Relevance-ordered searches use the
+    full-text index instead; they get no suggestion.
+    """
+    table = shape.model._meta.db_table
+    issues = {finding.issue for finding in findings if finding.table in (None, table)}
+    if shape.search or not issues & {FULL_SCAN, SORT}:
+        return None
+    fields = tuple(shape.filters) + tuple(_ordering_field(field) for field in shape.ordering)
+    if not fields or (SORT not in issues and not shape.filters):
+        return None
+    if is_covered(shape.model, _columns(shape.model, fields)):
+        return None
+    return fields
+
+
+def ignores_index(shape: QueryShape, findings: list[Finding]) -> bool:
+    """Whether the plan still sorts although an index matches the ordering (e.g. because of a GROUP BY)."""
+    if shape.search or not shape.ordering or SORT not in {finding.issue for finding in findings}:
+        return False
+    fields = tuple(shape.filters) + tuple(_ordering_field(field) for field in shape.ordering)
+    return is_covered(shape.model, _columns(shape.model, fields))
+
+
+def index_name(model: type[models.Model], fields: tuple[str, ...]) -> str:
+    """Name in the style of the existing indexes (``todo_created_at_id_idx``), at most 30 characters."""
+    name = f'{model._meta.model_name}_{"_".join(fields)}_idx'
+    if len(name) <= 30:
+        return name
+    digest = hashlib.sha1(name.encode()).hexdigest()[:6]
+    return f'{name[:19]}_{digest}_idx'
+
+
+def inspect_shape(client: Client, shape: QueryShape) -> ShapeReport:
+    recorder = _Recorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        response = client.get(shape.path)
+    if response.status_code >= 400:
+        raise AssertionError(f'{shape.name} answered {response.status_code}: {response.content[:300]!r}')
+
+    tables = {model._meta.db_table for model in apps.get_models()}
+    findings = []
+    for alias, sql, params in recorder.statements:
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            continue
+        plan = explain(alias, sql, params)
+        vendor = connections[alias].vendor
+        findings += [
+            Finding(issue, table, sql, plan)
+            for issue, table in analyze_plan(vendor, plan)
+            # Scans of subqueries and constant rows are not about indexes
+            if issue != FULL_SCAN or table in tables
+        ]
+    return ShapeReport(shape, len(recorder.statements), findings, suggest_index(shape, findings))
+
+
+def advise(filter_values: Optional[dict[str, Any]] = None) -> list[ShapeReport]:
+    """Inspect every shape, with the response cache off so that every request reaches the database."""
+    client = Client(HTTP_HOST='localhost')
+    with override_settings(API_CACHE={'ENABLED': False}):
+        return [inspect_shape(client, shape) for shape in query_shapes(filter_values or {})]
+
+
+def suggested_indexes(reports: list[ShapeReport]) -> dict[type[models.Model], list[models.Index]]:
+    """Distinct suggested indexes per model, without those made redundant by a longer one."""
+    by_model: dict[type[models.Model], list[tuple[str, ...]]] = {}
+    for report in reports:
+        if report.suggestion:
+            by_model.setdefault(report.shape.model, []).append(report.suggestion)
+    indexes = {}
+    for model, suggestions in by_model.items():
+        kept = [
+            fields for fields in dict.fromkeys(suggestions)
+            if not any(other != fields and other[:len(fields)] == fields for other in suggestions)
+        ]
+        indexes[model] = [models.Index(fields=list(fields), name=index_name(model, fields)) for fields in kept]
+    return indexes
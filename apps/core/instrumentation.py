@@ -0,0 +1,295 @@
+"""
+Per-request timing instrumentation.
+
+`RequestTimingMiddleware` measures a sample of the requests: number of SQL queries
+and time spent in the database (through ``connection.execute_wrapper``), time of the
+view, of the serialization, of the note status cascades and of the rendering.
+The figures are sent as a ``Server-Timing`` header (shown by the browser dev tools),
+only with ``DEBUG`` or to staff users since it exposes the internals of the request,
+and logged as one structured loguru line.
+
+Code paths are timed with ``timed_phase(name)``; outside of a sampled request it
+does nothing, so the instrumented code costs a context variable lookup.
+
+Queries are observed with ``observe_queries(wrapper)`` rather than directly with
+``connection.execute_wrapper``: database connections are per thread, and under ASGI
+the ORM runs in another thread than the middleware. A dispatcher installed on every
+connection calls the wrappers registered in the current context, which follows the
+request into ``sync_to_async`` threads.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import partial
+from typing import Any, Callable, Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase
+from loguru import logger
+
+# Phases reported in the Server-Timing header, in this order
+PHASES = ('view', 'serialize', 'note_status', 'render')
+
+
+def _settings() -> dict[str, Any]:
+    return {
+        'ENABLED': True,
+        'SAMPLE_RATE': 0.01,
+        'HEADER': True,
+        'LOG': False,
+        **getattr(settings, 'REQUEST_TIMING', {}),
+    }
+
+
+class RequestTimings:
+    """Counters of one sampled request."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.phases: dict[str, float] = {}
+        self._active: set[str] = set()
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        """Database execute wrapper: counts the queries and their time."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += time.perf_counter() - started
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        # Nested blocks of the same phase (e.g. nested serializers) are counted once
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard(name)
+            self.add(name, time.perf_counter() - started)
+
+    def summary(self) -> dict[str, Any]:
+        """Durations in milliseconds."""
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'db_ms': round(self.db * 1000, 3),
+            'queries': self.queries,
+            **{f'{name}_ms': round(self.phases.get(name, 0.0) * 1000, 3) for name in PHASES},
+        }
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+# Execute wrappers of the current request, outermost first
+_query_observers: ContextVar[tuple[Callable, ...]] = ContextVar('query_observers', default=())
+
+
+def _dispatch_to_observers(execute: Callable, sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+    observers = _query_observers.get()
+    for observer in reversed(observers):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatcher(sender: Any, connection: Any, **kwargs: Any) -> None:
+    """``connection_created`` receiver adding the dispatcher to the connection's execute wrappers."""
+    if _dispatch_to_observers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch_to_observers)
+
+
+def start_observing(wrapper: Callable) -> Token:
+    """Run ``wrapper`` (an execute wrapper) around the queries of the current context, whichever thread runs them."""
+    return _query_observers.set((*_query_observers.get(), wrapper))
+
+
+def stop_observing(token: Token) -> None:
+    _query_observers.reset(token)
+
+
+@contextmanager
+def observe_queries(wrapper: Callable) -> Iterator[None]:
+    token = start_observing(wrapper)
+    try:
+        yield
+    finally:
+        stop_observing(token)
+
+
+class AsyncCapableMiddleware:
+    """
+    Base of the middlewares usable in both modes: under ASGI they stay in the event loop
+    instead of being run in a thread. Subclasses implement ``before`` and ``after``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]) -> None:
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> Any:
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.before(request)
+        if state is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.release(state)
+        return self.after(request, response, state)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        state = self.before(request)
+        if state is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.release(state)
+        return self.after(request, response, state)
+
+    def before(self, request: HttpRequest) -> Any:
+        """Start measuring; returns a state for ``after``, or None to skip the request."""
+        raise NotImplementedError
+
+    def release(self, state: Any) -> None:
+        """Undo ``before``, even when the view raised."""
+
+    def after(self, request: HttpRequest, response: HttpResponseBase, state: Any) -> HttpResponseBase:
+        return response
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being measured, or None when it is not sampled."""
+    return _current.get()
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    """Add the duration of the block to phase ``name`` of the current request, if sampled."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+
+class TimedSerializerMixin:
+    """Serializer mixin adding ``to_representation`` to the ``serialize`` phase."""
+
+    def to_representation(self, instance: Any) -> Any:
+        with timed_phase('serialize'):
+            return super().to_representation(instance)
+
+
+def server_timing(summary: dict[str, Any]) -> str:
+    metrics = [f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries"']
+    metrics += [f'{name};dur={summary[f"{name}_ms"]}' for name in PHASES if summary[f'{name}_ms']]
+    metrics.append(f'total;dur={summary["total_ms"]}')
+    return ', '.join(metrics)
+
+
+class RequestTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Time a sample of the requests (``REQUEST_TIMING['SAMPLE_RATE']``, 0 to 1).
+    The view phase runs from ``process_view`` until the response is returned;
+    rendering of template responses (DRF included) happens afterwards.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]) -> None:
+        super().__init__(get_response)
+        if self.is_async:
+            # Coroutine hooks, so that Django does not run them in a thread
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def before(self, request: HttpRequest) -> Optional[tuple[Any, ...]]:
+        options = _settings()
+        if not options['ENABLED'] or random.random() >= options['SAMPLE_RATE']:
+            return None
+        timings = RequestTimings()
+        return options, timings, _current.set(timings), start_observing(timings)
+
+    def release(self, state: tuple[Any, ...]) -> None:
+        stop_observing(state[3])
+        _current.reset(state[2])
+
+    def after(self, request: HttpRequest, response: HttpResponseBase, state: tuple[Any, ...]) -> HttpResponseBase:
+        options, timings = state[:2]
+        self.end_view(request, timings)
+        summary = timings.summary()
+        if options['HEADER'] and self.may_see_timings(request):
+            response['Server-Timing'] = server_timing(summary)
+        if options['LOG']:
+            self.log(request, response, summary)
+        return response
+
+    @staticmethod
+    def may_see_timings(request: HttpRequest) -> bool:
+        """The header is for developers: any client with DEBUG, staff users otherwise."""
+        if settings.DEBUG:
+            return True
+        # Set by the authentication middleware (and by DRF authentication) once the view has run
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args: Any, view_kwargs: Any) -> None:
+        request._timing_view_started = time.perf_counter()
+
+    async def aprocess_view(self, request: HttpRequest, view_func: Callable, view_args: Any, view_kwargs: Any) -> None:
+        request._timing_view_started = time.perf_counter()
+
+    def process_template_response(self, request: HttpRequest, response: HttpResponseBase) -> HttpResponseBase:
+        # Called right before the response is rendered
+        self.start_render(request)
+        return response
+
+    async def aprocess_template_response(self, request: HttpRequest, response: HttpResponseBase) -> HttpResponseBase:
+        self.start_render(request)
+        return response
+
+    def start_render(self, request: HttpRequest) -> None:
+        timings = _current.get()
+        if timings is not None:
+            self.end_view(request, timings)
+            request._timing_render_started = time.perf_counter()
+
+    def end_view(self, request: HttpRequest, timings: RequestTimings) -> None:
+        """Close the view phase, or the render phase once a template response is rendered."""
+        now = time.perf_counter()
+        render_started = getattr(request, '_timing_render_started', None)
+        view_started = getattr(request, '_timing_view_started', None)
+        if view_started is not None:
+            del request._timing_view_started
+            timings.add('view', now - view_started)
+        elif render_started is not None:
+            timings.add('render', now - render_started)
+
+    def log(self, request: HttpRequest, response: HttpResponseBase, summary: dict[str, Any]) -> None:
+        match = request.resolver_match
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **summary,
+        }
+        logger.bind(request_timing=fields).info(
+            '{method} {path} {status} in {total_ms} ms ({queries} queries, {db_ms} ms SQL)', **fields
+        )
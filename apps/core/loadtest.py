@@ -0,0 +1,384 @@
+"""
+Concurrent HTTP load generator for a running instance of the API.
+
+A schedule of requests (weighted random mix or recorded replay) is dispatched at a
+target rate to a pool of worker threads. Latencies are measured from the *scheduled*
+start of each request, so a saturated server shows up as growing latency instead of
+a silently lower request rate. Used by the ``load_api`` management command.
+"""
+import importlib.util
+import json
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+from apps.core.benchmark import percentile
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_PLACEHOLDER = re.compile(r'^\{(\w+)\}$')
+
+
+class RequestSpec(NamedTuple):
+    """A request template. ``path`` and ``body`` may hold ``{placeholders}``, see `LoadRunner.fill`."""
+
+    name: str
+    method: str
+    path: str
+    body: Optional[dict[str, Any]] = None
+    weight: float = 1.0
+
+
+class ScheduledRequest(NamedTuple):
+    # Seconds since the start of the run, or None to send as soon as a worker is free
+    at: Optional[float]
+    spec: RequestSpec
+
+
+# Default mix: mostly reads, with writes hitting shared notes to exercise the counter updates
+DEFAULT_MIX = (
+    RequestSpec('todos-list', 'GET', '/api/todos/', weight=25),
+    RequestSpec('notes-list', 'GET', '/api/notes/', weight=10),
+    RequestSpec('notes-retrieve', 'GET', '/api/notes/{note_id}/', weight=15),
+    RequestSpec('todos-retrieve', 'GET', '/api/todos/{todo_id}/', weight=10),
+    RequestSpec('todos-search', 'GET', '/api/todos/?search=projet', weight=5),
+    RequestSpec('todos-by-note', 'GET', '/api/todos/by-note/?note={note_id}', weight=5),
+    RequestSpec('todos-create', 'POST', '/api/todos/', {'title': 'Load test', 'note': '{note_id}'}, weight=12),
+    RequestSpec('todos-update', 'PATCH', '/api/todos/{todo_id}/', {'status': '{todo_status}'}, weight=12),
+    RequestSpec('todos-delete', 'DELETE', '/api/todos/{created_todo_id}/', weight=6),
+)
+
+# Reads only, served by both the synchronous endpoints and the async ones (`config.api.async_views`)
+READ_MIX = (
+    RequestSpec('todos-list', 'GET', '/api/todos/', weight=25),
+    RequestSpec('notes-list', 'GET', '/api/notes/', weight=10),
+    RequestSpec('notes-retrieve', 'GET', '/api/notes/{note_id}/', weight=15),
+    RequestSpec('todos-retrieve', 'GET', '/api/todos/{todo_id}/', weight=10),
+    RequestSpec('todos-by-note', 'GET', '/api/todos/by-note/?note={note_id}', weight=5),
+)
+ASYNC_READ_MIX = tuple(
+    spec._replace(name=f'async-{spec.name}', path=spec.path.replace('/api/', '/api/async/', 1)) for spec in READ_MIX
+)
+
+# Mixes selectable by name with ``load_api --mix``
+MIXES = {
+    'default': DEFAULT_MIX,
+    'read': READ_MIX,
+    'async-read': ASYNC_READ_MIX,
+}
+
+TODO_STATUSES = ('pending', 'in_progress', 'completed')
+
+
+def load_mix(path: str) -> list[RequestSpec]:
+    """A mix of `MIXES` by name, else read a JSON list of ``{name, method, path, body, weight}`` objects."""
+    if path in MIXES:
+        return list(MIXES[path])
+    with open(path, encoding='utf-8') as handle:
+        return [RequestSpec(**{'body': None, 'weight': 1.0, **item}) for item in json.load(handle)]
+
+
+def mix_schedule(
+    mix: Iterable[RequestSpec],
+    seed: int,
+    rps: Optional[float],
+    total: Optional[int] = None,
+) -> Iterator[ScheduledRequest]:
+    """Weighted random requests, evenly spaced at ``rps`` (as fast as possible without it)."""
+    mix = list(mix)
+    rng = random.Random(seed)
+    weights = [spec.weight for spec in mix]
+    index = 0
+    while total is None or index < total:
+        yield ScheduledRequest(index / rps if rps else None, rng.choices(mix, weights=weights)[0])
+        index += 1
+
+
+def replay_schedule(path: str, rps: Optional[float], speed: float) -> Iterator[ScheduledRequest]:
+    """
+    Requests recorded as NDJSON (``{at, name, method, path, body}``, as written by ``load_api --record``),
+    sent at their recorded offsets divided by ``speed``, or evenly spaced at ``rps``.
+    """
+    with open(path, encoding='utf-8') as handle:
+        for index, line in enumerate(line for line in handle if line.strip()):
+            item = json.loads(line)
+            if rps:
+                at = index / rps
+            elif item.get('at') is not None:
+                at = item['at'] / speed
+            else:
+                at = None
+            yield ScheduledRequest(at, RequestSpec(
+                item.get('name') or f"{item['method']} {item['path']}",
+                item['method'],
+                item['path'],
+                item.get('body'),
+            ))
+
+
+class Results:
+    """Thread-safe collector of the outcome of every request, per request name."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, Counter] = {}
+        self.locked: Counter = Counter()
+        self.skipped = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    def add(self, name: str, status: int, latency_ms: float, locked: bool) -> None:
+        with self._lock:
+            self.latencies.setdefault(name, []).append(latency_ms)
+            self.statuses.setdefault(name, Counter())[status] += 1
+            if locked:
+                self.locked[name] += 1
+
+    def skip(self) -> None:
+        with self._lock:
+            self.skipped += 1
+
+    def summary(self) -> dict[str, Any]:
+        elapsed = (self.finished or time.monotonic()) - self.started
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        total = len(all_latencies)
+        endpoints = {}
+        for name, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[name]
+            endpoints[name] = {
+                'requests': len(latencies),
+                'errors': sum(count for status, count in statuses.items() if status == 0 or status >= 500),
+                'lock_failures': self.locked[name],
+                'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+                **latency_summary(latencies),
+            }
+        errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+        return {
+            'duration_s': round(elapsed, 3),
+            'requests': total,
+            'skipped': self.skipped,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else None,
+            'error_rate': round(errors / total, 4) if total else None,
+            'lock_failures': sum(self.locked.values()),
+            **latency_summary(all_latencies),
+            'histogram': histogram(all_latencies),
+            'endpoints': endpoints,
+        }
+
+
+def latency_summary(latencies: list[float]) -> dict[str, Optional[float]]:
+    if not latencies:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    return {
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+def histogram(latencies: list[float]) -> dict[str, int]:
+    """Number of requests per latency bucket, keyed by the bucket upper bound (``le``)."""
+    counts = Counter()
+    for value in latencies:
+        bound = next((bucket for bucket in LATENCY_BUCKETS if value <= bucket), None)
+        counts['+Inf' if bound is None else str(bound)] += 1
+    return {str(bound): counts[str(bound)] for bound in LATENCY_BUCKETS} | {'+Inf': counts['+Inf']}
+
+
+class LoadRunner:
+    """Send scheduled requests to ``base_url`` from ``workers`` threads."""
+
+    def __init__(self, base_url: str, workers: int, timeout: float = 30.0, seed: int = 42) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.workers = workers
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.note_ids: list[int] = []
+        self.todo_ids: list[int] = []
+        # Todos created by the run, consumed by {created_todo_id}
+        self.created_todo_ids: deque[int] = deque()
+        self.recorded: Optional[list[dict[str, Any]]] = None
+
+    def send(self, method: str, path: str, body: Optional[dict[str, Any]] = None) -> tuple[int, bytes]:
+        """Send one request; returns (status, body), status 0 for a connection failure."""
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            method=method,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+        except (urllib.error.URLError, OSError):
+            return 0, b''
+
+    def discover_ids(self, pages: int = 5) -> None:
+        """Collect existing note and todo ids by walking a few cursor pages."""
+        for path, ids in (('/api/notes/?pagination=cursor', self.note_ids), ('/api/todos/?pagination=cursor', self.todo_ids)):
+            for _ in range(pages):
+                status, content = self.send('GET', path)
+                if status != 200:
+                    break
+                page = json.loads(content)
+                ids.extend(item['id'] for item in page['results'])
+                if not page.get('next'):
+                    break
+                path = page['next'][len(self.base_url):] if page['next'].startswith(self.base_url) else page['next']
+
+    def fill(self, template: Any) -> Any:
+        """
+        Replace the placeholders of a path or body: ``{note_id}``, ``{todo_id}`` (random
+        existing rows), ``{todo_status}`` and ``{created_todo_id}`` (a todo created by this run).
+        A value made of a single placeholder keeps the type of its replacement.
+        Raises LookupError when no value is available.
+        """
+        if isinstance(template, dict):
+            return {key: self.fill(value) for key, value in template.items()}
+        if not isinstance(template, str) or '{' not in template:
+            return template
+        match = _PLACEHOLDER.match(template)
+        if match:
+            return self.value(match.group(1))
+        return re.sub(r'\{(\w+)\}', lambda found: str(self.value(found.group(1))), template)
+
+    def value(self, name: str) -> Any:
+        if name == 'created_todo_id':
+            try:
+                return self.created_todo_ids.popleft()
+            except IndexError:
+                raise LookupError(name)
+        with self.rng_lock:
+            if name == 'note_id' and self.note_ids:
+                return self.rng.choice(self.note_ids)
+            if name == 'todo_id' and self.todo_ids:
+                return self.rng.choice(self.todo_ids)
+            if name == 'todo_status':
+                return self.rng.choice(TODO_STATUSES)
+        raise LookupError(name)
+
+    def execute(self, scheduled: ScheduledRequest, start: float, results: Results) -> None:
+        spec = scheduled.spec
+        try:
+            path, body = self.fill(spec.path), self.fill(spec.body)
+        except LookupError:
+            results.skip()
+            return
+        # Latency counts from the scheduled time: queueing delays are part of it
+        began = start + scheduled.at if scheduled.at is not None else time.monotonic()
+        status, content = self.send(spec.method, path, body)
+        latency_ms = (time.monotonic() - began) * 1000
+
+        locked = False
+        payload = None
+        if content and status:
+            try:
+                payload = json.loads(content)
+            except ValueError:
+                pass
+        if isinstance(payload, dict):
+            locked = payload.get('code') == 'database_locked'
+            if status == 201 and spec.method == 'POST' and path.startswith('/api/todos/') and 'id' in payload:
+                self.created_todo_ids.append(payload['id'])
+        results.add(spec.name, status, latency_ms, locked)
+
+        if self.recorded is not None:
+            self.recorded.append({
+                'at': round(began - start, 4), 'name': spec.name, 'method': spec.method, 'path': path, 'body': body,
+            })
+
+    def run(
+        self,
+        schedule: Iterable[ScheduledRequest],
+        duration: Optional[float] = None,
+        record: bool = False,
+    ) -> Results:
+        """Dispatch the schedule (for at most ``duration`` seconds) and wait for the pending requests."""
+        results = Results()
+        self.recorded = [] if record else None
+        # Bounds the number of requests waiting for a worker in closed-loop mode
+        slots = threading.Semaphore(self.workers)
+
+        def task(scheduled: ScheduledRequest) -> None:
+            try:
+                self.execute(scheduled, start, results)
+            finally:
+                if scheduled.at is None:
+                    slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            start = time.monotonic()
+            results.started = start
+            for scheduled in schedule:
+                if duration is not None and max(scheduled.at or 0, time.monotonic() - start) >= duration:
+                    break
+                if scheduled.at is None:
+                    slots.acquire()
+                else:
+                    delay = start + scheduled.at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(task, scheduled)
+        results.finished = time.monotonic()
+        return results
+
+
+# Local servers: name -> (module that must be importable, command line builder)
+SERVERS = {
+    'runserver': (None, lambda host, port, processes: [
+        sys.executable, 'manage.py', 'runserver', '--noreload', f'{host}:{port}',
+    ]),
+    'gunicorn': ('gunicorn', lambda host, port, processes: [
+        sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+        '--bind', f'{host}:{port}', '--workers', str(processes), '--threads', '4',
+    ]),
+    'uvicorn': ('uvicorn', lambda host, port, processes: [
+        sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+        '--host', host, '--port', str(port), '--workers', str(processes),
+    ]),
+}
+
+
+def server_available(kind: str) -> bool:
+    module = SERVERS[kind][0]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def start_server(kind: str, host: str, port: int, processes: int = 1, wait: float = 30.0) -> subprocess.Popen:
+    """Start a local server and wait for ``/api/health/`` to answer."""
+    process = subprocess.Popen(
+        SERVERS[kind][1](host, port, processes), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    runner = LoadRunner(f'http://{host}:{port}', workers=1, timeout=1.0)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{kind} exited with code {process.returncode}')
+        if runner.send('GET', '/api/health/')[0] == 200:
+            return process
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{kind} did not answer within {wait:.0f}s')
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
@@ -0,0 +1,93 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import migrations
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from apps.core.index_advisor import advise, ignores_index, suggested_indexes
+from apps.notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute EXPLAIN sur chaque forme de requête exposée par l'API (tris, recherche, curseur, "
+        "filtres) et signale les parcours complets et les tris, avec les index composites à ajouter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plans", action="store_true", help="Affiche le SQL et le plan des requêtes signalées.")
+        parser.add_argument(
+            "--write-migration",
+            action="store_true",
+            help="Écrit une migration AddIndex par application pour les index suggérés.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Échoue si un index est suggéré (pour la CI).",
+        )
+
+    def handle(self, *args, **options):
+        # An existing note, so that the filtered shapes read real rows
+        note_id = Note.objects.order_by("pk").values_list("pk", flat=True).first() or 1
+        reports = advise({"note": note_id})
+
+        for report in reports:
+            issues = sorted({f"{finding.issue} ({finding.table})" if finding.table else finding.issue
+                             for finding in report.findings})
+            line = f"{report.shape.name:<45} {report.queries} requêtes  "
+            if not issues:
+                self.stdout.write(line + self.style.SUCCESS("OK"))
+            else:
+                self.stdout.write(line + self.style.WARNING(", ".join(issues)))
+            if report.suggestion:
+                self.stdout.write(f"    → index suggéré sur {report.shape.model.__name__}({', '.join(report.suggestion)})")
+            elif ignores_index(report.shape, report.findings):
+                self.stdout.write("    → un index couvre ce tri mais le plan ne l'utilise pas (GROUP BY, jointure)")
+            if options["plans"]:
+                for finding in report.findings:
+                    self.stdout.write(f"    SQL : {finding.sql}")
+                    for plan_line in finding.plan:
+                        self.stdout.write(f"      {plan_line}")
+
+        indexes = suggested_indexes(reports)
+        self.stdout.write("")
+        if not indexes:
+            self.stdout.write(self.style.SUCCESS("Aucun index à ajouter ✅"))
+            return
+
+        self.stdout.write("Index à déclarer dans Meta.indexes :")
+        for model, model_indexes in indexes.items():
+            self.stdout.write(f"  {model._meta.label}")
+            for index in model_indexes:
+                self.stdout.write(f"    models.Index(fields={index.fields!r}, name={index.name!r}),")
+
+        if options["write_migration"]:
+            for path in self.write_migrations(indexes):
+                self.stdout.write(self.style.SUCCESS(f"Migration écrite : {path}"))
+            self.stdout.write("Ajoutez les mêmes index à Meta.indexes pour que makemigrations reste vide.")
+
+        if options["check"]:
+            raise CommandError(f"{sum(map(len, indexes.values()))} index suggéré(s).")
+
+    def write_migrations(self, indexes):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        by_app = {}
+        for model, model_indexes in indexes.items():
+            by_app.setdefault(model._meta.app_label, []).extend(
+                migrations.AddIndex(model_name=model._meta.model_name, index=index) for index in model_indexes
+            )
+
+        paths = []
+        for app_label, operations in by_app.items():
+            leaf = loader.graph.leaf_nodes(app_label)[0]
+            number = int(leaf[1].split("_", 1)[0]) + 1
+            migration = migrations.Migration(f"{number:04d}_advised_indexes", app_label)
+            migration.dependencies = [leaf]
+            migration.operations = operations
+            writer = MigrationWriter(migration)
+            with open(writer.path, "w", encoding="utf-8") as handle:
+                handle.write(writer.as_string())
+            paths.append(os.path.relpath(writer.path))
+        return paths
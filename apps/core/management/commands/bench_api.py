@@ -0,0 +1,143 @@
+import json
+import platform
+from io import StringIO
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.core.benchmark import COMPARED_METRICS, SCENARIOS, BenchContext, compare, run_scenario
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les endpoints de l'API (latence p50/p95/p99, requêtes SQL, mémoire) sur un jeu "
+        "de données généré dans une base de test, et compare à une référence JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notes", type=int, default=1000, help="Nombre de notes générées.")
+        parser.add_argument("--todos-per-note", type=int, default=5, help="Nombre moyen de todos par note.")
+        parser.add_argument("--orphans", type=int, default=500, help="Nombre de todos sans note.")
+        parser.add_argument("--seed", type=int, default=42, help="Graine du jeu de données et des scénarios.")
+        parser.add_argument("--iterations", type=int, default=50, help="Requêtes mesurées par scénario.")
+        parser.add_argument("--warmup", type=int, default=5, help="Requêtes d'échauffement par scénario.")
+        parser.add_argument(
+            "--instrumented",
+            type=int,
+            default=3,
+            help="Requêtes rejouées avec comptage SQL et tracemalloc par scénario.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            choices=[scenario.name for scenario in SCENARIOS],
+            help="Limite la mesure à ce scénario (option répétable).",
+        )
+        parser.add_argument("--cache", action="store_true", help="Laisse le cache des réponses actif.")
+        parser.add_argument("--output", help="Fichier JSON où écrire les résultats.")
+        parser.add_argument("--baseline", help="Résultats JSON de référence à comparer.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=20.0,
+            help="Hausse tolérée (en %%) de p50/p95 par rapport à la référence.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations doit être positif.")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as handle:
+                baseline = json.load(handle)
+
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options["scenarios"] or scenario.name in options["scenarios"]
+        ]
+
+        # Never touch the real data: everything happens in a throw-away test database
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            call_command(
+                "seed_synthetic",
+                notes=options["notes"],
+                todos_per_note=options["todos_per_note"],
+                orphans=options["orphans"],
+                seed=options["seed"],
+                stdout=self.stdout if options["verbosity"] > 1 else StringIO(),
+            )
+            api_cache = {**getattr(settings, "API_CACHE", {}), "ENABLED": options["cache"]}
+            with override_settings(API_CACHE=api_cache):
+                context = BenchContext(options["seed"], settings.REST_FRAMEWORK["PAGE_SIZE"])
+                client = Client()
+                results = {
+                    "created_at": datetime.now(dt_timezone.utc).isoformat(),
+                    "environment": {
+                        "python": platform.python_version(),
+                        "django": django.get_version(),
+                        "database": connection.vendor,
+                    },
+                    "dataset": {
+                        key: options[key] for key in ("notes", "todos_per_note", "orphans", "seed")
+                    },
+                    "scenarios": {},
+                }
+                for scenario in scenarios:
+                    results["scenarios"][scenario.name] = run_scenario(
+                        scenario,
+                        context,
+                        client,
+                        iterations=options["iterations"],
+                        warmup=options["warmup"],
+                        instrumented=options["instrumented"],
+                    )
+                    self.write_row(scenario.name, results["scenarios"][scenario.name])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                json.dump(results, handle, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
+
+        if baseline is not None:
+            self.check_baseline(results, baseline, options["threshold"])
+
+    def write_row(self, name, metrics):
+        self.stdout.write(
+            f"{name:<26} {metrics['method']:<6} p50 {metrics['p50_ms']:>8.2f} ms  "
+            f"p95 {metrics['p95_ms']:>8.2f} ms  p99 {metrics['p99_ms']:>8.2f} ms  "
+            f"{metrics['queries']} req. SQL  {metrics['peak_memory_kib']} Kio  "
+            f"{metrics['status_codes']}"
+        )
+
+    def check_baseline(self, results, baseline, threshold):
+        regressions = []
+        for name, changes in compare(results, baseline).items():
+            self.stdout.write(
+                f"{name:<26} " + "  ".join(
+                    f"{metric} {'n/a' if change is None else f'{change:+.1f}%'}"
+                    for metric, change in changes.items()
+                )
+            )
+            for metric in COMPARED_METRICS:
+                change = changes[metric]
+                if change is None:
+                    continue
+                # Query counts must never grow; timings get some slack for noise
+                if (metric == "queries" and change > 0) or (metric in ("p50_ms", "p95_ms") and change > threshold):
+                    regressions.append(f"{name} {metric} {change:+.1f}%")
+
+        if regressions:
+            raise CommandError("Régressions par rapport à la référence : " + ", ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Aucune régression par rapport à la référence ✅"))
@@ -0,0 +1,228 @@
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+from typing import Any, Iterator, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from apps.core.cache import bump_generation
+from apps.core.models import ImportCheckpoint
+from apps.core.sqlite_tuning import write_transaction
+from apps.notes.models import Note, NoteStatus
+from apps.todos.models import Todo, TodoStatus, suspend_note_counter_signals, todo_count_deltas
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe en masse des notes et des todos depuis un fichier NDJSON ou CSV. "
+        "Une ligne par enregistrement : type (note|todo), ref, title, content, description, "
+        "status, note_ref (ref d'une note) ou note (id existant)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier à importer (`-` pour l'entrée standard).")
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="Format du fichier (déduit de l'extension par défaut).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Nombre de lignes insérées par transaction.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Clé du point de reprise, enregistré en base (par défaut le chemin absolu du fichier).",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Reprend un import interrompu après le dernier lot validé.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Abandonne le point de reprise d'un import interrompu et recommence au début.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size doit être positif.")
+        input_format = options["format"] or ("csv" if path.lower().endswith(".csv") else "ndjson")
+
+        if options["resume"] and options["restart"]:
+            raise CommandError("--resume et --restart sont incompatibles.")
+        checkpoint_key = options["checkpoint"] or (None if path == "-" else os.path.abspath(path))
+        checkpoint = self.load_checkpoint(checkpoint_key, options["resume"], options["restart"])
+        offset = checkpoint.offset if checkpoint else 0
+
+        started = time.monotonic()
+        imported = 0
+        changed = 0
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        try:
+            records = islice(self.read_records(stream, input_format), offset, None)
+            line = offset
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                changed += self.import_batch(batch, first_line=line + 1, checkpoint=checkpoint)
+                line += len(batch)
+                imported += len(batch)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{line} lignes importées ({imported / elapsed:.0f} lignes/s)", ending="\r"
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        bump_generation(Note._meta.label, Todo._meta.label)
+
+        if checkpoint:
+            checkpoint.delete()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write("")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import terminé ✅  Lignes: {imported} en {elapsed:.1f}s "
+                f"({imported / elapsed if elapsed else 0:.0f} lignes/s), statuts recalculés: {changed}"
+            )
+        )
+
+    def read_records(self, stream, input_format: str) -> Iterator[dict[str, Any]]:
+        if input_format == "csv":
+            for record in csv.DictReader(stream):
+                yield {key: value for key, value in record.items() if value not in (None, "")}
+            return
+        for number, raw in enumerate(stream, start=1):
+            if not raw.strip():
+                continue
+            try:
+                yield json.loads(raw)
+            except ValueError as exc:
+                raise CommandError(f"Ligne {number} : JSON invalide ({exc}).")
+
+    @write_transaction()
+    def import_batch(
+        self,
+        batch: list[dict[str, Any]],
+        first_line: int,
+        checkpoint: Optional[ImportCheckpoint] = None,
+    ) -> int:
+        """
+        Insert one batch: notes first, then todos with their note references resolved
+        by a single query, then the note counters in one statement per distinct delta,
+        and the status of the notes whose counters moved in one more statement: a note
+        imported without todos keeps its imported status.
+        The checkpoint moves past the batch in the same transaction, so a resumed import
+        never replays a committed batch.
+        Returns the number of notes whose status changed.
+        """
+        notes, todo_records = [], []
+        for line, record in enumerate(batch, start=first_line):
+            kind = record.get("type")
+            if kind == "note":
+                notes.append(self.build_note(record, line))
+            elif kind == "todo":
+                todo_records.append((line, record))
+            else:
+                raise CommandError(f"Ligne {line} : type inconnu {kind!r} (attendu : note ou todo).")
+
+        # Already imported notes (e.g. replayed batch) are skipped thanks to their unique reference
+        Note.objects.bulk_create(notes, ignore_conflicts=True)
+
+        refs = {str(record["note_ref"]) for _, record in todo_records if record.get("note_ref")}
+        ids = {self.parse_note_id(record, line) for line, record in todo_records if record.get("note")}
+        note_ids = {}
+        known_ids = set()
+        if refs or ids:
+            for pk, external_ref in Note.objects.filter(
+                Q(external_ref__in=refs) | Q(pk__in=ids)
+            ).values_list("pk", "external_ref"):
+                known_ids.add(pk)
+                if external_ref is not None:
+                    note_ids[external_ref] = pk
+
+        todos = []
+        for line, record in todo_records:
+            todo = self.build_todo(record, line)
+            if record.get("note_ref"):
+                todo.note_id = note_ids.get(str(record["note_ref"]))
+                if todo.note_id is None:
+                    raise CommandError(f"Ligne {line} : note {record['note_ref']!r} introuvable.")
+            elif record.get("note"):
+                todo.note_id = self.parse_note_id(record, line)
+                if todo.note_id not in known_ids:
+                    raise CommandError(f"Ligne {line} : note {todo.note_id} introuvable.")
+            todos.append(todo)
+
+        with suspend_note_counter_signals():
+            Todo.objects.bulk_create(todos)
+        touched = Note.apply_todo_count_deltas(
+            todo_count_deltas((None, (todo.note_id, todo.status)) for todo in todos),
+            refresh_status=False,
+        )
+        if checkpoint is not None:
+            checkpoint.offset = first_line - 1 + len(batch)
+            checkpoint.save(update_fields=["offset", "updated_at"])
+        return Note.refresh_statuses(touched) if touched else 0
+
+    def build_note(self, record: dict[str, Any], line: int) -> Note:
+        status = record.get("status") or NoteStatus.ACTIVE
+        if status not in NoteStatus.values:
+            raise CommandError(f"Ligne {line} : statut de note invalide {status!r}.")
+        if not record.get("title"):
+            raise CommandError(f"Ligne {line} : titre manquant.")
+        return Note(
+            title=record["title"],
+            content=record.get("content", ""),
+            status=status,
+            external_ref=str(record["ref"]) if record.get("ref") else None,
+        )
+
+    def build_todo(self, record: dict[str, Any], line: int) -> Todo:
+        status = record.get("status") or TodoStatus.PENDING
+        if status not in TodoStatus.values:
+            raise CommandError(f"Ligne {line} : statut de todo invalide {status!r}.")
+        if not record.get("title"):
+            raise CommandError(f"Ligne {line} : titre manquant.")
+        return Todo(title=record["title"], description=record.get("description", ""), status=status)
+
+    def parse_note_id(self, record: dict[str, Any], line: int) -> int:
+        try:
+            return int(record["note"])
+        except (TypeError, ValueError):
+            raise CommandError(f"Ligne {line} : identifiant de note invalide {record['note']!r}.")
+
+    def load_checkpoint(self, key: Optional[str], resume: bool, restart: bool) -> Optional[ImportCheckpoint]:
+        """The checkpoint of the import (None without a key, e.g. from stdin)."""
+        if key is None:
+            if resume:
+                raise CommandError("Aucun point de reprise trouvé.")
+            return None
+        checkpoint = ImportCheckpoint.objects.filter(key=key).first()
+        if resume:
+            if checkpoint is None:
+                raise CommandError("Aucun point de reprise trouvé.")
+            self.stdout.write(f"Reprise après la ligne {checkpoint.offset}.")
+            return checkpoint
+        if checkpoint is not None:
+            if not restart:
+                raise CommandError(
+                    f"Un import interrompu de {key} a laissé un point de reprise : "
+                    "relancez avec --resume, ou --restart pour recommencer au début."
+                )
+            checkpoint.delete()
+        return ImportCheckpoint.objects.create(key=key)
@@ -0,0 +1,141 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.loadtest import (
+    DEFAULT_MIX,
+    MIXES,
+    SERVERS,
+    LoadRunner,
+    load_mix,
+    mix_schedule,
+    replay_schedule,
+    server_available,
+    start_server,
+    stop_server,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge HTTP concurrent contre un serveur local (lancé par la commande ou déjà démarré) : "
+        "mélange pondéré ou rejeu de requêtes à un débit cible, avec débit, histogramme de latence, "
+        "taux d'erreur et échecs dus aux verrous de la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL du serveur visé.")
+        parser.add_argument(
+            "--server",
+            choices=list(SERVERS),
+            action="append",
+            help=(
+                "Démarre ce serveur local sur --url pendant le test (gunicorn/uvicorn s'ils sont installés). "
+                "Répété, rejoue la même charge sur chaque serveur et compare les résultats (ex. WSGI contre ASGI)."
+            ),
+        )
+        parser.add_argument("--processes", type=int, default=1, help="Processus du serveur démarré (gunicorn/uvicorn).")
+        parser.add_argument("--workers", type=int, default=8, help="Requêtes simultanées au maximum.")
+        parser.add_argument("--rps", type=float, help="Débit cible (requêtes/s) ; au plus vite par défaut.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Durée maximale du test (secondes).")
+        parser.add_argument("--requests", type=int, help="Nombre maximal de requêtes.")
+        parser.add_argument(
+            "--mix",
+            help=f"Mélange nommé ({', '.join(MIXES)}) ou fichier JSON : liste de {{name, method, path, body, weight}}.",
+        )
+        parser.add_argument("--replay", help="Requêtes NDJSON à rejouer (voir --record).")
+        parser.add_argument("--speed", type=float, default=1.0, help="Accélération du rejeu.")
+        parser.add_argument("--record", help="Enregistre les requêtes envoyées (NDJSON) pour les rejouer.")
+        parser.add_argument("--seed", type=int, default=42, help="Graine du mélange.")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Délai maximal d'une requête (secondes).")
+        parser.add_argument("--output", help="Fichier JSON où écrire les résultats.")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers doit être positif.")
+        if options["mix"] and options["replay"]:
+            raise CommandError("--mix et --replay sont incompatibles.")
+        servers = options["server"] or [None]
+        for server in servers:
+            if server and not server_available(server):
+                raise CommandError(f"{server} n'est pas installé.")
+        if len(servers) > 1 and options["record"]:
+            raise CommandError("--record n'accepte qu'un seul --server.")
+
+        summaries = {}
+        for index, server in enumerate(servers, start=1):
+            runner, results = self.run_load(server, options)
+            name = server or options["url"]
+            summaries[f"{name} #{index}" if name in summaries else name] = summary = results.summary()
+            self.write_summary(summary)
+
+        if options["record"]:
+            with open(options["record"], "w", encoding="utf-8") as handle:
+                for item in sorted(runner.recorded, key=lambda item: item["at"]):
+                    handle.write(json.dumps(item, ensure_ascii=False) + "\n")
+        if len(summaries) > 1:
+            self.write_comparison(summaries)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                output = summaries if len(summaries) > 1 else next(iter(summaries.values()))
+                json.dump(output, handle, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
+
+    def run_load(self, server, options):
+        """Run the load against ``options['url']``, on a local ``server`` started for the run if given."""
+        process = None
+        if server:
+            host, _, port = options["url"].split("://", 1)[-1].rstrip("/").partition(":")
+            try:
+                process = start_server(server, host, int(port or 80), options["processes"])
+            except RuntimeError as exc:
+                raise CommandError(f"Impossible de démarrer le serveur : {exc}")
+
+        try:
+            runner = LoadRunner(options["url"], options["workers"], options["timeout"], options["seed"])
+            runner.discover_ids()
+            if options["replay"]:
+                schedule = replay_schedule(options["replay"], options["rps"], options["speed"])
+            else:
+                mix = load_mix(options["mix"]) if options["mix"] else DEFAULT_MIX
+                schedule = mix_schedule(mix, options["seed"], options["rps"], options["requests"])
+            if options["requests"] and options["replay"]:
+                schedule = (item for index, item in zip(range(options["requests"]), schedule))
+
+            self.stdout.write(
+                f"Charge sur {options['url']}{f' ({server})' if server else ''} : {options['workers']} workers, "
+                f"{'%g req/s' % options['rps'] if options['rps'] else 'débit maximal'}..."
+            )
+            return runner, runner.run(schedule, duration=options["duration"], record=bool(options["record"]))
+        finally:
+            if process is not None:
+                stop_server(process)
+
+    def write_comparison(self, summaries):
+        self.stdout.write("")
+        self.stdout.write(f"{'Serveur':<12} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erreurs':>8}")
+        for name, summary in summaries.items():
+            self.stdout.write(
+                f"{name:<12} {summary['throughput_rps']!s:>9} {summary['p50_ms']!s:>9} {summary['p95_ms']!s:>9} "
+                f"{summary['p99_ms']!s:>9} {summary['error_rate']!s:>8}"
+            )
+
+    def write_summary(self, summary):
+        self.stdout.write(
+            f"{summary['requests']} requêtes en {summary['duration_s']}s : {summary['throughput_rps']} req/s, "
+            f"erreurs {summary['error_rate']}, verrous {summary['lock_failures']}, ignorées {summary['skipped']}"
+        )
+        self.stdout.write(
+            f"Latence p50 {summary['p50_ms']} ms  p95 {summary['p95_ms']} ms  "
+            f"p99 {summary['p99_ms']} ms  max {summary['max_ms']} ms"
+        )
+        peak = max(summary["histogram"].values(), default=0) or 1
+        for bound, count in summary["histogram"].items():
+            bar = "#" * round(40 * count / peak)
+            self.stdout.write(f"  <= {bound:>5} ms {count:>7} {bar}")
+        for name, endpoint in summary["endpoints"].items():
+            self.stdout.write(
+                f"{name:<18} {endpoint['requests']:>6} req  p50 {endpoint['p50_ms']} ms  "
+                f"p95 {endpoint['p95_ms']} ms  erreurs {endpoint['errors']}  verrous {endpoint['lock_failures']}  "
+                f"{endpoint['status_codes']}"
+            )
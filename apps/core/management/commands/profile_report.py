@@ -0,0 +1,64 @@
+import glob
+import os
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.profiling import format_stats, profiling_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Agrège les profils cProfile enregistrés par le middleware de profilage "
+        "(sans argument : liste les vues profilées)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("view", nargs="?", help="Vue profilée, ex. `notes-list.GET`.")
+        parser.add_argument("--last", type=int, default=0, help="N'agrège que les N derniers profils (0 : tous).")
+        parser.add_argument(
+            "--sort",
+            default=None,
+            help="Clé de tri pstats (cumulative, tottime, calls...).",
+        )
+        parser.add_argument("--limit", type=int, default=None, help="Nombre de fonctions affichées.")
+        parser.add_argument(
+            "--output",
+            help="Écrit le profil agrégé dans ce fichier .prof (snakeviz, flameprof, gprof2dot).",
+        )
+        parser.add_argument("--directory", help="Répertoire des profils (par défaut PROFILING['DIRECTORY']).")
+
+    def handle(self, *args, **options):
+        defaults = profiling_settings()
+        directory = options["directory"] or defaults["DIRECTORY"]
+
+        if not options["view"]:
+            views = sorted(
+                (name, len(glob.glob(os.path.join(directory, name, "*.prof"))))
+                for name in (os.listdir(directory) if os.path.isdir(directory) else [])
+            )
+            if not views:
+                self.stdout.write(f"Aucun profil dans {directory}.")
+            for name, count in views:
+                self.stdout.write(f"{name}  ({count} profils)")
+            return
+
+        # File names start with a nanosecond timestamp, so sorting them sorts by date
+        paths = sorted(glob.glob(os.path.join(directory, options["view"], "*.prof")))
+        if options["last"] > 0:
+            paths = paths[-options["last"]:]
+        if not paths:
+            raise CommandError(f"Aucun profil pour {options['view']} dans {directory}.")
+
+        stats = pstats.Stats(*paths)
+        if options["output"]:
+            stats.dump_stats(options["output"])
+            self.stdout.write(f"Profil agrégé écrit dans {options['output']}")
+        self.stdout.write(
+            format_stats(
+                stats,
+                options["sort"] or defaults["SORT"],
+                options["limit"] or defaults["LIMIT"],
+                title=f"{options['view']} : {len(paths)} requêtes agrégées",
+            )
+        )
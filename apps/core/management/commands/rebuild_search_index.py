@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.core.fulltext import SEARCHABLE_MODELS, create_fulltext_index, drop_fulltext_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Recrée l'index plein texte (FTS5 sur SQLite, tsvector sur PostgreSQL) "
+        "et le remplit à partir des données existantes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default="default",
+            help="Alias de la base de données à traiter.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        with connection.schema_editor() as schema_editor:
+            for label, fields in SEARCHABLE_MODELS.items():
+                table = apps.get_model(label)._meta.db_table
+                drop_fulltext_index(schema_editor, table)
+                create_fulltext_index(schema_editor, table, fields)
+                self.stdout.write(f"Index plein texte recréé pour {table}")
+
+        self.stdout.write(self.style.SUCCESS("Index de recherche prêts ✅"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.sqlite_tuning import write_transaction
+from apps.notes.models import Note
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de todos et le statut des notes, et corrige les écarts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--note",
+            action="append",
+            type=int,
+            dest="note_ids",
+            help="Limite la vérification à cette note (option répétable).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Nombre de notes mises à jour par requête.",
+        )
+
+    @write_transaction()
+    def handle(self, *args, **options):
+        repaired = Note.reconcile_todo_counts(
+            note_ids=options["note_ids"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Compteurs vérifiés ✅  Notes corrigées: {repaired}")
+        )
@@ -1,8 +1,7 @@
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
 from apps.notes.models import Note
-from apps.todos.models import Todo, TodoStatus
+from apps.todos.models import Todo, TodoStatus, defer_note_status_updates
 
 
 SEED_NOTES = [
@@ -67,7 +66,7 @@ class Command(BaseCommand):
             help="Supprime les données existantes avant de regénérer le jeu d'essai.",
         )
 
-    @transaction.atomic
+    @defer_note_status_updates()
     def handle(self, *args, **options):
         force = options["force"]
 
@@ -0,0 +1,193 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterator, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+
+from apps.core.cache import bump_generation
+from apps.notes.models import TODO_COUNTER_FIELDS, Note, NoteStatus, status_from_counts
+from apps.todos.models import Todo, TodoStatus
+
+# Timestamps are spread over the days preceding this date, so runs are reproducible
+REFERENCE_DATE = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+WORDS = (
+    "projet réunion client maquette livraison budget équipe sprint revue document "
+    "analyse tests déploiement serveur base données migration sécurité accès rapport "
+    "facture planning objectif priorité retour idée lecture chapitre question réponse "
+    "contrat fournisseur commande stock inventaire campagne newsletter article blog "
+    "formation atelier démo support ticket incident correctif version release note "
+    "tâche suivi relance validation archive export import synchronisation sauvegarde"
+).split()
+
+# Share of archived notes, and of todos without description
+ARCHIVED_RATIO = 0.05
+EMPTY_DESCRIPTION_RATIO = 0.3
+
+
+@contextmanager
+def explicit_timestamps(*model_classes: type[models.Model]) -> Iterator[None]:
+    """Let ``bulk_create`` keep the given created_at/updated_at instead of ``now()``."""
+    fields = [
+        field
+        for model in model_classes
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un gros jeu de données synthétique et reproductible (notes, todos, todos orphelins) "
+        "pour le profilage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notes", type=int, default=1000, help="Nombre de notes à créer.")
+        parser.add_argument(
+            "--todos-per-note",
+            type=int,
+            default=5,
+            help="Nombre moyen de todos par note (tiré entre 0 et le double).",
+        )
+        parser.add_argument("--orphans", type=int, default=0, help="Nombre de todos sans note.")
+        parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire (même graine, mêmes données).")
+        parser.add_argument("--days", type=int, default=365, help="Période couverte par les dates de création.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Nombre de lignes insérées par requête.",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["notes"], options["todos_per_note"], options["orphans"]) < 0:
+            raise CommandError("Les nombres de notes et de todos doivent être positifs.")
+        if options["batch_size"] < 1 or options["days"] < 1:
+            raise CommandError("--batch-size et --days doivent être positifs.")
+
+        self.rng = random.Random(options["seed"])
+        self.span = timedelta(days=options["days"])
+        batch_size = options["batch_size"]
+        started = time.monotonic()
+        created_notes = created_todos = 0
+
+        with explicit_timestamps(Note, Todo):
+            remaining = options["notes"]
+            while remaining:
+                count = min(remaining, max(1, batch_size // (options["todos_per_note"] + 1)))
+                notes, todos = self.build_notes(count, options["todos_per_note"])
+                created_notes += len(notes)
+                created_todos += len(todos)
+                remaining -= count
+                self.report(created_notes + created_todos, started)
+
+            remaining = options["orphans"]
+            while remaining:
+                count = min(remaining, batch_size)
+                with transaction.atomic():
+                    Todo.objects.bulk_create(
+                        [self.build_todo(None, self.random_created_at()) for _ in range(count)],
+                        batch_size=batch_size,
+                    )
+                created_todos += count
+                remaining -= count
+                self.report(created_notes + created_todos, started)
+
+        bump_generation(Note._meta.label, Todo._meta.label)
+        elapsed = time.monotonic() - started
+        self.stdout.write("")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Jeu synthétique prêt ✅  Notes créées: {created_notes}, Todos créés: {created_todos} "
+                f"en {elapsed:.1f}s ({(created_notes + created_todos) / elapsed if elapsed else 0:.0f} lignes/s)"
+            )
+        )
+
+    @transaction.atomic
+    def build_notes(self, count: int, todos_per_note: int) -> tuple[list[Note], list[Todo]]:
+        """
+        Create ``count`` notes and their todos. The counters and status of each note
+        are computed from its generated todos, so no recompute is needed afterwards.
+        """
+        notes, statuses = [], []
+        for _ in range(count):
+            created_at = self.random_created_at()
+            # Per-note progress, so that note statuses are spread out as well
+            progress = self.rng.random()
+            todo_statuses = [
+                self.rng.choices(
+                    [TodoStatus.COMPLETED, TodoStatus.IN_PROGRESS, TodoStatus.PENDING],
+                    weights=[progress, 0.3 * (1 - progress), 1 - progress],
+                )[0]
+                for _ in range(self.rng.randint(0, 2 * todos_per_note))
+            ]
+            counts = {todo_status: todo_statuses.count(todo_status) for todo_status in TODO_COUNTER_FIELDS}
+            note = Note(
+                title=self.sentence(2, 8),
+                content=self.text(mu=3.5, sigma=1.0),
+                created_at=created_at,
+                updated_at=self.random_updated_at(created_at),
+                **{field_name: counts[todo_status] for todo_status, field_name in TODO_COUNTER_FIELDS.items()},
+            )
+            note.status = (
+                NoteStatus.ARCHIVED
+                if self.rng.random() < ARCHIVED_RATIO
+                else status_from_counts(counts['pending'], counts['in_progress'], counts['completed'])
+            )
+            notes.append(note)
+            statuses.append(todo_statuses)
+
+        Note.objects.bulk_create(notes)
+        todos = [
+            self.build_todo(note, self.random_updated_at(note.created_at), todo_status)
+            for note, todo_statuses in zip(notes, statuses)
+            for todo_status in todo_statuses
+        ]
+        Todo.objects.bulk_create(todos)
+        return notes, todos
+
+    def build_todo(self, note: Optional[Note], created_at: datetime, todo_status: Optional[str] = None) -> Todo:
+        if todo_status is None:
+            todo_status = self.rng.choices(
+                [TodoStatus.PENDING, TodoStatus.IN_PROGRESS, TodoStatus.COMPLETED], weights=[5, 2, 3]
+            )[0]
+        description = "" if self.rng.random() < EMPTY_DESCRIPTION_RATIO else self.text(mu=2.5, sigma=0.8)
+        return Todo(
+            title=self.sentence(2, 6),
+            description=description,
+            status=todo_status,
+            note=note,
+            created_at=created_at,
+            updated_at=self.random_updated_at(created_at),
+        )
+
+    def sentence(self, low: int, high: int) -> str:
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(low, high))).capitalize()
+
+    def text(self, mu: float, sigma: float) -> str:
+        """Text whose word count follows a log-normal law: mostly short, with a long tail."""
+        words = min(2000, max(1, int(self.rng.lognormvariate(mu, sigma))))
+        return " ".join(self.rng.choices(WORDS, k=words)).capitalize() + "."
+
+    def random_created_at(self) -> datetime:
+        return REFERENCE_DATE - self.span * self.rng.random()
+
+    def random_updated_at(self, created_at: datetime) -> datetime:
+        # Most rows are edited shortly after their creation
+        return min(REFERENCE_DATE, created_at + timedelta(hours=self.rng.expovariate(1 / 48)))
+
+    def report(self, rows: int, started: float) -> None:
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"{rows} lignes créées ({rows / elapsed if elapsed else 0:.0f} lignes/s)", ending="\r")
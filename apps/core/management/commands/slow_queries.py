@@ -0,0 +1,73 @@
+import glob
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.slow_queries import normalize_sql, read_entries, slow_query_settings
+
+SORT_KEYS = {
+    "total": lambda group: group["total_ms"],
+    "max": lambda group: group["max_ms"],
+    "count": lambda group: group["count"],
+    "mean": lambda group: group["total_ms"] / group["count"],
+}
+
+
+class Command(BaseCommand):
+    help = "Résume le journal des requêtes SQL lentes : requêtes les plus coûteuses, vues d'origine et plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10, help="Nombre de requêtes affichées.")
+        parser.add_argument(
+            "--sort",
+            choices=sorted(SORT_KEYS),
+            default="total",
+            help="Classement : temps cumulé, durée maximale, nombre ou durée moyenne.",
+        )
+        parser.add_argument("--view", help="Ne garde que les requêtes de cette vue (ex. `notes-list`).")
+        parser.add_argument("--path", help="Journal à lire (par défaut SLOW_QUERIES['PATH'], rotations comprises).")
+
+    def handle(self, *args, **options):
+        path = options["path"] or slow_query_settings()["PATH"]
+        # Rotated files are named `<name>.<date>.log` next to the current one
+        root, extension = os.path.splitext(path)
+        paths = sorted(set(glob.glob(f"{root}*{extension}")) | ({path} if os.path.exists(path) else set()))
+        if not paths:
+            raise CommandError(f"Aucun journal de requêtes lentes trouvé ({path}).")
+
+        groups = {}
+        for entry in read_entries(paths):
+            if options["view"] and entry.get("view") != options["view"]:
+                continue
+            key = normalize_sql(entry["sql"])
+            group = groups.setdefault(
+                key, {"sql": key, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "views": set(), "slowest": entry}
+            )
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["views"].add(entry.get("view") or "-")
+            if entry["duration_ms"] >= group["max_ms"]:
+                group["max_ms"] = entry["duration_ms"]
+                group["slowest"] = entry
+
+        if not groups:
+            self.stdout.write("Aucune requête lente enregistrée.")
+            return
+
+        ranked = sorted(groups.values(), key=SORT_KEYS[options["sort"]], reverse=True)[: options["limit"]]
+        self.stdout.write(f"{sum(group['count'] for group in groups.values())} requêtes lentes, {len(groups)} distinctes")
+        for rank, group in enumerate(ranked, start=1):
+            slowest = group["slowest"]
+            self.stdout.write("")
+            self.stdout.write(
+                self.style.WARNING(
+                    f"#{rank}  {group['count']}x  total {group['total_ms']:.1f} ms  "
+                    f"moyenne {group['total_ms'] / group['count']:.1f} ms  max {group['max_ms']:.1f} ms"
+                )
+            )
+            self.stdout.write(f"Vues : {', '.join(sorted(group['views']))}")
+            self.stdout.write(f"SQL : {group['sql']}")
+            if slowest.get("params"):
+                self.stdout.write(f"Paramètres (la plus lente) : {slowest['params']}")
+            for line in slowest.get("plan") or []:
+                self.stdout.write(f"  plan : {line}")
@@ -0,0 +1,375 @@
+"""
+In-process metrics exposed in the Prometheus text format on ``/api/metrics/``.
+
+Counters and histograms are plain dictionaries updated under a lock, so recording
+costs a few microseconds. With several worker processes (gunicorn, uvicorn), set
+``METRICS['DIRECTORY']``: every process then writes a snapshot of its metrics to
+``<directory>/<pid>-<start>.json`` at most every ``FLUSH_INTERVAL`` seconds, and the
+endpoint sums the snapshots of all processes, whichever one answers.
+The start time (milliseconds) tells a restarted process from a former one with the
+same pid. When scraping, the snapshots of stopped processes are folded into
+``stopped.json``, so counters never go backwards and the directory does not grow
+with every restart (POSIX only: elsewhere the snapshots are kept).
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import Token
+from typing import Any, Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase
+
+from apps.core.database import POOL_GAUGES, connection_stats
+from apps.core.instrumentation import AsyncCapableMiddleware, RequestTimings, start_observing, stop_observing
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds of the histogram buckets (+Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SQL_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Snapshot of a process: <pid>-<start>.json (<pid>.json from older versions)
+SNAPSHOT_NAME = re.compile(r'^(\d+)(?:-(\d+))?\.json$')
+# Sum of the snapshots of the stopped processes, and which ones it holds
+STOPPED_FILE = 'stopped.json'
+LOCK_FILE = '.lock'
+
+
+def _settings() -> dict[str, Any]:
+    return {'ENABLED': True, 'DIRECTORY': '', 'FLUSH_INTERVAL': 5.0, **getattr(settings, 'METRICS', {})}
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], Any] = {}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1) -> None:
+        with REGISTRY.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    @staticmethod
+    def merge(value: float, other: float) -> float:
+        return value + other
+
+    def samples(self, labels: tuple[str, ...], value: float) -> Iterable[tuple[str, dict[str, str], float]]:
+        yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class Histogram(Metric):
+    """Values are ``[count of bucket 1, ..., count of +Inf, sum]``, buckets not cumulative."""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, labels: tuple[str, ...] = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with REGISTRY.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @staticmethod
+    def merge(value: list[float], other: list[float]) -> list[float]:
+        return [a + b for a, b in zip(value, other)]
+
+    def samples(self, labels: tuple[str, ...], value: list[float]) -> Iterable[tuple[str, dict[str, str], float]]:
+        named = dict(zip(self.labelnames, labels))
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), value[:-1]):
+            cumulative += count
+            yield f'{self.name}_bucket', {**named, 'le': _format_bound(bound)}, cumulative
+        yield f'{self.name}_sum', named, value[-1]
+        yield f'{self.name}_count', named, cumulative
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.metrics: dict[str, Metric] = {}
+        self.flushed = 0.0
+        self.pid: Optional[int] = None
+        self.key = ''
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict[str, list[list[Any]]]:
+        """JSON-serializable copy of the values of this process."""
+        with self.lock:
+            return {
+                name: [[list(labels), value if not isinstance(value, list) else list(value)]
+                       for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def flush(self, force: bool = False) -> None:
+        """Write the snapshot of this process, at most every ``FLUSH_INTERVAL`` seconds."""
+        options = _settings()
+        directory = options['DIRECTORY']
+        now = time.monotonic()
+        if not directory or (not force and now - self.flushed < options['FLUSH_INTERVAL']):
+            return
+        self.flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{self.process_key()}.json')
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as snapshot:
+            json.dump(self.snapshot(), snapshot)
+        os.replace(f'{path}.tmp', path)
+
+    def process_key(self) -> str:
+        """``<pid>-<start>`` of this process; a forked worker gets its own."""
+        pid = os.getpid()
+        if self.pid != pid:
+            self.pid = pid
+            self.key = f'{pid}-{time.time_ns() // 1_000_000}'
+        return self.key
+
+    def collect(self) -> dict[str, dict[tuple[str, ...], Any]]:
+        """Values of every process: the snapshots of the others plus the live values of this one."""
+        merged: dict[str, dict[tuple[str, ...], Any]] = {name: {} for name in self.metrics}
+        self.merge_into(merged, self.snapshot())
+        directory = _settings()['DIRECTORY']
+        if not directory or not os.path.isdir(directory):
+            return merged
+        with _directory_lock(directory) as locked:
+            stopped = self.fold_stopped(directory) if locked else _read_json(os.path.join(directory, STOPPED_FILE))
+            stopped = stopped or {'processes': [], 'metrics': {}}
+            self.merge_into(merged, stopped['metrics'])
+            folded = set(stopped['processes'])
+            for key, path in _snapshot_files(directory).items():
+                if key == self.process_key() or key in folded:
+                    continue
+                snapshot = _read_json(path)
+                # Being replaced by its process: its previous values are lost for this scrape only
+                if snapshot is not None:
+                    self.merge_into(merged, snapshot)
+        return merged
+
+    def fold_stopped(self, directory: str) -> Optional[dict[str, Any]]:
+        """
+        Add the snapshots of the stopped processes to ``stopped.json``, then delete them.
+        Their keys are listed in ``stopped.json`` until their files are gone, so a crash
+        between the two steps never counts a process twice. Called under the directory lock.
+        """
+        path = os.path.join(directory, STOPPED_FILE)
+        stopped = _read_json(path) or {'processes': [], 'metrics': {}}
+        files = _snapshot_files(directory)
+        folded = set(stopped['processes'])
+        dead = [key for key in files if key != self.process_key() and not _process_running(key, files)]
+        new = [key for key in dead if key not in folded]
+        if new:
+            merged: dict[str, dict[tuple[str, ...], Any]] = {name: {} for name in self.metrics}
+            self.merge_into(merged, stopped['metrics'])
+            for key in new:
+                snapshot = _read_json(files[key])
+                if snapshot is not None:
+                    self.merge_into(merged, snapshot)
+            stopped = {
+                # Keys whose file may still exist
+                'processes': sorted((folded & files.keys()) | set(new)),
+                'metrics': {
+                    name: [[list(labels), value] for labels, value in values.items()]
+                    for name, values in merged.items()
+                },
+            }
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as handle:
+                json.dump(stopped, handle)
+            os.replace(f'{path}.tmp', path)
+        for key in dead:
+            try:
+                os.remove(files[key])
+            except FileNotFoundError:
+                pass
+        return stopped
+
+    def merge_into(self, merged: dict[str, dict[tuple[str, ...], Any]], snapshot: dict[str, list[list[Any]]]) -> None:
+        for name, entries in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            for labels, value in entries:
+                labels = tuple(labels)
+                previous = merged[name].get(labels)
+                merged[name][labels] = value if previous is None else metric.merge(previous, value)
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _snapshot_files(directory: str) -> dict[str, str]:
+    """Path of each process snapshot in ``directory``, by ``<pid>-<start>`` key."""
+    return {
+        name[:-len('.json')]: os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if SNAPSHOT_NAME.match(name)
+    }
+
+
+def _process_running(key: str, keys: Iterable[str]) -> bool:
+    match = SNAPSHOT_NAME.match(f'{key}.json')
+    pid, start = int(match.group(1)), int(match.group(2) or 0)
+    for other in keys:
+        other_match = SNAPSHOT_NAME.match(f'{other}.json')
+        # The pid was reused by a later process
+        if int(other_match.group(1)) == pid and int(other_match.group(2) or 0) > start:
+            return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Alive, owned by another user
+        pass
+    return True
+
+
+@contextmanager
+def _directory_lock(directory: str) -> Iterator[bool]:
+    """Exclusive lock on the snapshot directory while folding; yields False where unsupported."""
+    if fcntl is None:
+        yield False
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush, force=True)
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time spent answering a request.', ('view', 'method'),
+))
+REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'Requests answered, by response status.', ('view', 'method', 'status'),
+))
+REQUEST_QUERIES = REGISTRY.register(Histogram(
+    'db_queries_per_request', 'SQL queries run by a request.', ('view', 'method'), buckets=QUERY_COUNT_BUCKETS,
+))
+REQUEST_SQL_DURATION = REGISTRY.register(Histogram(
+    'db_query_duration_seconds_per_request', 'Time spent in SQL queries by a request.', ('view', 'method'),
+    buckets=SQL_DURATION_BUCKETS,
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'api_cache_requests_total', 'Lookups in the API response cache.', ('result',),
+))
+NOTE_COUNTER_UPDATES = REGISTRY.register(Counter(
+    'note_counter_updates_total', 'Notes whose todo counters were changed by a delta.',
+))
+NOTE_STATUS_REFRESHES = REGISTRY.register(Counter(
+    'note_status_refreshes_total', 'Set-based recomputations of note statuses.',
+))
+NOTE_STATUS_CHANGES = REGISTRY.register(Counter(
+    'note_status_changes_total', 'Notes whose status was changed by a recomputation.',
+))
+
+
+def _format_bound(bound: Any) -> str:
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _line(name: str, labels: dict[str, str], value: float) -> str:
+    if labels:
+        name += '{' + ','.join(f'{key}="{_escape(str(label))}"' for key, label in labels.items()) + '}'
+    return f'{name} {int(value) if float(value).is_integer() else float(value)!r}'
+
+
+def render() -> str:
+    """Every metric, aggregated over all processes, in the Prometheus text format."""
+    collected = REGISTRY.collect()
+    lines = []
+    for name, metric in REGISTRY.metrics.items():
+        lines += [f'# HELP {name} {metric.documentation}', f'# TYPE {name} {metric.kind}']
+        for labels, value in sorted(collected[name].items()):
+            lines += [_line(*sample) for sample in metric.samples(labels, value)]
+
+    # Derived from the aggregated counters, so the ratio is the same whichever process answers
+    cache = collected[CACHE_REQUESTS.name]
+    hits, misses = cache.get(('hit',), 0), cache.get(('miss',), 0)
+    lines += [
+        '# HELP api_cache_hit_ratio Share of the API cache lookups answered from the cache.',
+        '# TYPE api_cache_hit_ratio gauge',
+        _line('api_cache_hit_ratio', {}, round(hits / (hits + misses), 4) if hits + misses else 0),
+    ]
+
+    # Connection pools belong to the process answering the scrape
+    pools = {alias: entry['pool'] for alias, entry in connection_stats().items() if entry['pooled']}
+    for key, documentation in POOL_GAUGES.items() if pools else ():
+        name = f'db_{key}' if key.startswith('pool_') else f'db_pool_{key}'
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} gauge']
+        lines += [_line(name, {'alias': alias}, pool.get(key, 0)) for alias, pool in sorted(pools.items())]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Record the latency and the SQL queries of every request, labelled by view name and method."""
+
+    def before(self, request: HttpRequest) -> Optional[tuple[RequestTimings, Token]]:
+        if not _settings()['ENABLED']:
+            return None
+        timings = RequestTimings()
+        return timings, start_observing(timings)
+
+    def release(self, state: tuple[RequestTimings, Token]) -> None:
+        stop_observing(state[1])
+
+    def after(self, request: HttpRequest, response: HttpResponseBase, state: tuple[RequestTimings, Token]) -> HttpResponseBase:
+        timings = state[0]
+        match = request.resolver_match
+        labels = (match.view_name if match else 'unmatched', request.method)
+        REQUEST_DURATION.observe(time.perf_counter() - timings.started, labels)
+        REQUEST_QUERIES.observe(timings.queries, labels)
+        REQUEST_SQL_DURATION.observe(timings.db, labels)
+        REQUESTS.inc((*labels, str(response.status_code)))
+        REGISTRY.flush()
+        return response
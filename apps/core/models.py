@@ -14,3 +14,16 @@ class TimestampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class ImportCheckpoint(TimestampedModel):
+    """
+    Progress of an interrupted ``import_data`` run: the number of input records committed.
+    Updated in the transaction of each batch, so it always agrees with the imported rows;
+    ``created_at`` is the start of the import.
+    """
+    key = models.CharField(max_length=500, unique=True)
+    offset = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.key} @ {self.offset}"
@@ -0,0 +1,119 @@
+"""
+On-demand cProfile profiling of single requests.
+
+When ``PROFILING['ENABLED']`` is off the middleware removes itself from the
+middleware chain at startup, so it costs nothing. When on, a request is profiled if:
+
+- a staff user asks for it with ``?profile=`` or the ``X-Profile`` header:
+  ``text`` (or ``1``) replaces the response by the pstats report of the request,
+  ``store`` keeps the response and stores the profile;
+- or it is drawn by ``PROFILING['SAMPLE_RATE']``; its profile is stored.
+
+The ``X-Profile-File`` header naming a stored profile is only sent with DEBUG or to staff users.
+
+Stored profiles are pstats files, one per request, grouped by view:
+``<DIRECTORY>/<view>/<timestamp>-<pid>.prof``. The ``profile_report`` command
+merges the N last ones of a view; the files also open in snakeviz, flameprof or gprof2dot.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse, HttpResponseBase
+
+from .instrumentation import RequestTimingMiddleware
+
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'X-Profile'
+TEXT_MODES = ('1', 'text')
+STORE_MODE = 'store'
+
+# Only one profiler can be active at a time; concurrent requests are not profiled
+_lock = threading.Lock()
+
+
+def profiling_settings() -> dict[str, Any]:
+    return {
+        'ENABLED': False,
+        'DIRECTORY': os.path.join(settings.BASE_DIR, 'profiles'),
+        'SAMPLE_RATE': 0.0,
+        'SORT': 'cumulative',
+        'LIMIT': 40,
+        **getattr(settings, 'PROFILING', {}),
+    }
+
+
+def profile_label(request: HttpRequest) -> str:
+    """Directory name of the profiles of the request's view, e.g. ``notes-list.GET``."""
+    match = request.resolver_match
+    name = match.view_name if match else 'unmatched'
+    return re.sub(r'[^\w.-]+', '_', f'{name}.{request.method}')
+
+
+def format_stats(stats: pstats.Stats, sort: str, limit: int, title: str = '') -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    if title:
+        stream.write(f'{title}\n\n')
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    """Profile the requests asked for by staff users, or a random sample of them."""
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase]) -> None:
+        if not profiling_settings()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        options = profiling_settings()
+        mode = self.requested_mode(request)
+        if mode is None and random.random() < options['SAMPLE_RATE']:
+            mode = STORE_MODE
+        if mode is None or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            response = profiler.runcall(self.get_response, request)
+        finally:
+            _lock.release()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if mode == STORE_MODE:
+            name = self.store(profiler, request, options['DIRECTORY'])
+            # A server path: not for the anonymous clients of a sampled request
+            if RequestTimingMiddleware.may_see_timings(request):
+                response['X-Profile-File'] = name
+            return response
+
+        title = f'{request.method} {request.get_full_path()} -> {response.status_code} in {elapsed:.1f} ms'
+        report = format_stats(pstats.Stats(profiler), options['SORT'], options['LIMIT'], title)
+        return HttpResponse(report, content_type='text/plain; charset=utf-8')
+
+    def requested_mode(self, request: HttpRequest) -> Optional[str]:
+        mode = request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+        if mode not in (*TEXT_MODES, STORE_MODE):
+            return None
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_staff:
+            return None
+        return mode
+
+    def store(self, profiler: cProfile.Profile, request: HttpRequest, directory: str) -> str:
+        """Dump the profile; returns its path relative to ``directory``."""
+        name = os.path.join(profile_label(request), f'{time.time_ns()}-{os.getpid()}.prof')
+        os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, name))
+        return name
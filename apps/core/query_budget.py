@@ -0,0 +1,183 @@
+"""
+Query budgets: fail as soon as a block of code, or an endpoint, runs more SQL queries than allowed.
+
+- `query_budget` is a context manager and a decorator for ad-hoc checks.
+- `ENDPOINT_BUDGETS` registers the allowed number of queries of every API endpoint;
+  `check_endpoint_budgets` replays them at several dataset sizes, so that a query
+  count growing with the number of rows (N+1) is caught even when it stays under budget.
+"""
+import itertools
+from contextlib import ContextDecorator
+from typing import Any, Callable, NamedTuple, Optional
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when more queries than budgeted were run; lists the captured SQL."""
+
+
+class query_budget(ContextDecorator):
+    """
+    Allow at most ``max_queries`` queries on database ``using`` inside the block::
+
+        with query_budget(2, label='notes list'):
+            client.get('/api/notes/')
+    """
+
+    def __init__(self, max_queries: int, using: str = 'default', label: str = '') -> None:
+        self.max_queries = max_queries
+        self.using = using
+        self.label = label
+
+    def __enter__(self) -> CaptureQueriesContext:
+        self.captured = CaptureQueriesContext(connections[self.using])
+        return self.captured.__enter__()
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.captured.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and len(self.captured) > self.max_queries:
+            queries = '\n'.join(
+                f'{index}. {query["sql"]}' for index, query in enumerate(self.captured.captured_queries, start=1)
+            )
+            raise QueryBudgetExceeded(
+                f'{self.label or "Block"} ran {len(self.captured)} queries, budget is {self.max_queries}:\n{queries}'
+            )
+
+
+class BudgetContext:
+    """Rows an endpoint request can point to, for a dataset of ``size`` notes."""
+
+    def __init__(self, size: int) -> None:
+        from apps.notes.models import Note
+        from apps.todos.models import Todo
+
+        self.size = size
+        self.note = Note.objects.filter(todos__isnull=False).order_by('pk').first()
+        self.todo = Todo.objects.filter(note=self.note).order_by('pk').first()
+        # A word of the note title, so that searches always have results
+        self.word = self.note.title.split()[0]
+
+        self.statuses = itertools.cycle(['in_progress', 'completed', 'pending'])
+
+    def new_todo_ids(self, count: int) -> list[int]:
+        """Todos attached to the note, created one by one so that its counters stay right."""
+        from apps.todos.models import Todo
+
+        return [Todo.objects.create(title=f'Budget {index}', note=self.note).pk for index in range(count)]
+
+    def next_status(self) -> str:
+        """A status different from the previous one, so that every update changes the counters."""
+        return next(self.statuses)
+
+
+class EndpointBudget(NamedTuple):
+    name: str
+    method: str
+    # Path and body are built before the measurement, so their fixtures are not counted
+    path: Callable[[BudgetContext], str]
+    max_queries: int
+    body: Optional[Callable[[BudgetContext], Any]] = None
+
+
+def _detail(route: str, attribute: str) -> Callable[[BudgetContext], str]:
+    return lambda context: reverse(route, kwargs={'pk': getattr(context, attribute).pk})
+
+
+ENDPOINT_BUDGETS = (
+    # Reads
+    EndpointBudget('notes-list', 'get', lambda c: reverse('notes-list'), 3),
+    EndpointBudget('notes-list-cursor', 'get', lambda c: f"{reverse('notes-list')}?pagination=cursor", 2),
+    EndpointBudget('notes-list-search', 'get', lambda c: f"{reverse('notes-list')}?search={c.word}", 3),
+    EndpointBudget('notes-retrieve', 'get', _detail('notes-detail', 'note'), 2),
+    EndpointBudget('notes-export', 'get', lambda c: reverse('notes-export'), 1),
+    EndpointBudget('todos-list', 'get', lambda c: reverse('todos-list'), 3),
+    EndpointBudget('todos-list-search', 'get', lambda c: f"{reverse('todos-list')}?search={c.todo.title.split()[0]}", 3),
+    EndpointBudget('todos-list-ordering', 'get', lambda c: f"{reverse('todos-list')}?ordering=title", 3),
+    EndpointBudget('todos-retrieve', 'get', _detail('todos-detail', 'todo'), 2),
+    EndpointBudget('todos-by-note', 'get', lambda c: f"{reverse('todos-by-note')}?note={c.note.pk}", 1),
+    EndpointBudget('todos-export', 'get', lambda c: reverse('todos-export'), 1),
+    EndpointBudget('search', 'get', lambda c: f"{reverse('search')}?search={c.word}", 1),
+    EndpointBudget('home', 'get', lambda c: reverse('interface:home'), 3),
+    # Writes; single todo writes run in a write transaction (a savepoint pair inside a test)
+    EndpointBudget(
+        'todos-create', 'post', lambda c: reverse('todos-list'), 7,
+        body=lambda c: {'title': 'Budget', 'note': c.note.pk},
+    ),
+    EndpointBudget(
+        'todos-update', 'patch', _detail('todos-detail', 'todo'), 7,
+        body=lambda c: {'status': c.next_status()},
+    ),
+    EndpointBudget(
+        'todos-delete', 'delete', lambda c: reverse('todos-detail', kwargs={'pk': c.new_todo_ids(1)[0]}), 7,
+    ),
+    EndpointBudget(
+        'notes-update', 'patch', _detail('notes-detail', 'note'), 2,
+        body=lambda c: {'title': 'Budget'},
+    ),
+    # Bulk requests carry one item per note of the dataset, so per-item queries show up as growth
+    EndpointBudget(
+        'todos-bulk-create', 'post', lambda c: reverse('todos-bulk'), 6,
+        body=lambda c: [{'title': f'Budget {index}', 'note': c.note.pk} for index in range(c.size)],
+    ),
+    EndpointBudget(
+        'todos-bulk-update', 'patch', lambda c: reverse('todos-bulk'), 6,
+        body=lambda c: [{'id': pk, 'status': c.next_status()} for pk in c.new_todo_ids(c.size)],
+    ),
+    EndpointBudget(
+        'todos-bulk-delete', 'delete', lambda c: reverse('todos-bulk'), 7,
+        body=lambda c: c.new_todo_ids(c.size),
+    ),
+)
+
+
+def _send(endpoint: EndpointBudget, client: Client, path: str, body: Any) -> None:
+    response = getattr(client, endpoint.method)(path, body, content_type='application/json')
+    if response.streaming:
+        b''.join(response.streaming_content)
+    if response.status_code >= 400:
+        raise AssertionError(f'{endpoint.name} answered {response.status_code}: {response.content[:500]!r}')
+
+
+def measure_endpoint(endpoint: EndpointBudget, client: Client, context: BudgetContext) -> int:
+    """
+    Send one request to ``endpoint`` within its budget; returns the number of queries.
+    A first, unmeasured request warms the per-process caches (e.g. full-text index detection).
+    """
+    _send(endpoint, client, endpoint.path(context), endpoint.body(context) if endpoint.body else None)
+    path = endpoint.path(context)
+    body = endpoint.body(context) if endpoint.body else None
+    with query_budget(endpoint.max_queries, label=endpoint.name) as captured:
+        _send(endpoint, client, path, body)
+    return len(captured)
+
+
+def check_endpoint_budgets(
+    client: Client,
+    populate: Callable[[int], None],
+    sizes: tuple[int, ...] = (2, 10, 30),
+    endpoints: tuple[EndpointBudget, ...] = ENDPOINT_BUDGETS,
+) -> dict[str, list[int]]:
+    """
+    Grow the dataset with ``populate(size)`` to each size in turn and measure every endpoint.
+    Raises QueryBudgetExceeded over budget, or AssertionError when a count varies with the size.
+    Returns the query counts per endpoint, one per size.
+    """
+    counts: dict[str, list[int]] = {endpoint.name: [] for endpoint in endpoints}
+    for size in sizes:
+        populate(size)
+        context = BudgetContext(size)
+        for endpoint in endpoints:
+            counts[endpoint.name].append(measure_endpoint(endpoint, client, context))
+
+    growing = {name: values for name, values in counts.items() if len(set(values)) > 1}
+    if growing:
+        details = ', '.join(
+            f'{name} ({" -> ".join(map(str, values))} for {" -> ".join(map(str, sizes))} rows)'
+            for name, values in growing.items()
+        )
+        raise AssertionError(f'Query count depends on the dataset size: {details}')
+    return counts
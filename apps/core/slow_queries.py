@@ -0,0 +1,221 @@
+"""
+Slow query log.
+
+`SlowQueryMiddleware` observes the queries of each request
+(``apps.core.instrumentation.start_observing``). A query slower than ``SLOW_QUERIES['THRESHOLD_MS']``
+is logged with its SQL, parameters, duration, the view that ran it and, for reads
+with ``SLOW_QUERIES['EXPLAIN']`` on, its plan (``EXPLAIN QUERY PLAN`` on SQLite,
+``EXPLAIN`` on PostgreSQL).
+
+Plans are never taken during the request: once the response is built, the slow reads
+are handed to a background thread which explains them on its own connection, then
+logs them. The EXPLAIN statements therefore neither add to the request latency nor
+show up in its query count (``connection.queries``, metrics, query budgets).
+
+Records go to a rotating loguru file sink, one JSON object per line; the
+``slow_queries`` management command summarizes them.
+"""
+import json
+import os
+import queue
+import re
+import threading
+import time
+from contextvars import Token
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.http import HttpRequest
+from loguru import logger
+
+from apps.core.instrumentation import AsyncCapableMiddleware, start_observing, stop_observing
+
+# Statements whose plan is captured; EXPLAIN does not run them
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH')
+# Slow reads waiting for their plan; beyond this, entries are logged without one
+PENDING_PLANS_MAX = 1000
+
+_sink_lock = threading.Lock()
+# Path and loguru handler id of the file sink
+_sink: Optional[tuple[str, int]] = None
+
+# (entry, params) of the slow reads waiting for their plan
+_pending_plans: 'queue.Queue[tuple[dict[str, Any], Any]]' = queue.Queue(maxsize=PENDING_PLANS_MAX)
+_explainer_lock = threading.Lock()
+_explainer: Optional[threading.Thread] = None
+
+
+def slow_query_settings() -> dict[str, Any]:
+    return {
+        'ENABLED': True,
+        'THRESHOLD_MS': 100.0,
+        'EXPLAIN': False,
+        'PATH': os.path.join(settings.BASE_DIR, 'logs', 'slow_queries.log'),
+        'ROTATION': '10 MB',
+        'RETENTION': 5,
+        **getattr(settings, 'SLOW_QUERIES', {}),
+    }
+
+
+def _is_slow_query(record: dict[str, Any]) -> bool:
+    return 'slow_query' in record['extra']
+
+
+def add_sink() -> None:
+    """Add the rotating file sink of the slow queries, once per process and path."""
+    global _sink
+    options = slow_query_settings()
+    with _sink_lock:
+        if _sink is not None:
+            if _sink[0] == options['PATH']:
+                return
+            logger.remove(_sink[1])
+        os.makedirs(os.path.dirname(options['PATH']), exist_ok=True)
+        _sink = options['PATH'], logger.add(
+            options['PATH'],
+            filter=_is_slow_query,
+            serialize=True,
+            rotation=options['ROTATION'],
+            retention=options['RETENTION'],
+            enqueue=True,
+        )
+
+
+def remove_sink() -> None:
+    global _sink
+    with _sink_lock:
+        if _sink is not None:
+            logger.remove(_sink[1])
+            _sink = None
+
+
+def normalize_sql(sql: str) -> str:
+    """Group the queries differing only by the length of their IN lists."""
+    return re.sub(r'\((?:%s, )+%s\)', '(%s, ...)', sql)
+
+
+def explain(alias: str, sql: str, params: Any) -> list[str]:
+    """Plan of a read query: the detail column of each row of the EXPLAIN output."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def write_entry(entry: dict[str, Any]) -> None:
+    logger.bind(slow_query=entry).warning(
+        'Slow query ({} ms) in {}: {}', entry['duration_ms'], entry['view'], entry['sql']
+    )
+
+
+def _explain_pending() -> None:
+    """
+    Body of the explainer thread. It starts with an empty context, so the request
+    observers never see its queries, and it uses its own thread-local connections,
+    closed whenever the backlog is drained.
+    """
+    while True:
+        entry, params = _pending_plans.get()
+        try:
+            entry['plan'] = explain(entry['database'], entry['sql'], params)
+        except DatabaseError as exc:
+            entry['plan'] = [f'EXPLAIN failed: {exc}']
+        finally:
+            write_entry(entry)
+            if _pending_plans.empty():
+                # Idle until the next slow query: do not hold a connection (or a server slot) meanwhile
+                connections.close_all()
+            _pending_plans.task_done()
+
+
+def defer_plan(entry: dict[str, Any], params: Any) -> None:
+    """Explain and log ``entry`` in the background; logged without a plan if the backlog is full."""
+    global _explainer
+    with _explainer_lock:
+        if _explainer is None or not _explainer.is_alive():
+            _explainer = threading.Thread(target=_explain_pending, name='slow-query-explainer', daemon=True)
+            _explainer.start()
+    try:
+        _pending_plans.put_nowait((entry, params))
+    except queue.Full:
+        write_entry(entry)
+
+
+def wait_for_plans() -> None:
+    """Block until every deferred slow query has been explained and logged."""
+    _pending_plans.join()
+
+
+class SlowQueryLogger:
+    """Execute wrapper recording the queries of one request slower than ``threshold_ms``."""
+
+    def __init__(self, request: HttpRequest, threshold_ms: float, explain_plans: bool) -> None:
+        self.request = request
+        self.threshold = threshold_ms / 1000
+        self.explain_plans = explain_plans
+        # Slow reads to explain once the response is built: (entry, params)
+        self.to_explain: list[tuple[dict[str, Any], Any]] = []
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.log(context['connection'].alias, sql, params, many, duration)
+        return result
+
+    def log(self, alias: str, sql: str, params: Any, many: bool, duration: float) -> None:
+        match = self.request.resolver_match
+        entry = {
+            'sql': sql,
+            'params': [str(param) for param in params] if not many and params else [],
+            'duration_ms': round(duration * 1000, 3),
+            'database': alias,
+            'view': match.view_name if match else None,
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'plan': None,
+        }
+        if self.explain_plans and not many and sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            self.to_explain.append((entry, params))
+        else:
+            write_entry(entry)
+
+    def flush(self) -> None:
+        """Hand the slow reads to the explainer thread, after the request."""
+        for entry, params in self.to_explain:
+            defer_plan(entry, params)
+        self.to_explain = []
+
+
+class SlowQueryMiddleware(AsyncCapableMiddleware):
+    """Log the slow queries of every request; removed from the chain when disabled."""
+
+    def __init__(self, get_response: Callable[[HttpRequest], Any]) -> None:
+        if not slow_query_settings()['ENABLED']:
+            raise MiddlewareNotUsed
+        add_sink()
+        super().__init__(get_response)
+
+    def before(self, request: HttpRequest) -> tuple[Token, SlowQueryLogger]:
+        options = slow_query_settings()
+        slow_logger = SlowQueryLogger(request, options['THRESHOLD_MS'], options['EXPLAIN'])
+        return start_observing(slow_logger), slow_logger
+
+    def release(self, state: tuple[Token, SlowQueryLogger]) -> None:
+        token, slow_logger = state
+        stop_observing(token)
+        slow_logger.flush()
+
+
+def read_entries(paths: Iterable[str]) -> Iterable[dict[str, Any]]:
+    """Slow query entries of the given log files (loguru JSON lines)."""
+    for path in paths:
+        with open(path, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    yield json.loads(line)['record']['extra']['slow_query']
+                except (ValueError, KeyError):
+                    continue
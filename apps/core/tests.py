@@ -0,0 +1,810 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.models import Count
+from django.test import Client, LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from loguru import logger
+
+from apps.core.management.commands.import_data import Command
+from apps.core.models import ImportCheckpoint
+from apps.core.slow_queries import explain, read_entries, remove_sink, wait_for_plans
+from apps.core.sqlite_tuning import write_transaction
+from apps.notes.models import Note, NoteStatus
+from apps.todos.models import Todo, TodoStatus
+
+
+class ImportDataCommandTest(TestCase):
+    """Test cases for the import_data management command."""
+
+    def setUp(self):
+        """Create a scratch directory for the input and checkpoint files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def write_ndjson(self, records):
+        return self.write("data.ndjson", "".join(json.dumps(record) + "\n" for record in records))
+
+    def test_import_ndjson_resolves_note_refs(self):
+        """Test that todos are linked through the external note references."""
+        path = self.write_ndjson([
+            {"type": "note", "ref": "legacy-1", "title": "Première", "content": "Texte"},
+            {"type": "todo", "title": "A", "status": "completed", "note_ref": "legacy-1"},
+            {"type": "note", "ref": "legacy-2", "title": "Seconde", "content": "Texte"},
+            {"type": "todo", "title": "B", "status": "in_progress", "note_ref": "legacy-2"},
+            {"type": "todo", "title": "C", "note_ref": "legacy-1"},
+            {"type": "todo", "title": "Orpheline"},
+        ])
+
+        call_command("import_data", path, batch_size=2, stdout=StringIO())
+
+        first = Note.objects.get(external_ref="legacy-1")
+        second = Note.objects.get(external_ref="legacy-2")
+        self.assertEqual((first.completed_count, first.pending_count), (1, 1))
+        self.assertEqual(first.status, NoteStatus.ACTIVE)
+        self.assertEqual(second.status, NoteStatus.IN_PROGRESS)
+        self.assertTrue(Todo.objects.filter(title="Orpheline", note__isnull=True).exists())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_notes_without_todos_keep_their_imported_status(self):
+        """Test that only the notes whose counters moved get their status recomputed."""
+        path = self.write_ndjson([
+            {"type": "note", "ref": "done", "title": "Terminée", "status": "completed"},
+            {"type": "note", "ref": "started", "title": "Commencée", "status": "completed"},
+            {"type": "todo", "title": "A faire", "note_ref": "started"},
+        ])
+
+        call_command("import_data", path, stdout=StringIO())
+
+        self.assertEqual(Note.objects.get(external_ref="done").status, NoteStatus.COMPLETED)
+        self.assertEqual(Note.objects.get(external_ref="started").status, NoteStatus.ACTIVE)
+
+    def test_import_csv_with_existing_note_id(self):
+        """Test the CSV format and a todo pointing to an existing note id."""
+        note = Note.objects.create(title="Existante", content="Texte")
+        path = self.write(
+            "data.csv",
+            "type,ref,title,content,description,status,note_ref,note\n"
+            f"todo,,Terminer,,\"Avec, virgule\",completed,,{note.pk}\n",
+        )
+
+        call_command("import_data", path, stdout=StringIO())
+
+        todo = Todo.objects.get(title="Terminer")
+        self.assertEqual(todo.note_id, note.pk)
+        self.assertEqual(todo.description, "Avec, virgule")
+        note.refresh_from_db()
+        self.assertEqual(note.status, NoteStatus.COMPLETED)
+
+    def test_unknown_note_ref_rolls_back_the_batch(self):
+        """Test that an invalid row stops the import, keeping the committed batches."""
+        path = self.write_ndjson([
+            {"type": "note", "ref": "n1", "title": "Note"},
+            {"type": "todo", "title": "Ok", "note_ref": "n1"},
+            {"type": "todo", "title": "Perdue", "note_ref": "absente"},
+        ])
+
+        with self.assertRaisesMessage(CommandError, "Ligne 3"):
+            call_command("import_data", path, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(Todo.objects.count(), 1)
+        self.assertEqual(ImportCheckpoint.objects.get(key=os.path.abspath(path)).offset, 2)
+
+    def test_resume_after_interruption(self):
+        """Test that --resume skips the committed batches and finishes the import."""
+        path = self.write_ndjson([
+            {"type": "note", "ref": "n1", "title": "Note"},
+            {"type": "todo", "title": "T1", "note_ref": "n1", "status": TodoStatus.COMPLETED},
+            {"type": "todo", "title": "T2", "note_ref": "n1", "status": TodoStatus.COMPLETED},
+        ])
+        original = Command.import_batch
+        calls = []
+
+        def interrupted(command, batch, first_line, checkpoint=None):
+            calls.append(first_line)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return original(command, batch, first_line, checkpoint=checkpoint)
+
+        with mock.patch.object(Command, "import_batch", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("import_data", path, batch_size=2, stdout=StringIO())
+        self.assertEqual(Todo.objects.count(), 1)
+
+        with self.assertRaisesMessage(CommandError, "--resume"):
+            call_command("import_data", path, batch_size=2, stdout=StringIO())
+
+        call_command("import_data", path, batch_size=2, resume=True, stdout=StringIO())
+
+        note = Note.objects.get(external_ref="n1")
+        self.assertEqual(Todo.objects.count(), 2)
+        self.assertEqual(note.completed_count, 2)
+        self.assertEqual(note.status, NoteStatus.COMPLETED)
+
+    def test_resume_never_replays_a_committed_batch(self):
+        """Test that a crash right after a batch commit loses nothing and duplicates nothing."""
+        path = self.write_ndjson([
+            {"type": "note", "title": "Sans référence"},
+            {"type": "todo", "title": "T1"},
+            {"type": "todo", "title": "T2"},
+        ])
+        original = Command.import_batch
+
+        def crash_after_commit(command, batch, first_line, checkpoint=None):
+            original(command, batch, first_line, checkpoint=checkpoint)
+            raise KeyboardInterrupt
+
+        with mock.patch.object(Command, "import_batch", crash_after_commit):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("import_data", path, batch_size=2, stdout=StringIO())
+
+        call_command("import_data", path, batch_size=2, resume=True, stdout=StringIO())
+
+        self.assertEqual(Note.objects.filter(title="Sans référence").count(), 1)
+        self.assertEqual(sorted(Todo.objects.values_list("title", flat=True)), ["T1", "T2"])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_restart_discards_the_checkpoint(self):
+        """Test that --restart starts over instead of refusing the interrupted import."""
+        path = self.write_ndjson([{"type": "todo", "title": "T1"}])
+        ImportCheckpoint.objects.create(key=os.path.abspath(path), offset=1)
+
+        call_command("import_data", path, restart=True, stdout=StringIO())
+
+        self.assertEqual(Todo.objects.count(), 1)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_batches_use_a_constant_number_of_queries(self):
+        """Test that the number of queries depends on the batches, not on the rows."""
+        records = [{"type": "note", "ref": f"n{index}", "title": "Note"} for index in range(3)]
+        records += [{"type": "todo", "title": "Todo", "note_ref": f"n{index % 3}"} for index in range(30)]
+        path = self.write_ndjson(records)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("import_data", path, batch_size=100, stdout=StringIO())
+
+        # Includes the checkpoint lookup, creation, update and deletion.
+        self.assertLessEqual(len(queries), 14)
+        self.assertEqual(Note.objects.get(external_ref="n0").pending_count, 10)
+
+
+class SeedSyntheticCommandTest(TestCase):
+    """Test cases for the seed_synthetic management command."""
+
+    def seed(self, **options):
+        call_command("seed_synthetic", stdout=StringIO(), **options)
+
+    def test_generates_consistent_data(self):
+        """Test the requested volumes and that counters and statuses need no repair."""
+        self.seed(notes=30, todos_per_note=4, orphans=7, batch_size=20)
+
+        self.assertEqual(Note.objects.count(), 30)
+        self.assertEqual(Todo.objects.filter(note__isnull=True).count(), 7)
+        self.assertEqual(Note.reconcile_todo_counts(), 0)
+        self.assertEqual(Note.refresh_statuses(Note.objects.values("pk")), 0)
+
+    def test_same_seed_same_data(self):
+        """Test that a seed always produces the same rows, timestamps included."""
+        fields = ("title", "content", "status", "created_at", "updated_at")
+
+        self.seed(notes=10, todos_per_note=3, seed=7)
+        first = list(Note.objects.order_by("pk").values_list(*fields))
+        Todo.objects.all().delete()
+        Note.objects.all().delete()
+        self.seed(notes=10, todos_per_note=3, seed=7)
+        second = list(Note.objects.order_by("pk").values_list(*fields))
+
+        self.assertEqual(first, second)
+        self.assertTrue(all(row[3] <= row[4] for row in second))
+
+
+@override_settings(API_CACHE={"ENABLED": False})
+class BenchmarkTest(TestCase):
+    """Test cases for the helpers of the bench_api command."""
+
+    def test_run_scenario_reports_metrics(self):
+        """Test that a scenario reports latencies, queries and memory."""
+        from apps.core.benchmark import SCENARIOS, BenchContext, run_scenario
+
+        call_command("seed_synthetic", notes=5, todos_per_note=2, stdout=StringIO())
+        context = BenchContext(seed=1, page_size=20)
+        scenarios = {scenario.name: scenario for scenario in SCENARIOS}
+
+        for name in ("todos-list", "todos-delete"):
+            metrics = run_scenario(
+                scenarios[name], context, Client(HTTP_HOST="localhost"), iterations=3, warmup=1, instrumented=1
+            )
+            self.assertEqual(sum(metrics["status_codes"].values()), 3)
+            self.assertLessEqual(metrics["p50_ms"], metrics["p99_ms"])
+            self.assertGreater(metrics["queries"], 0)
+            self.assertGreater(metrics["peak_memory_kib"], 0)
+
+    def test_compare_with_baseline(self):
+        """Test the relative changes computed against a baseline."""
+        from apps.core.benchmark import compare
+
+        baseline = {"scenarios": {"a": {"p50_ms": 10, "queries": 2}, "gone": {"p50_ms": 1}}}
+        results = {"scenarios": {"a": {"p50_ms": 12, "queries": 2}, "new": {"p50_ms": 1}}}
+
+        changes = compare(results, baseline)
+        self.assertEqual(list(changes), ["a"])
+        self.assertEqual(changes["a"]["p50_ms"], 20.0)
+        self.assertEqual(changes["a"]["queries"], 0.0)
+        self.assertIsNone(changes["a"]["p95_ms"])
+
+
+class LoadRunnerTest(LiveServerTestCase):
+    """Test cases for the HTTP load generator, against a live server."""
+
+    def test_mix_run_reports_every_request(self):
+        """Test a short closed-loop run of the default mix, recorded then replayed."""
+        from apps.core.loadtest import DEFAULT_MIX, LoadRunner, mix_schedule, replay_schedule
+
+        note = Note.objects.create(title="Note", content="Texte")
+        Todo.objects.create(title="Todo", note=note)
+        # One worker: the live server threads share the single connection of the in-memory
+        # test database, so concurrent write transactions would collide on it
+        runner = LoadRunner(self.live_server_url, workers=1, seed=1)
+        runner.discover_ids()
+        self.assertEqual((runner.note_ids, len(runner.todo_ids)), ([note.pk], 1))
+
+        summary = runner.run(mix_schedule(DEFAULT_MIX, seed=1, rps=None, total=30), record=True).summary()
+        self.assertEqual(summary["requests"] + summary["skipped"], 30)
+        self.assertEqual(sum(summary["histogram"].values()), summary["requests"])
+        self.assertEqual(summary["error_rate"], 0)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "replay.ndjson")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.writelines(json.dumps(item) + "\n" for item in runner.recorded)
+        replayed = runner.run(replay_schedule(path, rps=None, speed=100)).summary()
+        self.assertEqual(replayed["requests"], summary["requests"])
+
+
+@override_settings(API_CACHE={"ENABLED": False})
+class QueryBudgetTest(TestCase):
+    """Query budgets of every registered endpoint, at several dataset sizes."""
+
+    def populate(self, size):
+        missing = size - Note.objects.count()
+        call_command("seed_synthetic", notes=missing, todos_per_note=3, orphans=missing, seed=size, stdout=StringIO())
+
+    def test_endpoints_stay_within_budget_at_every_size(self):
+        """Test that no endpoint exceeds its budget nor grows with the number of rows."""
+        from apps.core.query_budget import check_endpoint_budgets
+
+        counts = check_endpoint_budgets(Client(HTTP_HOST="localhost"), self.populate)
+
+        self.assertEqual(counts["notes-list"], [3, 3, 3])
+
+    def test_growing_query_count_is_detected(self):
+        """Test that an N+1 is reported even when it stays under the budget."""
+        from apps.core.query_budget import ENDPOINT_BUDGETS, check_endpoint_budgets
+        from apps.interface.views import HomeView
+
+        home = next(endpoint for endpoint in ENDPOINT_BUDGETS if endpoint.name == "home")
+        # Without the prefetch, the template runs queries per note
+        with mock.patch.object(HomeView, "get_queryset", lambda view: Note.objects.all()):
+            with self.assertRaisesMessage(AssertionError, "Query count depends on the dataset size: home"):
+                check_endpoint_budgets(
+                    Client(HTTP_HOST="localhost"),
+                    self.populate,
+                    sizes=(1, 2),
+                    endpoints=(home._replace(max_queries=100),),
+                )
+
+    def test_query_budget_reports_the_queries(self):
+        """Test the context manager failure message."""
+        from apps.core.query_budget import QueryBudgetExceeded, query_budget
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, "notes ran 2 queries, budget is 1"):
+            with query_budget(1, label="notes"):
+                list(Note.objects.all())
+                list(Todo.objects.all())
+
+        @query_budget(1)
+        def count_notes():
+            return Note.objects.count()
+
+        self.assertEqual(count_notes(), 0)
+
+
+
+@override_settings(API_CACHE={"ENABLED": False})
+@override_settings(DEBUG=True, REQUEST_TIMING={"SAMPLE_RATE": 1})
+class RequestTimingTest(TestCase):
+    """Test cases for the per-request timing middleware."""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST="localhost")
+        self.note = Note.objects.create(title="Note", content="Texte")
+        Todo.objects.create(title="Todo", note=self.note)
+
+    def timings(self, header):
+        metrics = {}
+        for metric in header.split(", "):
+            name, *params = metric.split(";")
+            metrics[name] = dict(param.split("=", 1) for param in params)
+        return metrics
+
+    def test_server_timing_header_reports_queries_and_phases(self):
+        """Test that the header counts the queries and times every phase of a list request."""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get("/api/notes/")
+        metrics = self.timings(response["Server-Timing"])
+        self.assertEqual(metrics["db"]["desc"], f'"{len(captured)} queries"')
+        for name in ("view", "serialize", "render", "total"):
+            self.assertGreater(float(metrics[name]["dur"]), 0)
+        self.assertGreaterEqual(float(metrics["total"]["dur"]), float(metrics["view"]["dur"]))
+
+    def test_note_status_cascade_is_timed(self):
+        """Test that a todo write reports the time of the note counter and status updates."""
+        response = self.client.post(
+            "/api/todos/", {"title": "Nouveau", "note": self.note.pk}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("note_status", self.timings(response["Server-Timing"]))
+
+    def test_structured_log_line(self):
+        """Test that one log line carries the measures of the request."""
+        records = []
+        sink = logger.add(records.append, format="{message}")
+        self.addCleanup(logger.remove, sink)
+        with override_settings(REQUEST_TIMING={"SAMPLE_RATE": 1, "LOG": True}):
+            self.client.get(f"/api/notes/{self.note.pk}/")
+
+        fields = [message.record["extra"]["request_timing"] for message in records
+                  if "request_timing" in message.record["extra"]]
+        self.assertEqual(len(fields), 1)
+        self.assertEqual(fields[0]["view"], "notes-detail")
+        self.assertEqual(fields[0]["status"], 200)
+        self.assertGreater(fields[0]["queries"], 0)
+
+    def test_sampling(self):
+        """Test that requests outside of the sample are not measured."""
+        with override_settings(REQUEST_TIMING={"SAMPLE_RATE": 0}):
+            self.assertFalse(self.client.get("/api/notes/").has_header("Server-Timing"))
+        with override_settings(REQUEST_TIMING={"ENABLED": False}):
+            self.assertFalse(self.client.get("/api/notes/").has_header("Server-Timing"))
+        with override_settings(REQUEST_TIMING={"SAMPLE_RATE": 1, "HEADER": False}):
+            self.assertFalse(self.client.get("/api/notes/").has_header("Server-Timing"))
+
+    def test_header_is_for_staff_users_without_debug(self):
+        """Test that the timings of the request are not exposed to everyone in production."""
+        with override_settings(DEBUG=False):
+            self.assertFalse(self.client.get("/api/notes/").has_header("Server-Timing"))
+            staff = User.objects.create_user("staff", password="secret", is_staff=True)
+            self.client.force_login(staff)
+            self.assertTrue(self.client.get("/api/notes/").has_header("Server-Timing"))
+
+
+class ProfilingMiddlewareTest(TestCase):
+    """Test cases for the on-demand profiling middleware."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.staff = User.objects.create_user("staff", password="secret", is_staff=True)
+        self.user = User.objects.create_user("user", password="secret")
+        Note.objects.create(title="Réunion client", content="Texte")
+
+    def client_for(self, user, **profiling):
+        settings = override_settings(
+            PROFILING={"ENABLED": True, "DIRECTORY": self.directory.name, **profiling},
+            API_CACHE={"ENABLED": False},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        client = Client(HTTP_HOST="localhost")
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def test_staff_gets_the_report_of_the_request(self):
+        """Test that ?profile=text replaces the response by the pstats report."""
+        # Every function listed, so that the assertions do not depend on timings
+        response = self.client_for(self.staff, LIMIT=10000).get("/api/notes/?search=client&profile=text")
+        report = response.content.decode()
+
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertIn("GET /api/notes/?search=client&profile=text -> 200", report)
+        self.assertIn("function calls", report)
+        self.assertIn("to_representation", report)
+
+    def test_profile_is_reserved_to_staff(self):
+        """Test that other users and anonymous clients get the normal response."""
+        for user in (self.user, None):
+            response = self.client_for(user).get("/api/notes/", HTTP_X_PROFILE="text")
+            self.assertEqual(response["Content-Type"], "application/json")
+
+    def test_stored_profiles_are_aggregated(self):
+        """Test that stored profiles are grouped by view and merged by profile_report."""
+        client = self.client_for(self.staff)
+        for _ in range(3):
+            response = client.get("/api/notes/", HTTP_X_PROFILE="store")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response["X-Profile-File"].startswith("notes-list.GET"))
+
+        out = StringIO()
+        call_command("profile_report", "notes-list.GET", "--last", "2", "--directory", self.directory.name, stdout=out)
+        self.assertIn("notes-list.GET : 2 requêtes agrégées", out.getvalue())
+
+        out = StringIO()
+        call_command("profile_report", "--directory", self.directory.name, stdout=out)
+        self.assertIn("notes-list.GET  (3 profils)", out.getvalue())
+
+    def test_sampled_requests_are_stored(self):
+        """Test that SAMPLE_RATE profiles requests without being asked nor telling anonymous clients."""
+        response = self.client_for(None, SAMPLE_RATE=1).get("/api/notes/")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertFalse(response.has_header("X-Profile-File"))
+        self.assertEqual(len(os.listdir(os.path.join(self.directory.name, "notes-list.GET"))), 1)
+
+        response = self.client_for(self.staff, SAMPLE_RATE=1).get("/api/notes/")
+        self.assertTrue(response["X-Profile-File"].startswith("notes-list.GET"))
+
+    def test_disabled_middleware_is_removed(self):
+        """Test that the middleware is not in the chain when disabled."""
+        from django.core.exceptions import MiddlewareNotUsed
+        from apps.core.profiling import ProfilingMiddleware
+
+        with override_settings(PROFILING={"ENABLED": False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: None)
+
+
+class SlowQueryLogTest(TestCase):
+    """Test cases for the slow query log and its summary command."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "slow.log")
+        self.addCleanup(remove_sink)
+        self.client = Client(HTTP_HOST="localhost")
+        Note.objects.create(title="Réunion client", content="Texte")
+
+    def logging_every_query(self, explain=True):
+        """Settings logging every query of the requests made in the block, with their plans."""
+        return override_settings(
+            SLOW_QUERIES={"THRESHOLD_MS": 0, "EXPLAIN": explain, "PATH": self.path},
+            API_CACHE={"ENABLED": False},
+        )
+
+    def entries(self):
+        wait_for_plans()
+        logger.complete()
+        return list(read_entries([self.path]))
+
+    def test_queries_are_logged_with_view_and_plan(self):
+        """Test that every query over the threshold is logged with its view and EXPLAIN plan."""
+        with self.logging_every_query():
+            self.client.get("/api/notes/?ordering=title")
+        entries = self.entries()
+
+        self.assertTrue(entries)
+        self.assertEqual({entry["view"] for entry in entries}, {"notes-list"})
+        ordered = next(entry for entry in entries if "ORDER BY" in entry["sql"] and "LIMIT" in entry["sql"])
+        self.assertEqual(ordered["path"], "/api/notes/?ordering=title")
+        self.assertGreaterEqual(ordered["duration_ms"], 0)
+        # The plan of the query is captured, but the EXPLAIN itself is not logged
+        self.assertTrue(any("SCAN" in line for line in ordered["plan"]))
+        self.assertFalse(any(entry["sql"].startswith("EXPLAIN") for entry in entries))
+
+    def test_plans_are_not_counted_in_the_request_queries(self):
+        """Test that the EXPLAIN statements run after the response, on another connection."""
+        with self.logging_every_query(), CaptureQueriesContext(connection) as captured:
+            self.client.get("/api/notes/?ordering=title")
+
+        self.assertEqual(len(captured), 3)
+        self.assertFalse(any(query["sql"].startswith("EXPLAIN") for query in captured.captured_queries))
+        self.assertTrue(all(entry["plan"] for entry in self.entries()))
+
+    def test_explainer_closes_its_connection_when_idle(self):
+        """Test that the background thread does not keep a connection open once its backlog is drained."""
+        # The in-memory test database ignores close(): check who closes, not the connection
+        threads = []
+
+        def record():
+            threads.append(threading.current_thread().name)
+
+        with mock.patch.object(connections, "close_all", side_effect=record):
+            with self.logging_every_query():
+                self.client.get("/api/notes/?ordering=title")
+            self.assertTrue(self.entries())
+
+        self.assertEqual(set(threads), {"slow-query-explainer"})
+
+    def test_plans_are_off_by_default(self):
+        """Test that slow reads are logged without a plan unless EXPLAIN is enabled."""
+        with self.logging_every_query(explain=False):
+            self.client.get("/api/notes/")
+
+        self.assertTrue(all(entry["plan"] is None for entry in self.entries()))
+
+    def test_writes_are_not_explained(self):
+        """Test that only reads are explained."""
+        with self.logging_every_query():
+            self.client.post("/api/notes/", {"title": "Nouvelle", "content": "Texte"}, content_type="application/json")
+        insert = next(entry for entry in self.entries() if entry["sql"].startswith("INSERT"))
+        self.assertIsNone(insert["plan"])
+        self.assertIn("Nouvelle", insert["params"])
+
+    def test_summary_command(self):
+        """Test that the command groups the queries and ranks them."""
+        with self.logging_every_query():
+            for _ in range(2):
+                self.client.get("/api/notes/?ordering=title")
+            self.client.get("/api/todos/")
+        self.entries()
+
+        out = StringIO()
+        call_command("slow_queries", "--path", self.path, "--view", "notes-list", "--sort", "count", stdout=out)
+        output = out.getvalue()
+        self.assertIn("#1  2x", output)
+        self.assertIn("Vues : notes-list", output)
+        self.assertIn("plan : ", output)
+        self.assertNotIn("todos-list", output)
+
+        with self.assertRaisesMessage(CommandError, "Aucun journal"):
+            call_command("slow_queries", "--path", os.path.join(self.directory.name, "missing.log"))
+
+
+class IndexAdvisorTest(TestCase):
+    """Test cases for the index advisor and the advise_indexes command."""
+
+    def setUp(self):
+        note = Note.objects.create(title="Réunion projet", content="Texte")
+        Todo.objects.create(title="Projet", note=note)
+
+    def test_query_shapes_follow_the_viewsets(self):
+        """Test that every ordering field, search, cursor and the by-note filter are enumerated."""
+        from apps.core.index_advisor import query_shapes
+
+        shapes = {shape.name: shape for shape in query_shapes({"note": 7})}
+        self.assertIn("notes-list ordering=-title", shapes)
+        self.assertIn("todos-list search ordering=status", shapes)
+        self.assertIn("todos-list cursor ordering=-updated_at", shapes)
+        self.assertEqual(shapes["todos-by-note"].path, "/api/todos/by-note/?note=7")
+        self.assertEqual(shapes["todos-by-note"].filters, ("note",))
+
+    def test_analyze_plan(self):
+        """Test the detection of full scans and sorts in SQLite and PostgreSQL plans."""
+        from apps.core.index_advisor import FULL_SCAN, SORT, analyze_plan
+
+        self.assertEqual(
+            analyze_plan("sqlite", ["SCAN todos_todo", "USE TEMP B-TREE FOR ORDER BY"]),
+            [(FULL_SCAN, "todos_todo"), (SORT, None)],
+        )
+        self.assertEqual(
+            analyze_plan(
+                "sqlite",
+                ["SCAN todos_todo USING INDEX todo_created_at_id_idx", "SCAN todos_todo_fts VIRTUAL TABLE INDEX 0:M1"],
+            ),
+            [],
+        )
+        self.assertEqual(
+            analyze_plan("postgresql", ["Limit", "  ->  Sort  (cost=1.1..1.2)", "        ->  Seq Scan on todos_todo"]),
+            [(SORT, None), (FULL_SCAN, "todos_todo")],
+        )
+
+    def test_command_suggests_indexes(self):
+        """Test that unindexed orderings get an index suggestion, indexed ones do not."""
+        from django.db.migrations.writer import MigrationWriter
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "index suggéré"):
+            call_command("advise_indexes", "--check", stdout=out)
+        output = out.getvalue()
+        self.assertIn("models.Index(fields=['title'], name='todo_title_idx')", output)
+        self.assertIn("models.Index(fields=['note', 'created_at'], name='todo_note_created_at_idx')", output)
+        self.assertNotIn("fields=['created_at']", output)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = property(lambda writer: os.path.join(directory, f"{writer.migration.app_label}.py"))
+            with mock.patch.object(MigrationWriter, "path", path):
+                call_command("advise_indexes", "--write-migration", stdout=StringIO())
+            with open(os.path.join(directory, "todos.py"), encoding="utf-8") as migration:
+                content = migration.read()
+        self.assertIn("('todos', '0006_todosearchindex')", content)
+        self.assertIn("migrations.AddIndex(", content)
+        self.assertIn("todo_note_created_at_idx", content)
+
+    def test_access_pattern_indexes_are_used(self):
+        """Test that status counts read the (note, status) index only and orphans skip the sort."""
+        def plan(queryset):
+            return " | ".join(explain("default", *queryset.query.sql_with_params()))
+
+        counts = Todo.objects.filter(note__isnull=False).order_by().values("note_id", "status").annotate(total=Count("id"))
+        self.assertIn("COVERING INDEX todo_note_status_idx", plan(counts))
+        orphans = plan(Todo.objects.filter(note__isnull=True))
+        self.assertIn("todo_orphan_created_at_idx", orphans)
+        self.assertNotIn("TEMP B-TREE", orphans)
+
+
+class SqliteTuningTest(TestCase):
+    """Test cases for the SQLite performance profile applied on connection."""
+
+    def open(self, **tuning):
+        """A new connection to a scratch database file, with the profile applied."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {**connection.settings_dict, "NAME": os.path.join(directory.name, "tuned.sqlite3")}
+        wrapper = DatabaseWrapper(settings_dict, alias="tuning")
+        with override_settings(SQLITE_TUNING=tuning):
+            wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_profile_is_applied_to_new_connections(self):
+        """Test WAL, synchronous, cache, mmap, busy timeout and immediate transactions."""
+        wrapper = self.open(CACHE_SIZE=-2048, MMAP_SIZE=1 << 20, BUSY_TIMEOUT_MS=1500)
+
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+        # NORMAL
+        self.assertEqual(self.pragma(wrapper, "synchronous"), 1)
+        self.assertEqual(self.pragma(wrapper, "cache_size"), -2048)
+        self.assertEqual(self.pragma(wrapper, "mmap_size"), 1 << 20)
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 1500)
+        # Only write_transaction() takes the write lock up front
+        self.assertIsNone(wrapper.transaction_mode)
+
+    def test_only_write_transactions_begin_immediate(self):
+        """Test that write_transaction() opens BEGIN IMMEDIATE and plain atomic() stays deferred."""
+        wrapper = self.open()
+        connections["tuning"] = wrapper
+        self.addCleanup(connections.__delitem__, "tuning")
+
+        with CaptureQueriesContext(wrapper) as queries:
+            with transaction.atomic(using="tuning"):
+                wrapper.cursor().execute("SELECT 1")
+            with write_transaction(using="tuning"):
+                with transaction.atomic(using="tuning"):
+                    wrapper.cursor().execute("SELECT 1")
+
+        begins = [query["sql"] for query in queries.captured_queries if query["sql"].startswith("BEGIN")]
+        self.assertEqual(begins, ["BEGIN", "BEGIN IMMEDIATE"])
+        self.assertIsNone(wrapper.transaction_mode)
+
+    def test_write_transaction_opens_a_closed_connection(self):
+        """Test that the first write_transaction() on a closed connection still begins IMMEDIATE."""
+        wrapper = self.open()
+        connections["tuning"] = wrapper
+        self.addCleanup(connections.__delitem__, "tuning")
+        wrapper.close()
+        # CaptureQueriesContext would reconnect on enter: log the queries directly
+        wrapper.force_debug_cursor = True
+        self.addCleanup(setattr, wrapper, "force_debug_cursor", False)
+
+        with write_transaction(using="tuning"):
+            wrapper.cursor().execute("SELECT 1")
+
+        begins = [query["sql"] for query in wrapper.queries if query["sql"].startswith("BEGIN")]
+        self.assertEqual(begins, ["BEGIN IMMEDIATE"])
+        self.assertIsNone(wrapper.transaction_mode)
+
+    def test_profile_can_be_disabled(self):
+        """Test that a disabled profile leaves the SQLite defaults."""
+        wrapper = self.open(ENABLED=False)
+
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "delete")
+        self.assertIsNone(wrapper.transaction_mode)
+
+    def test_invalid_mode_is_rejected(self):
+        """Test that enumerated pragmas only accept their documented values."""
+        from apps.core.sqlite_tuning import pragmas, sqlite_settings
+
+        with override_settings(SQLITE_TUNING={"JOURNAL_MODE": "WAL; DROP TABLE notes_note"}):
+            with self.assertRaisesMessage(ValueError, "SQLITE_TUNING['JOURNAL_MODE'] must be one of"):
+                pragmas(sqlite_settings())
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    """Test cases for the primary/replica router, with a SQLite file standing in for the replica."""
+
+    alias = "replica_test"
+
+    def setUp(self):
+        self.note = Note.objects.create(title="Répliquée", content="Texte")
+        self.todo = Todo.objects.create(title="Todo", note=self.note)
+
+        # The replica starts as a snapshot of the primary, then never catches up
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "replica.sqlite3")
+        connections["default"].ensure_connection()
+        snapshot = sqlite3.connect(path)
+        connections["default"].connection.backup(snapshot)
+        snapshot.close()
+
+        # A scratch alias, allowed for this test only
+        connections.settings[self.alias] = {**connections["default"].settings_dict, "NAME": path}
+        self.addCleanup(connections.settings.pop, self.alias)
+        self.addCleanup(connections.__delitem__, self.alias)
+        self.addCleanup(lambda: connections[self.alias].close())
+        databases = mock.patch.object(type(self), "databases", frozenset({*self.databases, self.alias}))
+        databases.start()
+        self.addCleanup(databases.stop)
+
+        settings = override_settings(
+            DATABASE_REPLICAS={"ALIASES": [self.alias], "STICKY_SECONDS": 5, "COOKIE": "read_primary"},
+            API_CACHE={"ENABLED": False},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = Client(HTTP_HOST="localhost")
+
+    def count_notes(self, client, **headers):
+        return client.get("/api/notes/", headers=headers).json()["count"]
+
+    def test_safe_requests_read_from_the_replica(self):
+        """Test that reads go to the replica, and code outside of a request reads the primary."""
+        Note.objects.create(title="Seulement sur le primaire", content="Texte")
+
+        self.assertEqual(self.count_notes(self.client), 1)
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_writes_and_cascades_go_to_the_primary(self):
+        """Test that a todo update and the note status it cascades to are written on the primary only."""
+        before = Note.objects.get(pk=self.note.pk).status
+        response = self.client.patch(
+            f"/api/todos/{self.todo.pk}/", {"status": "completed"}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Note.objects.get(pk=self.note.pk).status, NoteStatus.COMPLETED)
+        self.assertNotEqual(before, NoteStatus.COMPLETED)
+        self.assertEqual(Note.objects.using(self.alias).get(pk=self.note.pk).status, before)
+
+    def test_clients_read_their_writes_from_the_primary(self):
+        """Test the stickiness window, by cookie or by echoed header."""
+        response = self.client.post("/api/notes/", {"title": "Nouvelle", "content": "Texte"}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        until = response["X-Read-Primary"]
+        self.assertEqual(response.cookies["read_primary"]["max-age"], 5)
+
+        # The test client sends the cookie back
+        self.assertEqual(self.count_notes(self.client), 2)
+
+        other = Client(HTTP_HOST="localhost")
+        self.assertEqual(self.count_notes(other), 1)
+        self.assertEqual(self.count_notes(other, **{"X-Read-Primary": until}), 2)
+        self.assertEqual(self.count_notes(other, **{"X-Read-Primary": "1"}), 1)
+
+    def test_replica_reads_are_not_cached_while_the_replica_may_lag(self):
+        """Test that a response read from the lagging replica after a write is served, never cached."""
+        cache.clear()
+        with override_settings(API_CACHE={"ENABLED": True}):
+            self.client.post("/api/notes/", {"title": "Nouvelle", "content": "Texte"}, content_type="application/json")
+            other = Client(HTTP_HOST="localhost")
+            self.assertEqual(self.count_notes(other), 1)
+            self.assertEqual(other.get("/api/notes/")["X-Cache"], "MISS")
+            # The writer skips the cache and reads the primary
+            self.assertEqual(self.count_notes(self.client), 2)
+
+            # Past the stickiness window, replica reads are cached again
+            with mock.patch("apps.core.cache.time.time", return_value=time.time() + 6):
+                other.get("/api/notes/")
+                self.assertEqual(other.get("/api/notes/")["X-Cache"], "HIT")
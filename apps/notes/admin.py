@@ -7,4 +7,4 @@ class NoteAdmin(admin.ModelAdmin):
     list_display = ['id', 'title', 'status', 'created_at', 'updated_at']
     search_fields = ['title', 'content']
     list_filter = ['status', 'created_at']
-    readonly_fields = ['created_at', 'updated_at']
\ No newline at end of file
+    readonly_fields = ['pending_count', 'in_progress_count', 'completed_count', 'created_at', 'updated_at']
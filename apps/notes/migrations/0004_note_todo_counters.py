@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_todo_counters(apps, schema_editor):
+    """Backfill the per-status todo counters from the existing todos."""
+    Note = apps.get_model('notes', 'Note')
+    Todo = apps.get_model('todos', 'Todo')
+
+    counts = {}
+    rows = (
+        Todo.objects.filter(note__isnull=False)
+        .order_by()
+        .values('note_id', 'status')
+        .annotate(total=Count('id'))
+    )
+    for row in rows:
+        counts.setdefault(row['note_id'], {})[f"{row['status']}_count"] = row['total']
+
+    notes = []
+    for note in Note.objects.filter(pk__in=list(counts)):
+        for field_name, total in counts[note.pk].items():
+            if hasattr(note, field_name):
+                setattr(note, field_name, total)
+        notes.append(note)
+    Note.objects.bulk_update(notes, ['pending_count', 'in_progress_count', 'completed_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_alter_note_created_at'),
+        ('todos', '0002_alter_todo_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='in_progress_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_todo_counters, migrations.RunPython.noop),
+    ]
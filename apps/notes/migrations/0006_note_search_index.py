@@ -0,0 +1,24 @@
+# Full-text index for the ?search= parameter (see apps/core/fulltext.py)
+
+from django.db import migrations
+
+from apps.core.fulltext import create_fulltext_index, drop_fulltext_index
+
+
+def create_index(apps, schema_editor):
+    create_fulltext_index(schema_editor, 'notes_note', ['title', 'content'])
+
+
+def drop_index(apps, schema_editor):
+    drop_fulltext_index(schema_editor, 'notes_note')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0005_note_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
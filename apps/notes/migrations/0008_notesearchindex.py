@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_note_external_ref'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteSearchIndex',
+            fields=[
+                ('note', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='notes.note')),
+            ],
+            options={
+                'db_table': 'notes_note_fts',
+                'managed': False,
+            },
+        ),
+    ]
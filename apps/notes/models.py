@@ -1,6 +1,14 @@
+from collections import defaultdict
+from typing import Any, Iterable, Mapping, Optional, Union
+
 from django.db import models
+from django.db.models import Case, Count, F, Value, When
 from django.core.exceptions import ValidationError
+from django.dispatch import Signal
+from django.utils import timezone
 
+from apps.core.instrumentation import timed_phase
+from apps.core.metrics import NOTE_COUNTER_UPDATES, NOTE_STATUS_CHANGES, NOTE_STATUS_REFRESHES
 from apps.core.models import TimestampedModel
 
 
@@ -12,6 +20,42 @@ class NoteStatus(models.TextChoices):
     ARCHIVED = 'archived', 'Archived'
 
 
+# Sent with sender=Note when counters or statuses are changed by a set-based UPDATE,
+# which bypasses post_save (e.g. to invalidate cached responses)
+todo_counts_changed = Signal()
+
+# Denormalized per-status todo counters, keyed by todo status value.
+TODO_COUNTER_FIELDS = {
+    'pending': 'pending_count',
+    'in_progress': 'in_progress_count',
+    'completed': 'completed_count',
+}
+
+
+def status_from_counts(pending: int, in_progress: int, completed: int) -> str:
+    """
+    Derive a note status from its todo counters:
+    - IN_PROGRESS: if at least one todo is in progress
+    - COMPLETED: if all todos are completed
+    - ACTIVE: otherwise (pending todos or no todos at all)
+    """
+    if in_progress > 0:
+        return NoteStatus.IN_PROGRESS
+    if pending == 0 and completed > 0:
+        return NoteStatus.COMPLETED
+    return NoteStatus.ACTIVE
+
+
+def status_from_counts_expression() -> Case:
+    """SQL counterpart of `status_from_counts`, evaluated on the counter columns."""
+    return Case(
+        When(in_progress_count__gt=0, then=Value(NoteStatus.IN_PROGRESS)),
+        When(pending_count=0, completed_count__gt=0, then=Value(NoteStatus.COMPLETED)),
+        default=Value(NoteStatus.ACTIVE),
+        output_field=models.CharField(),
+    )
+
+
 class Note(TimestampedModel):
     """
     A note is a piece of content that can be created, read, updated, and deleted.
@@ -28,15 +72,42 @@ class Note(TimestampedModel):
         help_text="Status automatically updated based on associated todos"
     )
 
+    # Identifier of the note in the system it was imported from (see `import_data`)
+    external_ref = models.CharField(max_length=100, null=True, blank=True, unique=True, editable=False)
+
+    # Maintained by the todo signals with atomic F() deltas, never by save()
+    pending_count = models.PositiveIntegerField(default=0, editable=False)
+    in_progress_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Note'
         verbose_name_plural = 'Notes'
+        indexes = [
+            # Keyset pagination and ordering on (timestamp, id)
+            models.Index(fields=['created_at', 'id'], name='note_created_at_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='note_updated_at_id_idx'),
+        ]
 
     def __str__(self) -> str:
 
         return self.title
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Save the note without writing back the todo counters of an existing row.
+        The in-memory counters may be stale, and writing them would undo
+        concurrent deltas applied by the todo signals.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in TODO_COUNTER_FIELDS.values()
+            ]
+        super().save(*args, **kwargs)
+
     def delete(self, *args, **kwargs) -> None:
         """
         Prevent deletion if this note has associated todos.
@@ -51,6 +122,11 @@ class Note(TimestampedModel):
             )
         super().delete(*args, **kwargs)
 
+    @property
+    def todos_total(self) -> int:
+        """Number of todos attached to this note, according to the counters."""
+        return self.pending_count + self.in_progress_count + self.completed_count
+
     def update_status_from_todos(self) -> bool:
         """
         Automatically update the note's status based on associated todos:
@@ -58,34 +134,22 @@ class Note(TimestampedModel):
         - IN_PROGRESS: if at least one todo is in progress
         - ACTIVE: if there are pending todos
         - ARCHIVED: no change if already archived (manual status)
-        
+
+        The decision is read from the denormalized counters, so it costs
+        the same whatever the number of todos.
         Returns True if status was changed, False otherwise.
         """
         # Don't auto-update archived notes
         if self.status == NoteStatus.ARCHIVED:
             return False
 
-        # Import TodoStatus here to avoid circular import
-        from apps.todos.models import TodoStatus
-        
-        todos = getattr(self, 'todos', None)
-        if not todos:
+        if self.pk is None:
             return False
-        
-        # No todos associated - reset to ACTIVE
-        if not todos.exists():
-            return self._update_status(NoteStatus.ACTIVE)
-        
-        # Determine new status based on todo statuses
-        todo_statuses = todos.values_list('status', flat=True)
-        
-        if all(status == TodoStatus.COMPLETED for status in todo_statuses):
-            new_status = NoteStatus.COMPLETED
-        elif TodoStatus.IN_PROGRESS in todo_statuses:
-            new_status = NoteStatus.IN_PROGRESS
-        else:
-            new_status = NoteStatus.ACTIVE
 
+        self.refresh_from_db(fields=list(TODO_COUNTER_FIELDS.values()))
+        new_status = status_from_counts(
+            self.pending_count, self.in_progress_count, self.completed_count
+        )
         return self._update_status(new_status)
     
     def _update_status(self, new_status: str) -> bool:
@@ -94,4 +158,141 @@ class Note(TimestampedModel):
             self.status = new_status
             self.save(update_fields=['status', 'updated_at'])
             return True
-        return False
\ No newline at end of file
+        return False
+
+    @classmethod
+    @timed_phase('note_status')
+    def apply_todo_count_deltas(
+        cls,
+        deltas: Mapping[int, Mapping[str, int]],
+        refresh_status: bool = True,
+    ) -> list[int]:
+        """
+        Apply per-status todo counter deltas, e.g. ``{note_id: {'pending': -1, 'completed': 1}}``,
+        then refresh the status of the affected notes unless ``refresh_status`` is False.
+        Counters are changed with F() expressions so concurrent writers never lose an update;
+        notes sharing the same deltas are updated by a single statement, which also bumps
+        ``updated_at``.
+        Returns the ids of the notes whose counters changed.
+        """
+        grouped: dict[frozenset, list[int]] = defaultdict(list)
+        for note_id, status_deltas in deltas.items():
+            changes = frozenset(
+                (TODO_COUNTER_FIELDS[todo_status], delta)
+                for todo_status, delta in status_deltas.items()
+                if delta and todo_status in TODO_COUNTER_FIELDS
+            )
+            if changes:
+                grouped[changes].append(note_id)
+
+        touched = []
+        now = timezone.now()
+        for changes, note_ids in grouped.items():
+            # updated_at moves too: the todo counts are part of the note representation
+            cls.objects.filter(pk__in=note_ids).update(
+                updated_at=now,
+                **{field_name: F(field_name) + delta for field_name, delta in changes},
+            )
+            touched.extend(note_ids)
+        if touched:
+            NOTE_COUNTER_UPDATES.inc(amount=len(touched))
+            todo_counts_changed.send(sender=cls, note_ids=touched)
+            if refresh_status:
+                cls.refresh_statuses(touched)
+        return touched
+
+    @classmethod
+    @timed_phase('note_status')
+    def refresh_statuses(cls, note_ids: Union[Iterable[int], models.QuerySet]) -> int:
+        """
+        Recompute the status of the given notes from their counters in a single UPDATE.
+        ``note_ids`` may also be a queryset of ids, used as a subquery.
+        Archived notes and notes whose status is already right are left untouched.
+        Returns the number of notes whose status changed.
+        """
+        if not isinstance(note_ids, models.QuerySet):
+            note_ids = list(note_ids)
+        expression = status_from_counts_expression()
+        changed = (
+            cls.objects.filter(pk__in=note_ids)
+            .exclude(status=NoteStatus.ARCHIVED)
+            .exclude(status=expression)
+            .update(status=expression, updated_at=timezone.now())
+        )
+        NOTE_STATUS_REFRESHES.inc()
+        if changed:
+            NOTE_STATUS_CHANGES.inc(amount=changed)
+            todo_counts_changed.send(sender=cls, note_ids=note_ids)
+        return changed
+
+    @classmethod
+    def reconcile_todo_counts(
+        cls,
+        note_ids: Optional[Iterable[int]] = None,
+        batch_size: int = 500,
+    ) -> int:
+        """
+        Recount todos per note and status with one grouped query and repair
+        any counter or status drift (e.g. after ``QuerySet.update()`` or raw SQL).
+        Returns the number of notes that were repaired.
+        """
+        todo_model = cls._meta.get_field('todos').related_model
+        todos = todo_model.objects.filter(note__isnull=False)
+        notes = cls.objects.only('id', 'status', *TODO_COUNTER_FIELDS.values())
+        if note_ids is not None:
+            note_ids = list(note_ids)
+            todos = todos.filter(note_id__in=note_ids)
+            notes = notes.filter(pk__in=note_ids)
+
+        expected: dict[int, dict[str, int]] = defaultdict(dict)
+        for row in todos.order_by().values('note_id', 'status').annotate(total=Count('id')):
+            expected[row['note_id']][row['status']] = row['total']
+
+        now = timezone.now()
+        drifted = []
+        for note in notes.order_by().iterator(chunk_size=batch_size):
+            counts = expected.get(note.pk, {})
+            changed = False
+            for todo_status, field_name in TODO_COUNTER_FIELDS.items():
+                value = counts.get(todo_status, 0)
+                if getattr(note, field_name) != value:
+                    setattr(note, field_name, value)
+                    changed = True
+            if note.status != NoteStatus.ARCHIVED:
+                new_status = status_from_counts(
+                    note.pending_count, note.in_progress_count, note.completed_count
+                )
+                if note.status != new_status:
+                    note.status = new_status
+                    changed = True
+            if changed:
+                note.updated_at = now
+                drifted.append(note)
+
+        cls.objects.bulk_update(
+            drifted,
+            ['status', 'updated_at', *TODO_COUNTER_FIELDS.values()],
+            batch_size=batch_size,
+        )
+        if drifted:
+            todo_counts_changed.send(sender=cls, note_ids=[note.pk for note in drifted])
+        return len(drifted)
+
+
+class NoteSearchIndex(models.Model):
+    """
+    Row of the SQLite full-text index of the notes (see `apps.core.fulltext`).
+    Unmanaged: only declared so that a search can join the index on its rowid.
+    """
+    note = models.OneToOneField(
+        Note,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'notes_note_fts'
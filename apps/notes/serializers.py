@@ -1,14 +1,24 @@
 from rest_framework import serializers
-from .models import Note
 
-class NoteSerializer(serializers.ModelSerializer):
+from apps.core.instrumentation import TimedSerializerMixin
+from .models import Note, TODO_COUNTER_FIELDS
+
+class NoteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     todos_count = serializers.SerializerMethodField()
+    todos_by_status = serializers.SerializerMethodField()
     
     class Meta:
         model = Note
-        fields = ["id", "title", "content", "status", "todos_count", "created_at", "updated_at"]
-        read_only_fields = ["id", "status", "todos_count", "created_at", "updated_at"]
+        fields = ["id", "title", "content", "status", "todos_count", "todos_by_status", "created_at", "updated_at"]
+        read_only_fields = ["id", "status", "todos_count", "todos_by_status", "created_at", "updated_at"]
     
     def get_todos_count(self, obj: Note) -> int:
-        """Return the number of todos associated with this note."""
-        return obj.todos.count()
\ No newline at end of file
+        """
+        Return the number of todos associated with this note.
+        Read from the denormalized counters, so listing notes needs no join on todos.
+        """
+        return sum(getattr(obj, field_name) for field_name in TODO_COUNTER_FIELDS.values())
+
+    def get_todos_by_status(self, obj: Note) -> dict[str, int]:
+        """Return the number of todos per status, from the denormalized counters."""
+        return {todo_status: getattr(obj, field_name) for todo_status, field_name in TODO_COUNTER_FIELDS.items()}
@@ -1,10 +1,19 @@
-from django.test import TestCase
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.reverse import reverse
 from django.core.exceptions import ValidationError
 
 from .models import Note, NoteStatus
+from .serializers import NoteSerializer
 from apps.todos.models import Todo, TodoStatus
 
 
@@ -42,7 +51,6 @@ class NoteSerializerTest(TestCase):
 
     def test_serialize_note(self):
         """Test the serialization of a note"""
-        from .serializers import NoteSerializer
         note = Note.objects.create(
             title="Test Note",
             content="Contenu de test"
@@ -388,3 +396,363 @@ class TodoSignalTest(TestCase):
         self.note.refresh_from_db()
         self.assertEqual(self.note.status, NoteStatus.IN_PROGRESS)
 
+
+class NoteTodoCounterTest(TestCase):
+    """Test cases for the denormalized per-status todo counters."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.note = Note.objects.create(
+            title="Counter Note",
+            content="Test content"
+        )
+
+    def assertCounts(self, note, pending, in_progress, completed):
+        note.refresh_from_db()
+        self.assertEqual(
+            (note.pending_count, note.in_progress_count, note.completed_count),
+            (pending, in_progress, completed),
+        )
+
+    def test_create_and_status_change_update_counters(self):
+        """Test that counters follow todo creation and status changes."""
+        todo = Todo.objects.create(title="Todo", note=self.note)
+        self.assertCounts(self.note, 1, 0, 0)
+
+        todo.status = TodoStatus.COMPLETED
+        todo.save()
+        self.assertCounts(self.note, 0, 0, 1)
+        self.assertEqual(self.note.status, NoteStatus.COMPLETED)
+
+    def test_reparent_todo_moves_counters(self):
+        """Test that moving a todo to another note updates both notes."""
+        other = Note.objects.create(title="Other", content="Text")
+        todo = Todo.objects.create(title="Todo", note=self.note, status=TodoStatus.IN_PROGRESS)
+
+        todo.note = other
+        todo.save()
+
+        self.assertCounts(self.note, 0, 0, 0)
+        self.assertCounts(other, 0, 1, 0)
+        self.assertEqual(self.note.status, NoteStatus.ACTIVE)
+        self.assertEqual(other.status, NoteStatus.IN_PROGRESS)
+
+    def test_delete_todo_decrements_counters(self):
+        """Test that deleting todos, one by one or in bulk, decrements counters."""
+        todo = Todo.objects.create(title="Todo 1", note=self.note)
+        Todo.objects.create(title="Todo 2", note=self.note, status=TodoStatus.COMPLETED)
+
+        todo.delete()
+        self.assertCounts(self.note, 0, 0, 1)
+
+        Todo.objects.filter(note=self.note).delete()
+        self.assertCounts(self.note, 0, 0, 0)
+
+    def test_save_with_update_fields_ignores_unsaved_status(self):
+        """Test that only the saved fields are reflected in the counters."""
+        todo = Todo.objects.create(title="Todo", note=self.note)
+        todo.status = TodoStatus.COMPLETED
+        todo.title = "Renamed"
+        todo.save(update_fields=['title'])
+
+        self.assertCounts(self.note, 1, 0, 0)
+
+    def test_stale_note_save_keeps_counters(self):
+        """Test that saving a stale note instance does not overwrite the counters."""
+        stale = Note.objects.get(pk=self.note.pk)
+        Todo.objects.create(title="Todo", note=self.note)
+
+        stale.title = "Renamed"
+        stale.save()
+
+        self.assertCounts(self.note, 1, 0, 0)
+        self.assertEqual(self.note.title, "Renamed")
+
+    def test_reconcile_repairs_drift(self):
+        """Test that reconciliation repairs counters changed behind the signals."""
+        Todo.objects.create(title="Todo 1", note=self.note)
+        Todo.objects.create(title="Todo 2", note=self.note)
+        Todo.objects.filter(note=self.note).update(status=TodoStatus.COMPLETED)
+        self.assertCounts(self.note, 2, 0, 0)
+
+        repaired = Note.reconcile_todo_counts()
+
+        self.assertEqual(repaired, 1)
+        self.assertCounts(self.note, 0, 0, 2)
+        self.assertEqual(self.note.status, NoteStatus.COMPLETED)
+        self.assertEqual(Note.reconcile_todo_counts(), 0)
+
+
+class NoteTodoCountAnnotationTest(APITestCase):
+    """Test cases for the todo counts exposed by the Note API, read from the counters."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.note = Note.objects.create(title="Annotated", content="Text")
+        Todo.objects.create(title="Todo 1", note=self.note, status=TodoStatus.PENDING)
+        Todo.objects.create(title="Todo 2", note=self.note, status=TodoStatus.COMPLETED)
+        Todo.objects.create(title="Todo 3", note=self.note, status=TodoStatus.COMPLETED)
+        Note.objects.create(title="Empty", content="Text")
+
+    def test_list_counts_todos_by_status(self):
+        """Test that the list endpoint returns total and per-status counts."""
+        response = self.client.get(reverse('notes-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = {item['title']: item for item in response.data['results']}
+        self.assertEqual(data['Annotated']['todos_count'], 3)
+        self.assertEqual(
+            data['Annotated']['todos_by_status'],
+            {'pending': 1, 'in_progress': 0, 'completed': 2},
+        )
+        self.assertEqual(data['Empty']['todos_count'], 0)
+
+    def test_list_query_count_does_not_grow_with_notes(self):
+        """Test that listing notes runs a fixed number of queries."""
+        for index in range(5):
+            note = Note.objects.create(title=f"Note {index}", content="Text")
+            Todo.objects.create(title="Todo", note=note)
+
+        # One aggregate for the ETag, one COUNT for the pagination, one SELECT for the page
+        with self.assertNumQueries(3) as captured:
+            response = self.client.get(reverse('notes-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Neither query joins or groups the todos
+        for query in captured.captured_queries:
+            self.assertNotIn('todos_todo', query['sql'])
+            self.assertNotIn('GROUP BY', query['sql'])
+
+    def test_serializer_reads_the_counters(self):
+        """Test that the serializer counts todos on a plain instance without querying."""
+        note = Note.objects.get(pk=self.note.pk)
+        with self.assertNumQueries(0):
+            data = NoteSerializer(note).data
+
+        self.assertEqual(data['todos_count'], 3)
+        self.assertEqual(data['todos_by_status']['completed'], 2)
+
+
+class NoteFullTextSearchTest(APITestCase):
+    """Test cases for the full-text ?search= backend on notes."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.url = reverse('notes-list')
+        self.title_match = Note.objects.create(title="Réunion produit", content="Ordre du jour")
+        self.content_match = Note.objects.create(title="Divers", content="Préparer la réunion de lundi")
+        Note.objects.create(title="Lecture", content="Chapitre sur les permissions")
+
+    def _titles(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data['results']]
+
+    def test_search_ranks_by_relevance(self):
+        """Test that a title match ranks above a content match."""
+        self.assertEqual(self._titles(search='réunion'), ["Réunion produit", "Divers"])
+
+    def test_search_matches_prefixes_and_ignores_accents(self):
+        """Test that words match as prefixes, with or without accents."""
+        self.assertEqual(self._titles(search='reunion prod'), ["Réunion produit"])
+
+    def test_search_requires_every_word(self):
+        """Test that all words of the search must match."""
+        self.assertEqual(self._titles(search='réunion permissions'), [])
+
+    def test_explicit_ordering_overrides_rank(self):
+        """Test that ?ordering= takes precedence over relevance."""
+        self.assertEqual(self._titles(search='réunion', ordering='title'), ["Divers", "Réunion produit"])
+
+    def test_rank_reads_the_joined_match(self):
+        """Test that the page query matches the index once, not once per matched row."""
+        with CaptureQueriesContext(connection) as captured:
+            self._titles(search='réunion')
+
+        page_query = captured.captured_queries[-1]['sql']
+        self.assertEqual(page_query.count('MATCH'), 1)
+        self.assertIn('bm25', page_query)
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the database triggers keep the index in sync."""
+        self.title_match.title = "Atelier produit"
+        self.title_match.save()
+        self.content_match.delete()
+
+        self.assertEqual(self._titles(search='réunion'), [])
+        self.assertEqual(self._titles(search='atelier'), ["Atelier produit"])
+
+
+class NoteResponseCacheTest(APITestCase):
+    """Test cases for the cached read endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.note = Note.objects.create(title="Cached", content="Text")
+        self.list_url = reverse('notes-list')
+        self.detail_url = reverse('notes-detail', kwargs={'pk': self.note.pk})
+
+    def test_second_read_is_served_from_cache(self):
+        """Test that a repeated request runs no query."""
+        first = self.client.get(self.list_url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.list_url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_query_string_is_part_of_the_key(self):
+        """Test that search, ordering and page parameters get their own entries."""
+        self.client.get(self.list_url, {'ordering': 'title'})
+        response = self.client.get(self.list_url, {'ordering': '-title'})
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_todo_write_invalidates_note_responses(self):
+        """Test that the cascading counter update invalidates cached notes."""
+        self.client.get(self.detail_url)
+        Todo.objects.create(title="Todo", note=self.note, status=TodoStatus.IN_PROGRESS)
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['todos_count'], 1)
+        self.assertEqual(response.data['status'], NoteStatus.IN_PROGRESS)
+
+    def test_note_queryset_delete_invalidates_todo_responses(self):
+        """Test that todos unlinked by a note deletion (SET_NULL) are not served stale."""
+        todo = Todo.objects.create(title="Todo", note=self.note)
+        todo_url = reverse('todos-detail', kwargs={'pk': todo.pk})
+        self.client.get(todo_url)
+
+        # Bypasses Note.delete(): the todo is unlinked by an UPDATE, without todo signals
+        Note.objects.filter(pk=self.note.pk).delete()
+
+        response = self.client.get(todo_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIsNone(response.data['note'])
+
+    def test_note_update_invalidates_cache(self):
+        """Test that writing through the API invalidates the cached detail."""
+        self.client.get(self.detail_url)
+        self.client.patch(self.detail_url, {'title': 'Renamed'}, format='json')
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['title'], 'Renamed')
+
+    def test_stats_endpoint(self):
+        """Test that hits and misses are exposed to staff users only."""
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.json()['hits'], 1)
+        self.assertEqual(response.json()['misses'], 1)
+        self.assertEqual(response.json()['hit_ratio'], 0.5)
+
+
+@override_settings(API_CACHE={'ENABLED': False})
+class NoteConditionalGetTest(APITestCase):
+    """Test cases for the ETag / Last-Modified validators."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.note = Note.objects.create(title="Conditional", content="Text")
+        self.list_url = reverse('notes-list')
+        self.detail_url = reverse('notes-detail', kwargs={'pk': self.note.pk})
+
+    def test_matching_etag_returns_not_modified_without_serializing(self):
+        """Test that a fresh client copy costs a single cheap query."""
+        first = self.client.get(self.detail_url)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+    def test_if_modified_since(self):
+        """Test that Last-Modified can be used as validator too."""
+        first = self.client.get(self.detail_url)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_todo_change_invalidates_note_etag(self):
+        """Test that the counters update moves the note validators."""
+        first = self.client.get(self.detail_url)
+        Todo.objects.create(title="Todo", note=self.note)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.data['todos_count'], 1)
+
+    def test_list_etag_follows_the_collection(self):
+        """Test that creating or deleting a note changes the list ETag."""
+        first = self.client.get(self.list_url)
+        self.assertNotIn('Last-Modified', first)
+        not_modified = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        other = Note.objects.create(title="Other", content="Text")
+        created = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(created.status_code, status.HTTP_200_OK)
+
+        other.delete()
+        deleted = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=created['ETag'])
+        self.assertEqual(deleted.status_code, status.HTTP_200_OK)
+
+    def test_unchanged_list_is_not_serialized(self):
+        """Test that a fresh list copy costs the fingerprint query only."""
+        first = self.client.get(self.list_url)
+
+        # Neither the COUNT nor the page SELECT runs
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+    def test_non_numeric_pk_returns_not_found(self):
+        """Test that a malformed pk is a 404, not a server error of the fingerprint lookup."""
+        response = self.client.get(reverse('notes-detail', kwargs={'pk': 'abc'}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_query_string_is_part_of_the_list_etag(self):
+        """Test that two filters on the same data get distinct ETags."""
+        first = self.client.get(self.list_url, {'ordering': 'title'})
+        second = self.client.get(self.list_url, {'ordering': '-title'})
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_cached_response_answers_conditional_request(self):
+        """Test that a cache hit is turned into a 304 without any query."""
+        with self.settings(API_CACHE={'ENABLED': True}):
+            cache.clear()
+            first = self.client.get(self.detail_url)
+            with self.assertNumQueries(0):
+                response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+
+class NoteExportTest(APITestCase):
+    """Test cases for the notes export endpoint."""
+
+    def test_export_csv_includes_todo_counts(self):
+        """Test that the annotated counters are exported, nested values as JSON."""
+        note = Note.objects.create(title="Exported", content="Text")
+        Todo.objects.create(title="Todo", note=note, status=TodoStatus.COMPLETED)
+
+        response = self.client.get(reverse('notes-export'), {'format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+        self.assertEqual(rows[0]['todos_count'], '1')
+        self.assertEqual(json.loads(rows[0]['todos_by_status'])['completed'], 1)
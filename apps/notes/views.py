@@ -8,6 +8,11 @@ from .models import Note
 from .serializers import NoteSerializer
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
+from apps.core.cache import CachedResponseMixin
+from config.api.conditional import ConditionalGetMixin
+from config.api.export import StreamingExportMixin
+from config.api.pagination import OptInCursorPagination
+
 @extend_schema(tags=['Notes'])
 @extend_schema_view(
     list=extend_schema(summary='List all notes'),
@@ -16,10 +21,10 @@ from drf_spectacular.utils import extend_schema, extend_schema_view
     update=extend_schema(summary='Update a note by ID'),
     destroy=extend_schema(summary='Delete a note by ID'),
 )
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(CachedResponseMixin, ConditionalGetMixin, StreamingExportMixin, viewsets.ModelViewSet):
     """Viewset for the Note model."""
 
-    queryset = Note.objects.prefetch_related("todos").all()
+    queryset = Note.objects.all()
     serializer_class = NoteSerializer
     
     # Search by title and content
@@ -29,6 +34,13 @@ class NoteViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at', 'title', 'status']
     ordering = ['-created_at']  # Default: most recent first
 
+    # Opt-in keyset pagination (?pagination=cursor), limited to fields with a (field, id) index
+    pagination_class = OptInCursorPagination
+    cursor_ordering_fields = ['created_at', 'updated_at']
+
+    # Cached list/retrieve responses, invalidated by writes to these models
+    cache_dependencies = ('notes.Note', 'todos.Todo')
+
     def destroy(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """
         Override destroy to handle ValidationError from Note.delete().
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0005_note_ordering_indexes'),
+        ('todos', '0002_alter_todo_created_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['created_at', 'id'], name='todo_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['updated_at', 'id'], name='todo_updated_at_id_idx'),
+        ),
+    ]
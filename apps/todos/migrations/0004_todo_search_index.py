@@ -0,0 +1,24 @@
+# Full-text index for the ?search= parameter (see apps/core/fulltext.py)
+
+from django.db import migrations
+
+from apps.core.fulltext import create_fulltext_index, drop_fulltext_index
+
+
+def create_index(apps, schema_editor):
+    create_fulltext_index(schema_editor, 'todos_todo', ['title', 'description'])
+
+
+def drop_index(apps, schema_editor):
+    drop_fulltext_index(schema_editor, 'todos_todo')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0003_todo_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
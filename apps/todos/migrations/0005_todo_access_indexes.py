@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_note_external_ref'),
+        ('todos', '0004_todo_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['note', 'status'], name='todo_note_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('note__isnull', True)), fields=['note', 'created_at', 'id'], name='todo_orphan_created_at_idx'),
+        ),
+        # todo_note_status_idx leads with note_id: the foreign key index is redundant
+        migrations.AlterField(
+            model_name='todo',
+            name='note',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='todos', to='notes.note'),
+        ),
+    ]
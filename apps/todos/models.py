@@ -1,9 +1,24 @@
-from django.db import models
-from django.db.models.signals import post_save, post_delete
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from typing import Any
+from typing import Any, Iterable, Iterator, Optional
 
 from apps.core.models import TimestampedModel
+from apps.core.sqlite_tuning import write_transaction
+
+# (note_id, status) pair of a todo as currently reflected in the note counters
+CountedState = tuple[Optional[int], str]
+
+_counter_signals_suspended: ContextVar[bool] = ContextVar('todo_counter_signals_suspended', default=False)
+# Counter deltas collected by `defer_note_status_updates`, None when not deferring
+_deferred_deltas: ContextVar[Optional['_DeferredDeltas']] = ContextVar(
+    'todo_deferred_counter_deltas', default=None
+)
+
 
 class TodoStatus(models.TextChoices):
     """Enum for the status of a todo"""
@@ -28,29 +43,230 @@ class Todo(TimestampedModel):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='todos'
+        related_name='todos',
+        # Covered by the leading column of todo_note_status_idx
+        db_index=False,
     )
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination and ordering on (timestamp, id)
+            models.Index(fields=['created_at', 'id'], name='todo_created_at_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='todo_updated_at_id_idx'),
+            # Per-note status counts of the counter recount, read from the index only
+            models.Index(fields=['note', 'status'], name='todo_note_status_idx'),
+            # Orphan todos of the home page, newest first: a small index without the attached todos.
+            # Led by note_id so that SQLite matches `note_id IS NULL` and skips the sort
+            models.Index(
+                fields=['note', 'created_at', 'id'],
+                condition=Q(note__isnull=True),
+                name='todo_orphan_created_at_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db: Optional[str], field_names: list[str], values: list[Any]) -> "Todo":
+        instance = super().from_db(db, field_names, values)
+        instance._remember_counted_state()
+        return instance
+
+    def _remember_counted_state(self) -> None:
+        """Snapshot the (note, status) pair stored in the database for counter deltas."""
+        deferred = self.get_deferred_fields()
+        if 'note_id' in deferred or 'status' in deferred:
+            self._counted_state = None
+        else:
+            self._counted_state = (self.note_id, self.status)
+
+
+class TodoSearchIndex(models.Model):
+    """
+    Row of the SQLite full-text index of the todos (see `apps.core.fulltext`).
+    Unmanaged: only declared so that a search can join the index on its rowid.
+    """
+    todo = models.OneToOneField(
+        Todo,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'todos_todo_fts'
+
+
+def _note_model() -> type[models.Model]:
+    return Todo._meta.get_field('note').related_model
+
+
+def todo_count_deltas(
+    transitions: Iterable[tuple[Optional[CountedState], Optional[CountedState]]],
+) -> dict[int, dict[str, int]]:
+    """
+    Return the per-note, per-status counter changes for a batch of
+    ``(previous, current)`` todo states (``None`` for a created or deleted todo).
+    """
+    deltas: dict[int, dict[str, int]] = {}
+    for previous, current in transitions:
+        if previous == current:
+            continue
+        for state, delta in ((previous, -1), (current, 1)):
+            if state is None or state[0] is None:
+                continue
+            note_id, todo_status = state
+            note_deltas = deltas.setdefault(note_id, {})
+            note_deltas[todo_status] = note_deltas.get(todo_status, 0) + delta
+    return deltas
+
+
+@contextmanager
+def suspend_note_counter_signals() -> Iterator[None]:
+    """
+    Skip the per-row counter updates done by the todo signals.
+    The caller is responsible for applying the deltas itself
+    (``Note.apply_todo_count_deltas``) or reconciling afterwards.
+    """
+    token = _counter_signals_suspended.set(True)
+    try:
+        yield
+    finally:
+        _counter_signals_suspended.reset(token)
+
+
+class _DeferredDeltas:
+    """
+    Counter deltas collected by ``defer_note_status_updates``, grouped by the
+    savepoints open when they were collected.
+
+    Installed as an execute wrapper on the connection for the duration of the
+    block, to drop the deltas of a nested ``atomic()`` that rolls back.
+    """
+
+    def __init__(self, connection: Any) -> None:
+        self.connection = connection
+        self.by_savepoints: dict[tuple[str, ...], dict[int, dict[str, int]]] = {}
+        self.rollbacks: set[str] = set()
+
+    def __call__(self, execute: Any, sql: str, params: Any, many: bool, context: dict) -> Any:
+        if sql.startswith('ROLLBACK TO SAVEPOINT'):
+            self.rollbacks.add(sql)
+        return execute(sql, params, many, context)
+
+    def add(self, deltas: dict[int, dict[str, int]]) -> None:
+        savepoints = tuple(sid for sid in self.connection.savepoint_ids if sid)
+        _merge_deltas(self.by_savepoints.setdefault(savepoints, {}), deltas)
+
+    def merged(self) -> dict[int, dict[str, int]]:
+        """The deltas of the savepoints that were not rolled back."""
+        merged: dict[int, dict[str, int]] = {}
+        for savepoints, deltas in self.by_savepoints.items():
+            if not any(self.connection.ops.savepoint_rollback_sql(sid) in self.rollbacks for sid in savepoints):
+                _merge_deltas(merged, deltas)
+        return merged
+
+
+def _merge_deltas(into: dict[int, dict[str, int]], deltas: dict[int, dict[str, int]]) -> None:
+    for note_id, status_deltas in deltas.items():
+        note_deltas = into.setdefault(note_id, {})
+        for todo_status, delta in status_deltas.items():
+            note_deltas[todo_status] = note_deltas.get(todo_status, 0) + delta
+
+
+@contextmanager
+def defer_note_status_updates(using: Optional[str] = None) -> Iterator[None]:
+    """
+    Coalesce the note updates triggered by the todo signals in a transaction.
+
+    Inside the block, counter deltas are only collected. When the block exits
+    they are applied once per note, still inside the transaction, and the status
+    of every dirty note is recomputed by a single UPDATE from ``transaction.on_commit``.
+    Deltas collected in a nested ``atomic()`` that rolls back are dropped.
+    Nested blocks join the outermost one. Usable as a decorator as well.
+    """
+    if _deferred_deltas.get() is not None:
+        with write_transaction(using=using):
+            yield
+        return
+
+    connection = transaction.get_connection(using)
+    collected = _DeferredDeltas(connection)
+    token = _deferred_deltas.set(collected)
+    try:
+        with write_transaction(using=using):
+            with connection.execute_wrapper(collected):
+                yield
+            _deferred_deltas.reset(token)
+            token = None
+            note_model = _note_model()
+            dirty = note_model.apply_todo_count_deltas(collected.merged(), refresh_status=False)
+            if dirty:
+                transaction.on_commit(partial(note_model.refresh_statuses, dirty), using=using)
+    finally:
+        if token is not None:
+            _deferred_deltas.reset(token)
+
+
+def _apply_deltas(instance: Todo, deltas: dict[int, dict[str, int]]) -> None:
+    if not deltas:
+        return
+    collected = _deferred_deltas.get()
+    if collected is not None:
+        collected.add(deltas)
+        return
+    _note_model().apply_todo_count_deltas(deltas)
+    # Keep an already loaded parent note in sync with the database
+    if Todo.note.is_cached(instance) and instance.note is not None and instance.note.pk in deltas:
+        instance.note.refresh_from_db(
+            fields=['status', 'updated_at', 'pending_count', 'in_progress_count', 'completed_count']
+        )
+
+
+@receiver(pre_save, sender=Todo)
+def remember_todo_state_before_save(sender: type[Todo], instance: Todo, **kwargs: Any) -> None:
+    """
+    Signal to capture the todo's stored (note, status) pair before it is overwritten.
+    """
+    previous = getattr(instance, '_counted_state', None)
+    if previous is None and instance.pk is not None and not _counter_signals_suspended.get():
+        previous = sender.objects.filter(pk=instance.pk).values_list('note_id', 'status').first()
+    instance._previous_counted_state = previous
+
 
 @receiver(post_save, sender=Todo)
 def update_note_status_on_todo_save(sender: type[Todo], instance: Todo, **kwargs: Any) -> None:
     """
-    Signal to update the note's status when a todo is created or updated.
+    Signal to update the note's counters and status when a todo is created or updated.
     """
-    if instance.note:
-        instance.note.update_status_from_todos()
+    previous = None if kwargs.get('created') else getattr(instance, '_previous_counted_state', None)
+    note_id, todo_status = instance.note_id, instance.status
+
+    update_fields = kwargs.get('update_fields')
+    if previous is not None and update_fields is not None:
+        # Fields left out of update_fields kept their stored value
+        if 'note' not in update_fields and 'note_id' not in update_fields:
+            note_id = previous[0]
+        if 'status' not in update_fields:
+            todo_status = previous[1]
+
+    current = (note_id, todo_status)
+    if not _counter_signals_suspended.get():
+        _apply_deltas(instance, todo_count_deltas([(previous, current)]))
+    instance._counted_state = current
 
 
 @receiver(post_delete, sender=Todo)
 def update_note_status_on_todo_delete(sender: type[Todo], instance: Todo, **kwargs: Any) -> None:
     """
-    Signal to update the note's status when a todo is deleted.
+    Signal to update the note's counters and status when a todo is deleted.
     """
-    if instance.note:
-        instance.note.update_status_from_todos()
+    previous = getattr(instance, '_counted_state', None) or (instance.note_id, instance.status)
+    if not _counter_signals_suspended.get():
+        _apply_deltas(instance, todo_count_deltas([(previous, None)]))
+    instance._counted_state = None
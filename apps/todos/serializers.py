@@ -1,8 +1,18 @@
 from rest_framework import serializers
+
+from apps.core.instrumentation import TimedSerializerMixin
 from .models import Todo
 
-class TodoSerializer(serializers.ModelSerializer):
+class TodoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Todo
         fields = ["id", "title", "description", "status", "note", "created_at", "updated_at"]
-        read_only_fields = ["id", "created_at", "updated_at"]
\ No newline at end of file
+        read_only_fields = ["id", "created_at", "updated_at"]
+
+
+class TodoBulkItemSerializer(TodoSerializer):
+    """
+    Validate one item of a bulk request without touching the database.
+    The note ids of the whole batch are checked afterwards with a single IN query.
+    """
+    note = serializers.IntegerField(allow_null=True, required=False, min_value=1)
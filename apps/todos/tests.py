@@ -1,9 +1,21 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+from unittest import mock
+
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, transaction
+from django.db.models import CharField
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.reverse import reverse
 
-from .models import Todo, TodoStatus
+from .models import Todo, TodoStatus, defer_note_status_updates
+from .views import TodoViewSet
+from apps.core.fulltext import fulltext_available, repair_fulltext_indexes
 from apps.notes.models import Note
 
 
@@ -152,6 +164,12 @@ class TodoViewSetTest(APITestCase):
         self.assertEqual(response.data['status'], TodoStatus.PENDING)
         self.assertEqual(response.data['note'], self.note.pk)
 
+    def test_retrieve_non_numeric_pk_returns_404(self):
+        """Should answer 404, not 500, for a malformed pk."""
+        response = self.client.get(reverse('todos-detail', kwargs={'pk': 'abc'}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_create_todo(self):
         """Should allow creating a todo via API."""
         url = reverse('todos-list')
@@ -306,3 +324,328 @@ class TodoViewSetTest(APITestCase):
         response_invalid = self.client.get(url, {'note': 'abc'})
         self.assertEqual(response_invalid.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('note', response_invalid.data['errors'])
+
+
+class TodoCursorPaginationTest(APITestCase):
+    """Integration tests for the opt-in keyset pagination."""
+
+    def setUp(self):
+        """Create more todos than one page, half of them sharing a timestamp."""
+        self.todos = [Todo.objects.create(title=f"Todo {index}") for index in range(25)]
+        same_time = self.todos[0].created_at
+        Todo.objects.filter(pk__in=[todo.pk for todo in self.todos[:12]]).update(created_at=same_time)
+        self.url = reverse('todos-list')
+
+    def _walk(self, url, params=None):
+        ids = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        return ids
+
+    def test_cursor_walk_returns_every_todo_once(self):
+        """Should page through all todos in order without duplicates, even on ties."""
+        ids = self._walk(self.url, {'pagination': 'cursor'})
+
+        expected = list(Todo.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_page_has_no_count(self):
+        """Should not expose (nor compute) a total count in cursor mode."""
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_cursor_previous_link_returns_first_page(self):
+        """Should navigate back to the first page from the second one."""
+        first = self.client.get(self.url, {'pagination': 'cursor', 'ordering': 'updated_at'})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']],
+        )
+
+    def test_cursor_rejects_unindexed_ordering(self):
+        """Should refuse orderings without a matching index."""
+        response = self.client.get(self.url, {'pagination': 'cursor', 'ordering': 'title'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.data['errors'])
+
+    def test_invalid_cursor_returns_404(self):
+        """Should reject a malformed cursor."""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TodoBulkTest(APITestCase):
+    """Integration tests for the bulk create/update/delete endpoint."""
+
+    def setUp(self):
+        """Initial setup for each test."""
+        self.note = Note.objects.create(title="Note", content="Content")
+        self.other_note = Note.objects.create(title="Autre note", content="Texte")
+        self.url = reverse('todos-bulk')
+
+    def test_bulk_create(self):
+        """Should create every todo and update the note counters once."""
+        data = [
+            {'title': f'Todo {index}', 'note': self.note.pk, 'status': TodoStatus.COMPLETED}
+            for index in range(10)
+        ] + [{'title': 'Sans note'}]
+
+        # Note check, insert, counter update and status update (+ savepoint pair)
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 11)
+        self.assertEqual(Todo.objects.count(), 11)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.completed_count, 10)
+        self.assertEqual(self.note.status, 'completed')
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Should reject the whole batch and report each invalid item."""
+        data = [
+            {'title': 'Valide', 'note': self.note.pk},
+            {'status': TodoStatus.PENDING},
+            {'title': 'Note inconnue', 'note': 99999},
+        ]
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['code'], 'invalid')
+        self.assertEqual(set(response.data['errors']), {'1', '2'})
+        self.assertIn('title', response.data['errors']['1'])
+        self.assertIn('note', response.data['errors']['2'])
+        self.assertEqual(Todo.objects.count(), 0)
+
+    def test_bulk_update(self):
+        """Should update statuses and move todos between notes."""
+        first = Todo.objects.create(title="Todo 1", note=self.note)
+        second = Todo.objects.create(title="Todo 2", note=self.note)
+        data = [
+            {'id': first.pk, 'status': TodoStatus.IN_PROGRESS},
+            {'id': second.pk, 'note': self.other_note.pk},
+        ]
+        response = self.client.patch(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, TodoStatus.IN_PROGRESS)
+        self.assertEqual(second.note, self.other_note)
+        self.note.refresh_from_db()
+        self.other_note.refresh_from_db()
+        self.assertEqual((self.note.pending_count, self.note.in_progress_count), (0, 1))
+        self.assertEqual(self.note.status, 'in_progress')
+        self.assertEqual(self.other_note.pending_count, 1)
+
+    def test_bulk_update_unknown_id(self):
+        """Should report unknown and missing ids per item."""
+        todo = Todo.objects.create(title="Todo", note=self.note)
+        data = [{'id': todo.pk, 'title': 'Renamed'}, {'id': 99999}, {'title': 'No id'}]
+        response = self.client.patch(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['errors']), {'1', '2'})
+        todo.refresh_from_db()
+        self.assertEqual(todo.title, 'Todo')
+
+    def test_bulk_delete(self):
+        """Should delete the given todos and decrement the counters."""
+        todos = [Todo.objects.create(title=f"Todo {index}", note=self.note) for index in range(3)]
+        response = self.client.delete(self.url, [todos[0].pk, todos[1].pk], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Todo.objects.values_list('pk', flat=True)), [todos[2].pk])
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.pending_count, 1)
+
+    def test_bulk_requires_a_list(self):
+        """Should reject payloads that are not a non-empty list."""
+        response = self.client.post(self.url, {'title': 'Todo'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.data['errors'])
+
+
+class DeferredNoteStatusTest(TestCase):
+    """Tests for the transaction-scoped coalescing of note updates."""
+
+    def setUp(self):
+        """Initial setup for each test."""
+        self.note = Note.objects.create(title="Note", content="Content")
+
+    def test_updates_are_coalesced_per_note(self):
+        """Should update each dirty note once, with the status refreshed on commit."""
+        other = Note.objects.create(title="Autre", content="Texte")
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            with defer_note_status_updates():
+                for index in range(5):
+                    Todo.objects.create(title=f"Todo {index}", note=self.note, status=TodoStatus.COMPLETED)
+                todo = Todo.objects.create(title="En cours", note=other)
+                todo.status = TodoStatus.IN_PROGRESS
+                todo.save()
+
+                self.note.refresh_from_db()
+                self.assertEqual(self.note.completed_count, 0)
+
+        note_updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "notes_note"')]
+        # One counter update per distinct delta, then one status update for both notes
+        self.assertEqual(len(note_updates), 3)
+        self.note.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.note.completed_count, 5)
+        self.assertEqual(self.note.status, 'completed')
+        self.assertEqual((other.pending_count, other.in_progress_count), (0, 1))
+        self.assertEqual(other.status, 'in_progress')
+
+    def test_rollback_discards_collected_deltas(self):
+        """Should leave the counters untouched when the block fails."""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with defer_note_status_updates():
+                    Todo.objects.create(title="Todo", note=self.note)
+                    raise RuntimeError("boom")
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Todo.objects.exists())
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.pending_count, 0)
+
+
+    def test_rolled_back_savepoint_discards_its_deltas(self):
+        """Should drop the deltas of a nested atomic block that rolled back."""
+        with self.captureOnCommitCallbacks(execute=True):
+            with defer_note_status_updates():
+                Todo.objects.create(title="Gardé", note=self.note)
+                try:
+                    with transaction.atomic():
+                        Todo.objects.create(title="Annulé", note=self.note)
+                        raise RuntimeError("boom")
+                except RuntimeError:
+                    pass
+                with transaction.atomic():
+                    Todo.objects.create(title="Validé", note=self.note, status=TodoStatus.COMPLETED)
+
+        self.note.refresh_from_db()
+        self.assertEqual(Todo.objects.count(), 2)
+        self.assertEqual((self.note.pending_count, self.note.completed_count), (1, 1))
+        self.assertEqual(self.note.status, 'active')
+
+class TodoFullTextSearchTest(APITestCase):
+    """Integration tests for the full-text ?search= backend on todos."""
+
+    def test_search_title_and_description(self):
+        """Should match words in the title or the description, bulk inserts included."""
+        Todo.objects.bulk_create([
+            Todo(title="Préparer la maquette", description="Mockups Figma"),
+            Todo(title="Lire le chapitre", description="Permissions DRF"),
+        ])
+        url = reverse('todos-list')
+
+        response = self.client.get(url, {'search': 'figma'})
+        self.assertEqual([item['title'] for item in response.data['results']], ["Préparer la maquette"])
+
+        response = self.client.get(url, {'search': '"drf"'})
+        self.assertEqual([item['title'] for item in response.data['results']], ["Lire le chapitre"])
+
+
+class SearchIndexRepairTest(TransactionTestCase):
+    """Tests for the SQLite search triggers dropped by a table rebuild."""
+
+    def rebuild_table(self, max_length):
+        # Any change of the column rebuilds the table on SQLite, as most AlterField operations do
+        old_field = Todo._meta.get_field('title')
+        new_field = CharField(max_length=max_length)
+        new_field.set_attributes_from_name('title')
+        with connection.schema_editor() as schema_editor:
+            schema_editor.alter_field(Todo, old_field, new_field)
+
+    def restore_table(self):
+        self.rebuild_table(200)
+        repair_fulltext_indexes()
+
+    def test_post_migrate_recreates_the_triggers(self):
+        """Should re-create the triggers after migrate and refill the index."""
+        Todo.objects.create(title="Avant la reconstruction")
+        self.rebuild_table(250)
+        self.addCleanup(self.restore_table)
+
+        emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+        self.assertTrue(fulltext_available(connection.alias, 'todos_todo'))
+        Todo.objects.create(title="Après la reconstruction")
+
+        url = reverse('todos-list')
+        self.assertEqual(self.client.get(url, {'search': 'avant'}).data['count'], 1)
+        # Diacritics are only folded by the full-text index
+        self.assertEqual(self.client.get(url, {'search': 'apres'}).data['count'], 1)
+        self.assertEqual(self.client.get(url, {'search': 'reconstruction'}).data['count'], 2)
+
+
+class TodoExportTest(APITestCase):
+    """Test cases for the streaming export endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.note = Note.objects.create(title="Note", content="Text")
+        Todo.objects.create(title="Alpha, first", description='Say "hi"', note=self.note)
+        Todo.objects.create(title="Beta", status=TodoStatus.COMPLETED)
+        self.url = reverse('todos-export')
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_export_ndjson_by_default(self):
+        """Test that every todo is streamed as one JSON line, without pagination."""
+        response = self.client.get(self.url, {'ordering': 'title'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in self.read(response).decode().splitlines()]
+        self.assertEqual([row['title'] for row in rows], ["Alpha, first", "Beta"])
+        self.assertEqual(rows[0]['note'], self.note.pk)
+
+    def test_export_csv_honours_search(self):
+        """Test the CSV format with a search filter."""
+        response = self.client.get(self.url, {'format': 'csv', 'search': 'Alpha'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('todos.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self.read(response).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], "Alpha, first")
+        self.assertEqual(rows[0]['description'], 'Say "hi"')
+
+    def test_export_gzip(self):
+        """Test that the stream is compressed when the client accepts it."""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(self.read(response)).splitlines()), 2)
+
+    def test_export_reads_rows_in_chunks(self):
+        """Test that the rows are fetched by chunks with a constant number of queries."""
+        Todo.objects.bulk_create(Todo(title=f"Todo {index}") for index in range(7))
+        with mock.patch.object(TodoViewSet, 'export_chunk_size', 3), \
+                CaptureQueriesContext(connection) as queries:
+            content = self.read(self.client.get(self.url))
+
+        self.assertEqual(len(content.splitlines()), 9)
+        self.assertEqual(len(queries), 1)
+
+    def test_export_rejects_unknown_format(self):
+        """Test that an unsupported format is refused."""
+        response = self.client.get(self.url, {'format': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,12 +1,22 @@
+from typing import Any
+
+from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.request import Request
 
-from .models import Todo
-from .serializers import TodoSerializer
+from .models import Todo, todo_count_deltas, suspend_note_counter_signals
+from .serializers import TodoBulkItemSerializer, TodoSerializer
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
+from apps.core.cache import CachedResponseMixin, bump_generation
+from apps.core.sqlite_tuning import write_transaction
+from config.api.conditional import ConditionalGetMixin
+from config.api.export import StreamingExportMixin
+from config.api.pagination import OptInCursorPagination
+
 @extend_schema(tags=['Todos'])
 @extend_schema_view(
     list=extend_schema(summary='List all todos'),
@@ -15,7 +25,7 @@ from drf_spectacular.utils import extend_schema, extend_schema_view
     update=extend_schema(summary='Update a todo by ID'),
     destroy=extend_schema(summary='Delete a todo by ID'),
 )   
-class TodoViewSet(viewsets.ModelViewSet):
+class TodoViewSet(CachedResponseMixin, ConditionalGetMixin, StreamingExportMixin, viewsets.ModelViewSet):
     """Viewset for the Todo model."""
 
     queryset = Todo.objects.select_related("note").all()
@@ -28,6 +38,26 @@ class TodoViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at', 'title', 'status']
     ordering = ['-created_at']  # Default: most recent first
 
+    # Opt-in keyset pagination (?pagination=cursor), limited to fields with a (field, id) index
+    pagination_class = OptInCursorPagination
+    cursor_ordering_fields = ['created_at', 'updated_at']
+
+    # Cached list/retrieve responses, invalidated by writes to these models
+    cache_dependencies = ('todos.Todo', 'notes.Note')
+
+    # The todo signals read then update the parent note: take the SQLite write lock up front
+    def perform_create(self, serializer: TodoSerializer) -> None:
+        with write_transaction():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer: TodoSerializer) -> None:
+        with write_transaction():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance: Todo) -> None:
+        with write_transaction():
+            super().perform_destroy(instance)
+
     @action(detail=False, methods=["get"], url_path="by-note")
     @extend_schema(summary="List todos linked to a note", description="Return all todos attached to the given note id.")
     def by_note(self, request: Request) -> Response:
@@ -57,3 +87,182 @@ class TodoViewSet(viewsets.ModelViewSet):
         todos = self.get_queryset().filter(note_id=note_id)
         serializer = self.get_serializer(todos, many=True)
         return Response(serializer.data)
+
+    # Maximum number of items accepted by a single bulk request
+    bulk_max_items = 500
+
+    @action(detail=False, methods=["post", "patch", "delete"], url_path="bulk")
+    @extend_schema(
+        methods=["POST"],
+        summary="Create todos in bulk",
+        description="Create a list of todos in one transaction. Nothing is written if any item is invalid.",
+        request=TodoSerializer(many=True),
+        responses={201: TodoSerializer(many=True)},
+    )
+    @extend_schema(
+        methods=["PATCH"],
+        summary="Update todos in bulk",
+        description="Partially update a list of todos, each item identified by its `id`.",
+        request=TodoSerializer(many=True),
+        responses={200: TodoSerializer(many=True)},
+    )
+    @extend_schema(
+        methods=["DELETE"],
+        summary="Delete todos in bulk",
+        description="Delete the todos whose ids are given as a JSON list.",
+        request={"application/json": {"type": "array", "items": {"type": "integer"}}},
+        responses={204: None},
+    )
+    def bulk(self, request: Request) -> Response:
+        """
+        Create, update or delete many todos at once.
+        Each affected note gets its counters and status updated once per request.
+        Validation errors are reported per item, keyed by the item index.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"non_field_errors": ["Expected a non-empty list of items."]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                {"non_field_errors": [f"A bulk request accepts at most {self.bulk_max_items} items."]}
+            )
+
+        if request.method == "POST":
+            return self._bulk_create(items)
+        if request.method == "PATCH":
+            return self._bulk_update(items)
+        return self._bulk_delete(items)
+
+    def _bulk_create(self, items: list[Any]) -> Response:
+        errors: dict[str, Any] = {}
+        serializers = []
+        for index, item in enumerate(items):
+            serializer = TodoBulkItemSerializer(data=item)
+            if serializer.is_valid():
+                serializers.append((index, serializer))
+            else:
+                errors[str(index)] = serializer.errors
+        self._check_note_ids(serializers, errors)
+        if errors:
+            raise ValidationError(errors)
+
+        todos = [Todo(**self._model_values(serializer.validated_data)) for _, serializer in serializers]
+        with write_transaction():
+            todos = Todo.objects.bulk_create(todos)
+            # bulk_create() does not send post_save
+            bump_generation(Todo._meta.label)
+            self._note_model().apply_todo_count_deltas(
+                todo_count_deltas((None, (todo.note_id, todo.status)) for todo in todos)
+            )
+        return Response(TodoSerializer(todos, many=True).data, status=status.HTTP_201_CREATED)
+
+    def _bulk_update(self, items: list[Any]) -> Response:
+        errors: dict[str, Any] = {}
+        ids = self._collect_ids([item.get("id") if isinstance(item, dict) else None for item in items], errors)
+
+        with write_transaction():
+            todos = Todo.objects.select_for_update().in_bulk(list(ids.values()))
+            serializers = []
+            for index, item in enumerate(items):
+                if str(index) in errors:
+                    continue
+                todo = todos.get(ids[index])
+                if todo is None:
+                    errors[str(index)] = {"id": ["Not found."]}
+                    continue
+                serializer = TodoBulkItemSerializer(todo, data=item, partial=True)
+                if serializer.is_valid():
+                    serializers.append((index, serializer))
+                else:
+                    errors[str(index)] = serializer.errors
+            self._check_note_ids(serializers, errors)
+            if errors:
+                raise ValidationError(errors)
+
+            now = timezone.now()
+            fields = {"updated_at"}
+            transitions = []
+            for _, serializer in serializers:
+                todo = serializer.instance
+                previous = (todo.note_id, todo.status)
+                for name, value in self._model_values(serializer.validated_data).items():
+                    setattr(todo, name, value)
+                    fields.add(name)
+                todo.updated_at = now
+                transitions.append((previous, (todo.note_id, todo.status)))
+
+            updated = [serializer.instance for _, serializer in serializers]
+            Todo.objects.bulk_update(updated, sorted(fields))
+            # bulk_update() does not send post_save
+            bump_generation(Todo._meta.label)
+            self._note_model().apply_todo_count_deltas(todo_count_deltas(transitions))
+        return Response(TodoSerializer(updated, many=True).data)
+
+    def _bulk_delete(self, items: list[Any]) -> Response:
+        errors: dict[str, Any] = {}
+        ids = self._collect_ids(items, errors)
+
+        with write_transaction():
+            rows = {
+                pk: (note_id, todo_status)
+                for pk, note_id, todo_status in Todo.objects.select_for_update()
+                .filter(pk__in=list(ids.values()))
+                .values_list("pk", "note_id", "status")
+            }
+            for index, pk in ids.items():
+                if pk not in rows:
+                    errors[str(index)] = {"id": ["Not found."]}
+            if errors:
+                raise ValidationError(errors)
+
+            with suspend_note_counter_signals():
+                Todo.objects.filter(pk__in=list(rows)).delete()
+            self._note_model().apply_todo_count_deltas(
+                todo_count_deltas((state, None) for state in rows.values())
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def _collect_ids(values: list[Any], errors: dict[str, Any]) -> dict[int, int]:
+        """Map each item index to its todo id, reporting missing, invalid and duplicate ids."""
+        ids: dict[int, int] = {}
+        seen: set[int] = set()
+        for index, value in enumerate(values):
+            if value is None:
+                errors[str(index)] = {"id": ["This field is required."]}
+            elif isinstance(value, bool) or not isinstance(value, int):
+                errors[str(index)] = {"id": ["A valid integer is required."]}
+            elif value in seen:
+                errors[str(index)] = {"id": ["Duplicate id in the request."]}
+            else:
+                seen.add(value)
+                ids[index] = value
+        return ids
+
+    def _check_note_ids(self, serializers: list[tuple[int, TodoBulkItemSerializer]], errors: dict[str, Any]) -> None:
+        """Check every referenced note of the batch with a single IN query."""
+        note_ids = {
+            serializer.validated_data["note"]
+            for _, serializer in serializers
+            if serializer.validated_data.get("note") is not None
+        }
+        if not note_ids:
+            return
+        existing = set(
+            self._note_model().objects.filter(pk__in=note_ids).order_by().values_list("pk", flat=True)
+        )
+        for index, serializer in serializers:
+            note_id = serializer.validated_data.get("note")
+            if note_id is not None and note_id not in existing:
+                errors[str(index)] = {"note": [f'Invalid pk "{note_id}" - object does not exist.']}
+
+    @staticmethod
+    def _model_values(validated_data: dict[str, Any]) -> dict[str, Any]:
+        values = dict(validated_data)
+        if "note" in values:
+            values["note_id"] = values.pop("note")
+        return values
+
+    @staticmethod
+    def _note_model() -> Any:
+        return Todo._meta.get_field("note").related_model
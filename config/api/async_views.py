@@ -0,0 +1,137 @@
+"""
+Native async read endpoints, served under ``/api/async/``.
+
+Under ASGI these views run in the event loop and read through the async ORM
+(``acount``, ``aiterator``, ``aget``): a slow query waits without holding a worker
+thread. Each view reuses the queryset, serializer and ordering of its viewset, and
+answers with the same payloads as the synchronous endpoints. The serializers only
+read columns and annotations of the fetched rows, so they run in the event loop.
+
+Search, cursor pagination, the response cache and conditional requests stay on the
+synchronous endpoints. Under WSGI the views still work: Django runs them in an event loop per request.
+"""
+from typing import Any, Optional
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from apps.notes.views import NoteViewSet
+from apps.todos.views import TodoViewSet
+from config.api.exceptions import _build_payload
+
+
+def _json(data: Any, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+def _not_found(detail: str) -> HttpResponse:
+    return _json(_build_payload(detail=detail, code='not_found'), status.HTTP_404_NOT_FOUND)
+
+
+class AsyncReadView(View):
+    """Read-only async counterpart of a viewset action (``list``, ``retrieve`` or ``by_note``)."""
+
+    http_method_names = ['get', 'head', 'options']
+    viewset: Optional[type] = None
+    action = 'list'
+    page_query_param = 'page'
+
+    def get_queryset(self) -> QuerySet:
+        return self.viewset.queryset.all()
+
+    def get_ordering(self, request: HttpRequest) -> list[str]:
+        """Valid ``ordering`` parameter fields, as the sync endpoints accept them, else the viewset default."""
+        allowed = set(self.viewset.ordering_fields)
+        requested = [
+            field.strip() for field in request.GET.get(api_settings.ORDERING_PARAM, '').split(',')
+            if field.strip().lstrip('-') in allowed
+        ]
+        return requested or list(self.viewset.ordering)
+
+    def serialize(self, objects: Any, request: HttpRequest, many: bool) -> Any:
+        return self.viewset.serializer_class(objects, many=many, context={'request': request}).data
+
+    async def get(self, request: HttpRequest, pk: Optional[str] = None) -> HttpResponse:
+        if self.action == 'retrieve':
+            return await self.retrieve(request, pk)
+        if self.action == 'by_note':
+            return await self.by_note(request)
+        return await self.list(request)
+
+    async def list(self, request: HttpRequest) -> HttpResponse:
+        """Page-number pagination with the payload of ``PageNumberPagination``."""
+        queryset = self.get_queryset().order_by(*self.get_ordering(request))
+        page_size = api_settings.PAGE_SIZE
+        try:
+            page = int(request.GET.get(self.page_query_param, 1))
+        except ValueError:
+            page = 0
+        count = await queryset.acount()
+        last_page = max(1, -(-count // page_size))
+        if not 1 <= page <= last_page:
+            return _not_found('Invalid page.')
+
+        start = (page - 1) * page_size
+        rows = [obj async for obj in queryset[start:start + page_size].aiterator()]
+        url = request.build_absolute_uri()
+        previous = None
+        if page > 1:
+            previous = (
+                remove_query_param(url, self.page_query_param) if page == 2
+                else replace_query_param(url, self.page_query_param, page - 1)
+            )
+        return _json({
+            'count': count,
+            'next': replace_query_param(url, self.page_query_param, page + 1) if page < last_page else None,
+            'previous': previous,
+            'results': self.serialize(rows, request, many=True),
+        })
+
+    async def retrieve(self, request: HttpRequest, pk: str) -> HttpResponse:
+        model = self.viewset.queryset.model
+        try:
+            obj = await self.get_queryset().aget(pk=pk)
+        except (model.DoesNotExist, ValueError, DjangoValidationError):
+            return _not_found(f'No {model._meta.object_name} matches the given query.')
+        return _json(self.serialize(obj, request, many=False))
+
+    async def by_note(self, request: HttpRequest) -> HttpResponse:
+        """Todos of the ``note`` query parameter, unpaginated like ``/api/todos/by-note/``."""
+        note_param = request.GET.get('note')
+        if note_param is None:
+            return _json(
+                _build_payload(
+                    detail="Query parameter 'note' is required.",
+                    code='missing_note_param',
+                    errors={'note': ['This query parameter is required.']},
+                ),
+                status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            note_id = int(note_param)
+        except ValueError:
+            return _json(
+                _build_payload(
+                    detail="Query parameter 'note' must be an integer.",
+                    code='invalid_note_param',
+                    errors={'note': ['This query parameter must be an integer.']},
+                ),
+                status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.get_queryset().filter(note_id=note_id)
+        rows = [obj async for obj in queryset.aiterator()]
+        return _json(self.serialize(rows, request, many=True))
+
+
+class AsyncNoteView(AsyncReadView):
+    viewset = NoteViewSet
+
+
+class AsyncTodoView(AsyncReadView):
+    viewset = TodoViewSet
@@ -0,0 +1,93 @@
+"""Conditional GET support (ETag / Last-Modified) for the API viewsets."""
+
+import hashlib
+from typing import Any, Callable, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.request import Request
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin answering ``If-None-Match`` / ``If-Modified-Since`` with a 304,
+    before the objects are fetched and serialized.
+
+    - ``retrieve``: ETag and Last-Modified derived from the row's ``updated_at``.
+    - ``list``: ETag derived from the query string and a fingerprint of the filtered
+      collection (``MAX(updated_at)`` and the row count, one aggregate query), computed
+      before the page is fetched. A matching client copy gets a 304 without serialization;
+      the response cache answers it without any query. Collections get no Last-Modified,
+      since a deletion does not move ``MAX(updated_at)``.
+
+    Every write changing the representation of a row must bump its ``updated_at``.
+    """
+
+    def get_fingerprint_queryset(self) -> QuerySet:
+        """Plain queryset (without the costly annotations) the fingerprints are computed on."""
+        return self.get_queryset().model.objects.all()
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        def compute() -> HttpResponseBase:
+            return super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+
+        fingerprint = self.filter_queryset(self.get_fingerprint_queryset()).aggregate(
+            last_update=Max('updated_at'), total=Count('pk')
+        )
+        last_update = fingerprint['last_update']
+        etag = self.make_etag(
+            request,
+            request.query_params.urlencode(),
+            last_update.isoformat() if last_update else '',
+            fingerprint['total'],
+        )
+        return self.conditional_response(request, etag, None, compute)
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponseBase:
+        def compute() -> HttpResponseBase:
+            return super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+
+        lookup_value = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            updated_at = (
+                self.get_fingerprint_queryset()
+                .filter(**{self.lookup_field: lookup_value})
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+        except (ValueError, TypeError, ValidationError):
+            # Malformed lookup value (e.g. a non-numeric pk): the regular lookup answers 404
+            updated_at = None
+        if updated_at is None:
+            # Let the regular lookup answer (404 or validation error)
+            return compute()
+
+        etag = self.make_etag(request, lookup_value, updated_at.isoformat())
+        # HTTP dates have a one-second resolution; the ETag still catches sub-second changes
+        return self.conditional_response(request, etag, int(updated_at.timestamp()), compute)
+
+    def make_etag(self, request: Request, *parts: Any) -> str:
+        """Weak ETag: the representation depends on the renderer, not only on the data."""
+        renderer_format = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+        raw = ':'.join(str(part) for part in (self.basename, self.action, renderer_format, *parts))
+        return f'W/"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+    def conditional_response(
+        self,
+        request: Request,
+        etag: str,
+        last_modified: Optional[int],
+        compute: Callable[[], HttpResponseBase],
+    ) -> HttpResponseBase:
+        """Return a 304 if the client copy is fresh, else the computed response, with validators."""
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = compute()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -2,6 +2,7 @@ import logging
 from typing import Any, Dict, Optional
 
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import OperationalError
 from rest_framework import status
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework.response import Response
@@ -44,6 +45,15 @@ def custom_exception_handler(exc, context):
         response.data = _build_payload(detail=detail, code=code, errors=errors)
         return response
 
+    if isinstance(exc, OperationalError) and "locked" in str(exc).lower():
+        # Write contention (e.g. SQLite "database is locked"): transient, the client may retry
+        logger.warning("Database locked in API layer: {}", exc)
+        return Response(
+            _build_payload(detail="Database is busy, please retry.", code="database_locked"),
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"},
+        )
+
     logger.error("Unhandled exception in API layer", exc_info=exc)
 
     return Response(
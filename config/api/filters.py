@@ -0,0 +1,50 @@
+"""Filter backends shared by the API viewsets."""
+
+from typing import Any
+
+from django.db.models import QuerySet
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.request import Request
+
+from apps.core.fulltext import RANK_ANNOTATION, fulltext_search, search_words
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for `SearchFilter` backed by the database full-text index
+    (tsvector + GIN on PostgreSQL, FTS5 on SQLite).
+
+    Every word of ``?search=`` must match (as a prefix) one of the indexed fields,
+    and results are ordered by relevance. Models without a full-text index fall
+    back to the regular ``icontains`` search.
+    """
+
+    def filter_queryset(self, request: Request, queryset: QuerySet, view: Any) -> QuerySet:
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not getattr(view, 'search_fields', None):
+            return queryset
+
+        results = fulltext_search(queryset, search_words(search_terms))
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results.order_by(f'-{RANK_ANNOTATION}', '-pk')
+
+
+class RankAwareOrderingFilter(OrderingFilter):
+    """
+    `OrderingFilter` that keeps the relevance ordering of a full-text search
+    unless the client asks for an explicit ``?ordering=``.
+    """
+
+    def filter_queryset(self, request: Request, queryset: QuerySet, view: Any) -> QuerySet:
+        if RANK_ANNOTATION in queryset.query.annotations and not self.get_ordering_param(request, view):
+            return queryset
+        return super().filter_queryset(request, queryset, view)
+
+    def get_ordering_param(self, request: Request, view: Any) -> list[str]:
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return []
+        return self.remove_invalid_fields(
+            view.get_queryset(), [param.strip() for param in params.split(',')], view, request
+        )
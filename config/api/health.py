@@ -1,5 +1,14 @@
-from django.http import JsonResponse, HttpRequest
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.views.decorators.http import require_http_methods
+from drf_spectacular.utils import extend_schema
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.core import metrics
+from apps.core.cache import get_stats
+from apps.core.database import connection_stats
 
 
 @require_http_methods(["GET", "HEAD"])
@@ -12,3 +21,34 @@ def health_check(request: HttpRequest) -> JsonResponse:
         "status": "healthy",
         "service": "django-todo-notes-api"
     })
+
+
+@extend_schema(exclude=True)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def cache_stats(request: Request) -> Response:
+    """
+    Hit/miss counters of the API response cache. Staff users only.
+    """
+    return Response(get_stats())
+
+
+@extend_schema(exclude=True)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def database_stats(request: Request) -> Response:
+    """
+    Connection reuse settings of each database alias and, with a connection pool,
+    its counters in the answering process (size, idle connections, waiting requests).
+    Staff users only.
+    """
+    return Response(connection_stats())
+
+
+@require_http_methods(["GET", "HEAD"])
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Request, SQL, cache and note status metrics in the Prometheus text format,
+    aggregated over all the worker processes.
+    """
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
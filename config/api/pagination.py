@@ -0,0 +1,198 @@
+"""Pagination classes shared by the API viewsets."""
+
+from base64 import b64decode, b64encode
+from typing import Any, Dict, List, Optional, Tuple
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# (value of the ordering field, primary key) of a row, as encoded in a cursor
+Position = Tuple[str, int]
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset pagination on an ``(ordering field, id)`` pair.
+
+    Unlike the offset-based page numbers, each page is fetched with
+    ``WHERE (field, id) < (last_value, last_id) ORDER BY field, id LIMIT n``,
+    so it costs the same at any depth and stays stable under concurrent inserts.
+    Only the fields listed in the view's ``cursor_ordering_fields`` (those backed by
+    a ``(field, id)`` index) may be used as ordering.
+    """
+
+    ordering = '-created_at'
+    invalid_ordering_message = 'Cursor pagination only supports ordering by: {fields}.'
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.field_name, self.descending = self._get_key(queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        # Walk backwards when the cursor points to a previous page
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field_name}', f'{prefix}pk')
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self._position_filter(queryset, self.cursor.position, descending))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _get_key(self, queryset: QuerySet, view: Any) -> Tuple[str, bool]:
+        """Return the keyset field and direction, rejecting unindexed orderings."""
+        order = self.ordering[0]
+        field_name = order.lstrip('-')
+        allowed = getattr(view, 'cursor_ordering_fields', None) or [self.ordering[0].lstrip('-')]
+        if field_name not in allowed:
+            raise ValidationError(
+                {'ordering': [self.invalid_ordering_message.format(fields=', '.join(allowed))]}
+            )
+        return field_name, order.startswith('-')
+
+    def _position_filter(self, queryset: QuerySet, position: Position, descending: bool) -> Q:
+        value, pk = position
+        try:
+            value = queryset.model._meta.get_field(self.field_name).to_python(value)
+        except DjangoValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'lt' if descending else 'gt'
+        return Q(**{f'{self.field_name}__{lookup}': value}) | Q(
+            **{self.field_name: value, f'pk__{lookup}': pk}
+        )
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def decode_cursor(self, request: Request) -> Optional[Cursor]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = (tokens['p'][0], int(tokens['i'][0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor: Cursor) -> str:
+        value, pk = cursor.position
+        tokens = {'p': value, 'i': str(pk)}
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance: Any, ordering: Tuple[str, ...]) -> Position:
+        if isinstance(instance, dict):
+            return str(instance[self.field_name]), instance['id']
+        return str(getattr(instance, self.field_name)), instance.pk
+
+
+class OptInCursorPagination(BasePagination):
+    """
+    Page-number pagination by default, keyset pagination on request.
+
+    Clients opt in with ``?pagination=cursor``; the ``next``/``previous`` links
+    then carry a ``cursor`` parameter and no ``COUNT(*)`` is issued.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    page_class = PageNumberPagination
+    cursor_class = KeysetCursorPagination
+
+    def __init__(self) -> None:
+        self.delegate: BasePagination = self.page_class()
+
+    def wants_cursor(self, request: Request) -> bool:
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == self.cursor_mode
+            or self.cursor_class.cursor_query_param in params
+        )
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Any = None) -> Optional[List[Any]]:
+        self.delegate = self.cursor_class() if self.wants_cursor(request) else self.page_class()
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        return self.page_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view: Any) -> List[Dict[str, Any]]:
+        return [
+            *self.page_class().get_schema_operation_parameters(view),
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" to use keyset pagination instead of page numbers.',
+                'schema': {'type': 'string', 'enum': [self.cursor_mode]},
+            },
+            *self.cursor_class().get_schema_operation_parameters(view),
+        ]
+
+    def get_results(self, data: Dict[str, Any]) -> Any:
+        return self.delegate.get_results(data)
+
+    def to_html(self) -> str:
+        return self.delegate.to_html()
+
+    @property
+    def display_page_controls(self) -> bool:
+        return getattr(self.delegate, 'display_page_controls', False)
@@ -0,0 +1,183 @@
+"""Unified search across notes and todos."""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, Optional
+
+from django.db.models import CharField, FloatField, Q, QuerySet, Value
+from django.db.models.functions import Substr
+from drf_spectacular.utils import OpenApiParameter, extend_schema, inline_serializer
+from rest_framework import serializers, status
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+from apps.core.fulltext import (
+    RANK_ANNOTATION,
+    SNIPPET_ANNOTATION,
+    fulltext_search,
+    render_snippet,
+    search_words,
+)
+from apps.notes.models import Note
+from apps.todos.models import Todo
+
+# (hit type, model, field used for the snippet, detail route name)
+SEARCH_SOURCES = (
+    ('note', Note, 'content', 'notes-detail'),
+    ('todo', Todo, 'description', 'todos-detail'),
+)
+
+# Cursor position of a hit: (rank, type, id), in the order of the results
+Position = tuple[float, str, int]
+
+
+class SearchHitSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=[source[0] for source in SEARCH_SOURCES])
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    snippet = serializers.CharField(help_text="Excerpt with the matched words wrapped in <mark> tags.")
+    rank = serializers.FloatField()
+    url = serializers.URLField()
+
+
+class SearchView(APIView):
+    """
+    Search notes and todos at once.
+
+    Both tables are queried by a single ``UNION ALL`` statement, ordered by
+    relevance, then type and id. Each branch joins its full-text index once
+    and reads the rank and snippet from that join (see `fulltext_search`). Pages are chained with an opaque keyset
+    ``cursor``, so no ``COUNT(*)`` is needed.
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+    cursor_param = 'cursor'
+    type_param = 'type'
+    page_size = api_settings.PAGE_SIZE
+    snippet_length = 160
+
+    @extend_schema(
+        tags=['Search'],
+        summary='Search notes and todos',
+        parameters=[
+            OpenApiParameter('search', str, description='Words to look for (all must match).'),
+            OpenApiParameter('type', str, enum=[source[0] for source in SEARCH_SOURCES],
+                             description='Restrict the results to one type.'),
+            OpenApiParameter('cursor', str, description='The pagination cursor value.'),
+        ],
+        responses=inline_serializer(
+            name='SearchResults',
+            fields={
+                'next': serializers.URLField(allow_null=True),
+                'results': SearchHitSerializer(many=True),
+            },
+        ),
+    )
+    def get(self, request: Request) -> Response:
+        """Return typed, relevance-ordered hits with highlighted snippets."""
+        words = search_words([request.query_params.get(self.search_param, '')])
+        if not words:
+            return Response(
+                {
+                    "detail": f"Query parameter '{self.search_param}' is required.",
+                    "code": "missing_search_param",
+                    "errors": {self.search_param: ["This query parameter is required."]},
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        hit_type = request.query_params.get(self.type_param)
+        sources = [source for source in SEARCH_SOURCES if hit_type in (None, source[0])]
+        if not sources:
+            return Response(
+                {
+                    "detail": f"Query parameter '{self.type_param}' is invalid.",
+                    "code": "invalid_type_param",
+                    "errors": {self.type_param: [
+                        f"Expected one of: {', '.join(source[0] for source in SEARCH_SOURCES)}."
+                    ]},
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        position = self.decode_cursor(request)
+        parts = [self.get_hits(kind, model, field, words, position) for kind, model, field, _ in sources]
+        hits = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+        rows = list(hits.order_by(f'-{RANK_ANNOTATION}', 'kind', '-id')[:self.page_size + 1])
+
+        page = rows[:self.page_size]
+        next_link = None
+        if len(rows) > len(page):
+            last = page[-1]
+            next_link = self.encode_cursor(request, (last[RANK_ANNOTATION], last['kind'], last['id']))
+
+        routes = {kind: route for kind, _, _, route in sources}
+        return Response({
+            'next': next_link,
+            'results': SearchHitSerializer([
+                {
+                    'type': row['kind'],
+                    'id': row['id'],
+                    'title': row['title'],
+                    'snippet': render_snippet(row[SNIPPET_ANNOTATION]),
+                    'rank': row[RANK_ANNOTATION],
+                    'url': reverse(routes[row['kind']], kwargs={'pk': row['id']}, request=request),
+                }
+                for row in page
+            ], many=True).data,
+        })
+
+    def get_hits(
+        self,
+        kind: str,
+        model: Any,
+        snippet_field: str,
+        words: list[str],
+        position: Optional[Position],
+    ) -> QuerySet:
+        """Return the matching rows of one model, after ``position``, as union-ready values."""
+        queryset = fulltext_search(model.objects.all(), words, snippet_field=snippet_field)
+        if queryset is None:
+            # No full-text index: plain substring search, without ranking nor highlighting
+            queryset = model.objects.annotate(**{
+                RANK_ANNOTATION: Value(0.0, output_field=FloatField()),
+                SNIPPET_ANNOTATION: Substr(snippet_field, 1, self.snippet_length, output_field=CharField()),
+            })
+            for word in words:
+                queryset = queryset.filter(
+                    Q(title__icontains=word) | Q(**{f'{snippet_field}__icontains': word})
+                )
+
+        if position is not None:
+            rank, last_kind, last_id = position
+            after = Q(**{f'{RANK_ANNOTATION}__lt': rank})
+            if kind > last_kind:
+                after |= Q(**{RANK_ANNOTATION: rank})
+            elif kind == last_kind:
+                after |= Q(**{RANK_ANNOTATION: rank, 'pk__lt': last_id})
+            queryset = queryset.filter(after)
+
+        return (
+            queryset.annotate(kind=Value(kind, output_field=CharField()))
+            .order_by()
+            .values('kind', 'id', 'title', SNIPPET_ANNOTATION, RANK_ANNOTATION)
+        )
+
+    def decode_cursor(self, request: Request) -> Optional[Position]:
+        encoded = request.query_params.get(self.cursor_param)
+        if encoded is None:
+            return None
+        try:
+            rank, kind, pk = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            return float(rank), str(kind), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, request: Request, position: Position) -> str:
+        encoded = urlsafe_b64encode(json.dumps(list(position)).encode('ascii')).decode('ascii')
+        return replace_query_param(request.build_absolute_uri(), self.cursor_param, encoded)
@@ -0,0 +1,323 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from apps.core.metrics import NOTE_STATUS_REFRESHES, REGISTRY
+from apps.notes.models import Note
+from apps.todos.models import Todo
+
+
+class SearchViewTest(APITestCase):
+    """Integration tests for the unified search endpoint."""
+
+    def setUp(self):
+        """Initial setup for each test."""
+        self.url = reverse('search')
+        self.note = Note.objects.create(title="Réunion produit", content="Préparer la démo <b>client</b>")
+        self.todo = Todo.objects.create(title="Maquette", description="Maquette pour la réunion de lundi")
+        Note.objects.create(title="Lecture", content="Chapitre sur les permissions")
+
+    def test_search_returns_typed_hits_in_one_query(self):
+        """Should return notes and todos from a single SQL statement."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'search': 'réunion'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        hits = {(hit['type'], hit['id']) for hit in response.data['results']}
+        self.assertEqual(hits, {('note', self.note.pk), ('todo', self.todo.pk)})
+        ranks = [hit['rank'] for hit in response.data['results']]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertIsNone(response.data['next'])
+        urls = {hit['type']: hit['url'] for hit in response.data['results']}
+        self.assertTrue(urls['note'].endswith(f'/api/notes/{self.note.pk}/'))
+
+    def test_snippets_are_highlighted_and_escaped(self):
+        """Should wrap matches in <mark> and escape the stored text."""
+        response = self.client.get(self.url, {'search': 'client'})
+
+        snippet = response.data['results'][0]['snippet']
+        self.assertIn('<mark>client</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_type_filter(self):
+        """Should restrict the hits to one type."""
+        response = self.client.get(self.url, {'search': 'réunion', 'type': 'todo'})
+
+        self.assertEqual([hit['type'] for hit in response.data['results']], ['todo'])
+
+    def test_cursor_walks_all_hits(self):
+        """Should chain pages with the cursor without losing or repeating hits."""
+        Todo.objects.bulk_create([Todo(title=f"Réunion {index}") for index in range(25)])
+
+        ids, url, params = [], self.url, {'search': 'réunion'}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend((hit['type'], hit['id']) for hit in response.data['results'])
+            url, params = response.data['next'], None
+
+        self.assertEqual(len(ids), 27)
+        self.assertEqual(len(set(ids)), 27)
+
+    def test_search_param_is_required(self):
+        """Should return 400 without search words."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('search', response.data['errors'])
+
+
+class DatabaseLockedErrorTest(APITestCase):
+    """Tests for the mapping of write contention errors."""
+
+    def test_locked_database_returns_503(self):
+        """Should answer a retryable 503 in the normalized error format."""
+        from unittest import mock
+        from django.db import OperationalError
+
+        with mock.patch(
+            'apps.todos.views.TodoViewSet.perform_create',
+            side_effect=OperationalError('database is locked'),
+        ):
+            response = self.client.post(reverse('todos-list'), {'title': 'Bloquée'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data['code'], 'database_locked')
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class MetricsEndpointTest(APITestCase):
+    """Tests for the Prometheus metrics endpoint."""
+
+    def setUp(self):
+        REGISTRY.reset()
+        self.addCleanup(REGISTRY.reset)
+        self.note = Note.objects.create(title='Note', content='Texte')
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_request_latency_and_queries_per_view(self):
+        """Should expose histograms labelled by view name and method."""
+        with override_settings(API_CACHE={'ENABLED': False}):
+            self.client.get(reverse('notes-list'))
+            self.client.get(reverse('notes-list'))
+        body = self.metrics()
+
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_count{view="notes-list",method="GET"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="notes-list",method="GET",le="+Inf"} 2', body)
+        self.assertIn('http_requests_total{view="notes-list",method="GET",status="200"} 2', body)
+        # ETag fingerprint, count and page queries of both requests
+        self.assertIn('db_queries_per_request_sum{view="notes-list",method="GET"} 6', body)
+        self.assertIn('db_query_duration_seconds_per_request_count{view="notes-list",method="GET"} 2', body)
+
+    def test_cache_hit_ratio(self):
+        """Should derive the hit ratio from the cache lookups."""
+        from django.core.cache import cache
+
+        cache.clear()
+        url = reverse('notes-detail', args=[self.note.pk])
+        self.client.get(url)
+        self.client.get(url)
+        body = self.metrics()
+
+        self.assertIn('api_cache_requests_total{result="hit"} 1', body)
+        self.assertIn('api_cache_hit_ratio 0.5', body)
+
+    def test_note_status_recomputations(self):
+        """Should count the counter updates and status recomputations done by the todo signals."""
+        Todo.objects.create(title='Todo', note=self.note, status='in_progress')
+        body = self.metrics()
+
+        self.assertIn('note_counter_updates_total 1', body)
+        self.assertIn('note_status_refreshes_total 1', body)
+        self.assertIn('note_status_changes_total 1', body)
+
+    def test_aggregates_worker_processes(self):
+        """Should sum the snapshots written by the other processes."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS={'DIRECTORY': directory}):
+                NOTE_STATUS_REFRESHES.inc(amount=2)
+                REGISTRY.flush(force=True)
+                self.assertTrue(os.path.exists(os.path.join(directory, f'{REGISTRY.process_key()}.json')))
+
+                # Another worker, still running, which answered a request and recomputed 3 statuses
+                self.write_snapshot(directory, f'{os.getppid()}-1', {
+                    'note_status_refreshes_total': [[[], 3]],
+                    'http_request_duration_seconds': [[['notes-list', 'GET'], [1] + [0] * 11 + [0.002]]],
+                })
+                body = self.metrics()
+
+        self.assertIn('note_status_refreshes_total 5', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="notes-list",method="GET",le="0.005"} 1', body)
+
+    def test_folds_stopped_processes(self):
+        """Should fold the snapshots of stopped processes into one file, counting each once."""
+        stopped = subprocess.Popen([sys.executable, '-c', 'pass'])
+        stopped.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS={'DIRECTORY': directory}):
+                self.write_snapshot(directory, f'{stopped.pid}-1', {'note_status_refreshes_total': [[[], 3]]})
+                # The same pid reused by a later process: the former one has stopped
+                self.write_snapshot(directory, f'{os.getppid()}-1', {'note_status_refreshes_total': [[[], 4]]})
+                self.write_snapshot(directory, f'{os.getppid()}-2', {'note_status_refreshes_total': [[[], 5]]})
+
+                self.assertIn('note_status_refreshes_total 12', self.metrics())
+                self.assertEqual(
+                    sorted(name for name in os.listdir(directory) if name.endswith('.json')),
+                    [f'{os.getppid()}-2.json', 'stopped.json'],
+                )
+                # Folded once: a second scrape gives the same total
+                self.assertIn('note_status_refreshes_total 12', self.metrics())
+
+                # Interrupted fold: the snapshot is already counted in stopped.json
+                self.write_snapshot(directory, f'{stopped.pid}-1', {'note_status_refreshes_total': [[[], 3]]})
+                with open(os.path.join(directory, 'stopped.json'), encoding='utf-8') as handle:
+                    folded = json.load(handle)
+                folded['processes'].append(f'{stopped.pid}-1')
+                self.write_snapshot(directory, 'stopped', folded)
+                self.assertIn('note_status_refreshes_total 12', self.metrics())
+                self.assertFalse(os.path.exists(os.path.join(directory, f'{stopped.pid}-1.json')))
+
+    @staticmethod
+    def write_snapshot(directory, key, content):
+        with open(os.path.join(directory, f'{key}.json'), 'w', encoding='utf-8') as snapshot:
+            json.dump(content, snapshot)
+
+
+class AsyncReadEndpointsTest(APITestCase):
+    """Tests for the async read endpoints, compared with their synchronous counterparts."""
+
+    def setUp(self):
+        settings = override_settings(API_CACHE={'ENABLED': False})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.note = Note.objects.create(title='Note', content='Texte')
+        Note.objects.create(title='Autre note', content='Texte')
+        for index in range(25):
+            Todo.objects.create(title=f'Todo {index}', note=self.note if index % 2 else None)
+
+    def assertSamePayload(self, async_url, sync_url):
+        async_response = self.client.get(async_url)
+        sync_response = self.client.get(sync_url)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response
+
+    def test_list_pages_match_the_sync_endpoints(self):
+        """Should return the same pages, counts and ordering as the sync lists."""
+        self.assertSamePayload(reverse('async-notes-list'), reverse('notes-list'))
+        self.assertSamePayload(f"{reverse('async-notes-list')}?ordering=title", f"{reverse('notes-list')}?ordering=title")
+
+        first = self.client.get(reverse('async-todos-list')).json()
+        self.assertEqual(first['count'], 25)
+        self.assertEqual(first['next'], 'http://testserver/api/async/todos/?page=2')
+        second = self.client.get(first['next']).json()
+        self.assertEqual(second['previous'], 'http://testserver/api/async/todos/')
+        self.assertEqual(
+            [todo['id'] for todo in first['results'] + second['results']],
+            [todo.pk for todo in Todo.objects.order_by('-created_at')],
+        )
+
+    def test_invalid_page_is_not_found(self):
+        """Should answer 404 with the normalized payload, like the sync pagination."""
+        response = self.client.get(f"{reverse('async-todos-list')}?page=9")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json()['code'], 'not_found')
+
+    def test_retrieve_and_by_note(self):
+        """Should match the sync detail and by-note payloads, errors included."""
+        todo = Todo.objects.filter(note=self.note).first()
+        self.assertSamePayload(
+            reverse('async-notes-detail', args=[self.note.pk]), reverse('notes-detail', args=[self.note.pk])
+        )
+        self.assertSamePayload(reverse('async-todos-detail', args=[todo.pk]), reverse('todos-detail', args=[todo.pk]))
+        by_note = self.assertSamePayload(
+            f"{reverse('async-todos-by-note')}?note={self.note.pk}", f"{reverse('todos-by-note')}?note={self.note.pk}"
+        )
+        self.assertEqual(len(by_note.json()), 12)
+
+        missing = self.client.get(reverse('async-notes-detail', args=[999]))
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(missing.json()['code'], 'not_found')
+        invalid = self.client.get(f"{reverse('async-todos-by-note')}?note=abc")
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(invalid.json()['code'], 'invalid_note_param')
+
+    @override_settings(DEBUG=True, REQUEST_TIMING={'SAMPLE_RATE': 1})
+    async def test_queries_are_measured_under_asgi(self):
+        """Should count the queries run by the async ORM in worker threads."""
+        from django.test import AsyncClient
+
+        client = AsyncClient(HTTP_HOST='localhost')
+        response = await client.get(reverse('async-notes-list'))
+        health = await client.get(reverse('health-check'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The count and the page
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        self.assertEqual(health.json()['status'], 'healthy')
+
+
+class DatabaseStatsTest(APITestCase):
+    """Tests for the connection reuse statistics."""
+
+    def setUp(self):
+        """Log in a staff user: the statistics are not public."""
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def test_stats_are_reserved_to_staff(self):
+        """Should refuse anonymous clients and regular users."""
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('database-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(User.objects.create_user('user'))
+        self.assertEqual(self.client.get(reverse('database-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_without_pool(self):
+        """Should describe each alias, without pool counters on SQLite."""
+        response = self.client.get(reverse('database-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()['default'],
+            {'vendor': 'sqlite', 'pooled': False, 'conn_max_age': 0, 'conn_health_checks': False},
+        )
+
+    def test_pool_counters_are_exported(self):
+        """Should expose the pool counters on the stats endpoint and as Prometheus gauges."""
+        from unittest import mock
+
+        class FakePool:
+            def get_stats(self):
+                return {'pool_min': 2, 'pool_max': 10, 'pool_size': 4, 'pool_available': 1, 'requests_waiting': 3,
+                        'requests_num': 120, 'connections_ms': 42}
+
+        with mock.patch('apps.core.database._pool', return_value=FakePool()):
+            stats = self.client.get(reverse('database-stats')).json()['default']
+            body = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertTrue(stats['pooled'])
+        self.assertEqual(stats['pool']['requests_waiting'], 3)
+        self.assertNotIn('connections_ms', stats['pool'])
+        self.assertIn('# TYPE db_pool_size gauge', body)
+        self.assertIn('db_pool_available{alias="default"} 1', body)
+        self.assertIn('db_pool_requests_waiting{alias="default"} 3', body)
+        self.assertIn('db_pool_requests_errors{alias="default"} 0', body)
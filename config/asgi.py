@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Persistent connections are not safe under ASGI: connections are per thread, and the threads
+# running the ORM do not see the request boundaries that close them. POSTGRES_POOL=1 reuses them.
+os.environ.setdefault('POSTGRES_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -51,6 +51,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.metrics.MetricsMiddleware',
+    'apps.core.instrumentation.RequestTimingMiddleware',
+    'apps.core.slow_queries.SlowQueryMiddleware',
+    'apps.core.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +62,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # After the authentication middleware: profiling is reserved to staff users
+    'apps.core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -90,6 +96,20 @@ DATABASES = {
     }
 }
 
+# SQLite performance profile applied to each new connection (see apps/core/sqlite_tuning.py)
+SQLITE_TUNING = {
+    'ENABLED': os.environ.get('SQLITE_TUNING_ENABLED', '1') == '1',
+    'JOURNAL_MODE': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'SYNCHRONOUS': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'MMAP_SIZE': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    # Negative: KiB of page cache per connection
+    'CACHE_SIZE': int(os.environ.get('SQLITE_CACHE_SIZE', str(-64 * 1024))),
+    'BUSY_TIMEOUT_MS': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'TEMP_STORE': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+    # BEGIN IMMEDIATE for the read-then-write blocks (write_transaction), so that writers queue on busy_timeout
+    'TRANSACTION_MODE': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+}
+
 if os.environ.get('POSTGRES_DB'):
     DATABASES = {
         'default': {
@@ -99,8 +119,102 @@ if os.environ.get('POSTGRES_DB'):
             'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
             'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
             'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Persistent connections, reused across requests and checked before reuse;
+            # 0 under ASGI (config/asgi.py), where POSTGRES_POOL=1 is the way to reuse connections
+            'CONN_MAX_AGE': int(os.environ.get('POSTGRES_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': os.environ.get('POSTGRES_CONN_HEALTH_CHECKS', '1') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('POSTGRES_CONNECT_TIMEOUT', '5')),
+                # Server-side cap on the duration of every statement (0: none)
+                'options': f"-c statement_timeout={int(os.environ.get('POSTGRES_STATEMENT_TIMEOUT_MS', '30000'))}",
+            },
+        }
+    }
+
+    # psycopg 3 connection pool (pip install -r requirements-postgres.txt), instead of the persistent connections
+    if os.environ.get('POSTGRES_POOL', '0') == '1':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', '10')),
+            # Seconds a request waits for a free connection before failing
+            'timeout': float(os.environ.get('POSTGRES_POOL_TIMEOUT', '10')),
+            # Seconds after which idle connections above min_size are closed
+            'max_idle': float(os.environ.get('POSTGRES_POOL_MAX_IDLE', '600')),
         }
+
+# Read replicas (see apps/core/db_router.py), read by safe-method requests: comma-separated
+# PostgreSQL hosts, or SQLite files, each a copy of the primary settings with that host or file
+_replica_key = 'HOST' if os.environ.get('POSTGRES_DB') else 'NAME'
+_replicas = [value.strip() for value in os.environ.get('DATABASE_REPLICAS', '').split(',') if value.strip()]
+for _index, _value in enumerate(_replicas, start=1):
+    # Tests read the test database through the replica aliases
+    DATABASES[f'replica_{_index}'] = {**DATABASES['default'], _replica_key: _value, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = {
+    'ALIASES': [f'replica_{index}' for index in range(1, len(_replicas) + 1)],
+    # Seconds a client reads from the primary after a write, longer than the replication lag
+    'STICKY_SECONDS': float(os.environ.get('DATABASE_REPLICAS_STICKY_SECONDS', '5')),
+    'COOKIE': 'read_primary',
+}
+DATABASE_ROUTERS = ['apps.core.db_router.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'todo-notes-api'),
     }
+}
+
+# Response cache of the API read endpoints (see apps/core/cache.py)
+API_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.environ.get('API_CACHE_TIMEOUT', '300')),
+    'ENABLED': os.environ.get('API_CACHE_ENABLED', '1') == '1',
+}
+
+# Per-request SQL and timing instrumentation (see apps/core/instrumentation.py)
+REQUEST_TIMING = {
+    'ENABLED': os.environ.get('REQUEST_TIMING_ENABLED', '1') == '1',
+    # Share of the requests measured, from 0 to 1
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '0.01')),
+    # Server-Timing header on the measured responses, only with DEBUG or for staff users
+    'HEADER': os.environ.get('REQUEST_TIMING_HEADER', '1') == '1',
+    # One loguru line per measured request
+    'LOG': os.environ.get('REQUEST_TIMING_LOG', '0') == '1',
+}
+
+# Prometheus metrics on /api/metrics/ (see apps/core/metrics.py)
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1') == '1',
+    # Shared directory of the per-process snapshots, required with several worker processes
+    'DIRECTORY': os.environ.get('METRICS_DIRECTORY', ''),
+    'FLUSH_INTERVAL': float(os.environ.get('METRICS_FLUSH_INTERVAL', '5')),
+}
+
+# On-demand cProfile profiling (see apps/core/profiling.py); removed from the middleware chain when disabled
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING_ENABLED', '0') == '1',
+    'DIRECTORY': os.environ.get('PROFILING_DIRECTORY', str(BASE_DIR / 'profiles')),
+    # Share of the requests profiled and stored without being asked for
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', '0')),
+}
+
+# Slow query log with EXPLAIN plans (see apps/core/slow_queries.py)
+SLOW_QUERIES = {
+    'ENABLED': os.environ.get('SLOW_QUERIES_ENABLED', '1') == '1',
+    'THRESHOLD_MS': float(os.environ.get('SLOW_QUERIES_THRESHOLD_MS', '100')),
+    # Plans are taken after the response, on a connection of a background thread
+    'EXPLAIN': os.environ.get('SLOW_QUERIES_EXPLAIN', '0') == '1',
+    'PATH': os.environ.get('SLOW_QUERIES_PATH', str(BASE_DIR / 'logs' / 'slow_queries.log')),
+    # loguru rotation and retention of the log files
+    'ROTATION': os.environ.get('SLOW_QUERIES_ROTATION', '10 MB'),
+    'RETENTION': int(os.environ.get('SLOW_QUERIES_RETENTION', '5')),
+}
 
 
 # Password validation
@@ -159,8 +273,8 @@ REST_FRAMEWORK = {
     ],
     
     'DEFAULT_FILTER_BACKENDS': [
-        'rest_framework.filters.SearchFilter',
-        'rest_framework.filters.OrderingFilter',
+        'config.api.filters.FullTextSearchFilter',
+        'config.api.filters.RankAwareOrderingFilter',
     ],
     
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -185,5 +299,6 @@ SPECTACULAR_SETTINGS = {
     'TAGS': [
         {'name': 'Notes', 'description': 'Operations on notes'},
         {'name': 'Todos', 'description': 'Operations on todos'},
+        {'name': 'Search', 'description': 'Search across notes and todos'},
     ],
 }
\ No newline at end of file
@@ -6,13 +6,18 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
-from config.api.health import health_check
+from config.api.async_views import AsyncNoteView, AsyncTodoView
+from config.api.health import cache_stats, database_stats, health_check, metrics_view
+from config.api.search import SearchView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # Health check
     path('api/health/', health_check, name='health-check'),
+    path('api/cache/stats/', cache_stats, name='cache-stats'),
+    path('api/db/stats/', database_stats, name='database-stats'),
+    path('api/metrics/', metrics_view, name='metrics'),
     
     # Documentation API 
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -20,6 +25,16 @@ urlpatterns = [
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
 
     
+    # Unified search across notes and todos
+    path('api/search/', SearchView.as_view(), name='search'),
+
+    # Async read endpoints (ASGI)
+    path('api/async/notes/', AsyncNoteView.as_view(), name='async-notes-list'),
+    path('api/async/notes/<int:pk>/', AsyncNoteView.as_view(action='retrieve'), name='async-notes-detail'),
+    path('api/async/todos/', AsyncTodoView.as_view(), name='async-todos-list'),
+    path('api/async/todos/by-note/', AsyncTodoView.as_view(action='by_note'), name='async-todos-by-note'),
+    path('api/async/todos/<int:pk>/', AsyncTodoView.as_view(action='retrieve'), name='async-todos-detail'),
+
     # API REST 
     path('api/', include('apps.notes.urls')),
     path('api/', include('apps.todos.urls')),